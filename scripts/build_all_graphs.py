@@ -7,9 +7,14 @@ Outputs to graphs/ directory:
 - knowledge_asymmetry.* — Knowledge differences between characters
 - causal_chain.* — Event causation (DAG)
 - event_perspective_*.* — Which narrators cover which events
+- coverage_proposals.json — Coverage cells proposed from the text
+- narrator_conflicts.json — Diverging and redundant accounts of the same event
 - location_graph.* — Spatial relationships
+- location_index.npz — All-pairs walk/sight/sound distances between locations
+- travel_feasibility.json — Impossible moves in the story and sampled storylines
 - voice_fingerprints.json — Narrator style features
 - state_transitions.* — Probabilistic state model
+- irony_index.json — Reader vs character knowledge per segment
 """
 
 from pathlib import Path
@@ -21,9 +26,14 @@ sys.path.insert(0, str(Path(__file__).parent))
 from build_knowledge_state_graph import export_graphs as export_knowledge
 from build_causal_chain_graph import export_graphs as export_causal
 from build_event_perspective_matrix import export_matrix as export_perspective
+from extract_coverage import export_coverage_proposals
+from narrator_conflicts import export_conflicts
 from build_location_graph import export_graphs as export_location
+from location_index import export_location_index
+from travel_planner import export_travel
 from build_voice_fingerprints import export_fingerprints as export_voice
 from build_state_transitions import export_model as export_transitions
+from build_irony_index import export_irony_index as export_irony
 
 
 def main():
@@ -34,24 +44,31 @@ def main():
     print("MOONSTONE NARRATIVE GRAPH BUILDER")
     print("=" * 60)
 
-    print("\n[1/6] Building Knowledge State Graphs...")
+    print("\n[1/7] Building Knowledge State Graphs...")
     export_knowledge(output_dir)
 
-    print("\n[2/6] Building Causal Chain Graph (DAG + Bayesian Network)...")
+    print("\n[2/7] Building Causal Chain Graph (DAG + Bayesian Network)...")
     export_causal(output_dir)
 
-    print("\n[3/6] Building Event-Perspective Coverage Matrix...")
+    print("\n[3/7] Building Event-Perspective Coverage Matrix...")
     export_perspective(output_dir)
+    export_coverage_proposals(output_dir, source_dir / "pg155.txt")
+    export_conflicts(output_dir, source_dir / "pg155.txt")
 
-    print("\n[4/6] Building Location Graph...")
+    print("\n[4/7] Building Location Graph...")
     export_location(output_dir)
+    export_location_index(output_dir)
+    export_travel(output_dir)
 
-    print("\n[5/6] Building Voice Fingerprints...")
+    print("\n[5/7] Building Voice Fingerprints...")
     export_voice(output_dir, source_dir / "pg155.txt")
 
-    print("\n[6/6] Building Probabilistic State Transition Model...")
+    print("\n[6/7] Building Probabilistic State Transition Model...")
     export_transitions(output_dir)
 
+    print("\n[7/7] Building Dramatic Irony Index...")
+    export_irony(output_dir)
+
     print("\n" + "=" * 60)
     print("ALL GRAPHS BUILT SUCCESSFULLY")
     print("=" * 60)
@@ -15,6 +15,8 @@ import networkx as nx
 import pyagrum as gum
 from pathlib import Path
 
+from noisy_cpts import fill_noisy_cpt
+
 # Events in the causal chain
 EVENTS = {
     "E01_herncastle_steals": {
@@ -224,23 +226,21 @@ def build_causal_bayesnet():
     for node in root_nodes:
         bn.cpt(node).fillWith([0.01, 0.99])  # 99% probability event happened
 
-    # For nodes with parents: use simple probability model
+    # For nodes with parents: noisy-AND over ENABLES, noisy-OR over CAUSES
+    # P(event | all parents happened) = 0.95 unless the event sets p_actual;
+    # a missing required parent leaves a 1% chance, a contingent one 5%
+    edge_kinds = {}
+    edge_leaks = {}
+    for source, target, rel_type, necessity in CAUSAL_EDGES:
+        if rel_type in ["CAUSES", "ENABLES"]:
+            edge_kinds.setdefault(target, {})[source] = rel_type
+            edge_leaks.setdefault(target, {})[source] = 0.01 if necessity == "required" else 0.05
+
     for node in bn.names():
         if node in root_nodes:
             continue
-
-        parents = list(bn.parents(node))
-        if not parents:
-            continue
-
-        # Simple model: if story continues, this event likely happens
-        # P(event | all parents happened) = 0.95
-        # P(event | any parent didn't happen) = 0.05
-        cpt = bn.cpt(node)
-        cpt.fillWith(0.05)  # Default: low probability
-        # Set high probability when all parents are "yes" (value 1)
-        # This is the last entry in the CPT
-        cpt.fillWith([0.05, 0.95])  # Simplified: uniform conditioning
+        p = EVENTS[node].get("p_actual", 0.95)
+        fill_noisy_cpt(bn, node, edge_kinds[node], p, leak=edge_leaks[node])
 
     return bn
 
@@ -15,6 +15,9 @@ import pyagrum as gum
 import networkx as nx
 from pathlib import Path
 
+from chain_scoring import score_chain
+from noisy_cpts import fill_noisy_cpt
+
 # The narrative DAG
 # Each node is a state/event
 # Edges represent causal/enabling relationships
@@ -141,6 +144,7 @@ NODES = {
         "actual": True,
         "hinge": True,  # HINGE: Could have been asleep
         "p_actual": 0.3,  # Unlikely she'd be watching at that moment
+        "alternatives": ["rachel_asleep"],
     },
     "rachel_asleep": {
         "desc": "Rachel is asleep, doesn't witness",
@@ -426,29 +430,104 @@ def build_bayesian_network():
                 pass  # Skip if would create cycle
 
     # Set CPTs
-    for node_id, data in actual_nodes.items():
-        node = var_ids[node_id]
-        parents = bn.parents(node)
-
-        if not parents:
-            # Root node - conditions are typically true for the story
-            if data["type"] == "condition":
-                bn.cpt(node_id).fillWith([0.1, 0.9])  # Conditions usually true
-            else:
-                p = data.get("p_actual", 0.5)
-                bn.cpt(node_id).fillWith([1-p, p])
-        else:
-            # Node with parents - simplified model
-            # High probability if all parents true, low otherwise
-            cpt = bn.cpt(node_id)
-            p = data.get("p_actual", 0.8)
-            # Fill with low probability, override for "all parents true" case
-            cpt.fillWith([1-p*0.1, p*0.1])
+    for node_id in actual_nodes:
+        set_node_cpt(bn, node_id)
 
     return bn
 
 
-def identify_hinge_points():
+def network_p_actual(bn, node_id):
+    """P(node | all parents true) used for `node_id` in the network."""
+    data = NODES[node_id]
+    if bn.parents(node_id):
+        return data.get("p_actual", 0.8)
+    # Root node - conditions are typically true for the story
+    if data["type"] == "condition":
+        return 0.9
+    return data.get("p_actual", 0.5)
+
+
+def set_node_cpt(bn, node_id, p=None):
+    """Fill `node_id`'s CPT, with `p` overriding its p_actual if given."""
+    if p is None:
+        if not bn.parents(node_id) and NODES[node_id]["type"] == "condition":
+            bn.cpt(node_id).fillWith([0.1, 0.9])  # Conditions usually true
+            return
+        p = network_p_actual(bn, node_id)
+    if not bn.parents(node_id):
+        bn.cpt(node_id).fillWith([1-p, p])
+        return
+
+    # Node with parents: P(node | all parents true) = p_actual; each
+    # missing enabler (or every cause missing) cuts it to a tenth
+    edge_kinds = {source: edge_type for source, target, edge_type in EDGES
+                  if target == node_id and source in bn.names()
+                  and bn.existsArc(source, node_id)}
+    fill_noisy_cpt(bn, node_id, edge_kinds, p, leak=0.1)
+
+
+def build_branch_index(G):
+    """Map every counterfactual node to the hinge it branches from.
+
+    A counterfactual node is the alternative to the actual nodes it shares a
+    parent with. When there are several, the one that declares it in its
+    `alternatives` wins, then a hinge over a non-hinge. Its hinge is that
+    sibling if the sibling is a hinge, otherwise the nearest hinge above the
+    sibling. Counterfactual nodes whose parents are counterfactual continue
+    their parent's branch.
+
+    Returns {"branches": {node: {"hinge", "alternative_to", "via"}},
+    "by_hinge": {hinge: [nodes]}, "unresolved": [nodes]}.
+    """
+    def is_hinge(n):
+        return G.nodes[n].get("hinge") == "True"
+
+    def is_actual(n):
+        return G.nodes[n].get("actual") == "True"
+
+    def nearest_hinge(node):
+        # Breadth-first up the actual ancestors, nearest first
+        frontier, seen = [node], {node}
+        while frontier:
+            hinges = [n for n in frontier if is_hinge(n)]
+            if hinges:
+                return hinges[0]
+            parents = [p for n in frontier for p in G.predecessors(n) if is_actual(p)]
+            frontier = [p for p in dict.fromkeys(parents) if p not in seen]
+            seen.update(frontier)
+        return None
+
+    branches = {}
+    unresolved = []
+    for node in nx.topological_sort(G):
+        if G.nodes[node].get("node_type") != "counterfactual":
+            continue
+        parents = list(G.predecessors(node))
+        via = next((p for p in parents if p in branches), None)
+        if via is not None:
+            branches[node] = dict(branches[via], via=via)
+            continue
+
+        siblings = [s for p in parents for s in G.successors(p) if s != node and is_actual(s)]
+        siblings = list(dict.fromkeys(siblings))
+        if not siblings:
+            unresolved.append(node)
+            continue
+        sibling = min(siblings, key=lambda s: (node not in NODES[s].get("alternatives", []),
+                                               not is_hinge(s)))
+        hinge = nearest_hinge(sibling)
+        if hinge is None:
+            unresolved.append(node)
+            continue
+        branches[node] = {"hinge": hinge, "alternative_to": sibling, "via": None}
+
+    by_hinge = {}
+    for node, branch in branches.items():
+        by_hinge.setdefault(branch["hinge"], []).append(node)
+    return {"branches": branches, "by_hinge": by_hinge, "unresolved": unresolved}
+
+
+def identify_hinge_points(branch_index):
     """Identify the key hinge points in the narrative."""
     hinges = []
     for node_id, data in NODES.items():
@@ -458,25 +537,173 @@ def identify_hinge_points():
                 "description": data["desc"],
                 "p_actual": data.get("p_actual", 0.5),
                 "alternatives": data.get("alternatives", []),
-                "counterfactual_branch": [k for k, v in NODES.items()
-                                          if v["type"] == "counterfactual"
-                                          and node_id in k]
+                "counterfactual_branch": branch_index["by_hinge"].get(node_id, []),
             })
     return sorted(hinges, key=lambda x: x.get("p_actual", 0.5))
 
 
-def compute_narrative_metrics(G):
+def build_spine(G):
+    """Reduce the DAG to what actually happened, for reachability.
+
+    Counterfactual nodes are dropped. Background conditions (conditions
+    nothing in the story brings about) only count as support for nodes with
+    no other actual parent: otherwise every node fed by one (Franklin's
+    anxiety, Rachel being awake) would stay reachable however much of the
+    story upstream was removed.
+    """
+    actual = [n for n, d in G.nodes(data=True) if d.get("actual") == "True"]
+    spine = G.subgraph(actual).copy()
+    background = {n for n in actual
+                  if spine.nodes[n]["node_type"] == "condition" and spine.in_degree(n) == 0}
+
+    for node in actual:
+        parents = list(spine.predecessors(node))
+        if any(p not in background for p in parents):
+            spine.remove_edges_from((p, node) for p in parents if p in background)
+
+    return spine
+
+
+def build_dominator_index(spine):
+    """Precompute the dominator tree of the spine as pre-order intervals.
+
+    A virtual root feeds every root of the spine. A node X dominates Y when
+    every path from the roots to Y passes through X, so removing X leaves
+    exactly X's dominator-tree descendants unreachable. Each node gets a
+    [start, end) slice of the pre-order, making a block query a slice.
+    """
+    root = "__root__"
+    G = spine.copy()
+    G.add_edges_from((root, n) for n in spine.nodes if spine.in_degree(n) == 0)
+
+    idom = nx.immediate_dominators(G, root)
+    children = {n: [] for n in G.nodes}
+    for node, dom in idom.items():
+        if node != root:
+            children[dom].append(node)
+
+    # Children in topological order so each slice reads in story order
+    topo = {n: i for i, n in enumerate(nx.topological_sort(G))}
+    order, intervals = [], {}
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            intervals[node] = (intervals[node], len(order))
+            continue
+        intervals[node] = len(order)
+        order.append(node)
+        stack.append((node, True))
+        for child in sorted(children[node], key=topo.get, reverse=True):
+            stack.append((child, False))
+
+    return {
+        "order": order,
+        "intervals": {n: iv for n, iv in intervals.items() if n != root},
+        "idom": {n: d for n, d in idom.items() if n != root and d != root},
+    }
+
+
+def blocked_by(index, node):
+    """Nodes that can no longer happen once `node` doesn't."""
+    start, end = index["intervals"][node]
+    return index["order"][start + 1:end]
+
+
+def load_hinge_inventory(output_dir: Path) -> dict:
+    """counterfactuals.json with the edits still in the viewer's journal.
+
+    Replays counterfactuals.journal.jsonl over the snapshot the way the
+    viewer's JsonStore does (entries past journal_seq, torn lines skipped).
+    An inventory kept in SQLite has to be exported to counterfactuals.json
+    first (python viewer/counterfactual_store.py export).
+    """
+    path = output_dir / "counterfactuals.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    hinges = {h["id"]: h for h in data.get("hinges", [])}
+    seq = data.get("journal_seq", 0)
+    journal = output_dir / "counterfactuals.journal.jsonl"
+    lines = journal.read_text().splitlines() if journal.exists() else []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if entry["seq"] <= seq:
+            continue
+        hinge = hinges[entry["hinge_id"]]
+        if entry["op"] == "add":
+            hinge["alternatives"].append(dict(entry["alternative"]))
+        elif entry["op"] == "update":
+            for alt in hinge["alternatives"]:
+                if alt["id"] == entry["alt_id"]:
+                    alt.update(entry["updates"])
+        elif entry["op"] == "delete":
+            hinge["alternatives"] = [a for a in hinge["alternatives"] if a["id"] != entry["alt_id"]]
+    return data
+
+
+def compute_blocked_hinges(G, counterfactuals):
+    """Blocked nodes for every spine node, checked against authored blocks.
+
+    `counterfactuals` is the hinge inventory (load_hinge_inventory). Each
+    alternative is treated as its hinge not happening; `missing` lists
+    hinges the DAG says it blocks that the author didn't, `unexplained`
+    lists authored blocks the DAG can't derive.
+    """
+    index = build_dominator_index(build_spine(G))
+    hinge_ids = {n for n, d in G.nodes(data=True) if d.get("hinge") == "True"}
+    blocks = {n: blocked_by(index, n) for n in index["intervals"]}
+
+    alternatives = []
+    for hinge in counterfactuals.get("hinges", []):
+        computed = [n for n in blocks.get(hinge["id"], []) if n in hinge_ids]
+        for alt in hinge.get("alternatives", []):
+            authored = alt.get("blocks", [])
+            missing = [n for n in computed if n not in authored]
+            unexplained = [n for n in authored if n not in computed]
+            if missing or unexplained:
+                alternatives.append({
+                    "hinge": hinge["id"],
+                    "alternative": alt["id"],
+                    "missing": missing,
+                    "unexplained": unexplained,
+                })
+
+    return {
+        "blocks": blocks,
+        "blocked_hinges": {n: [b for b in blocked if b in hinge_ids]
+                           for n, blocked in blocks.items()},
+        "dominator": index["idom"],
+        "mismatches": alternatives,
+    }
+
+
+def chain_factors(bn) -> tuple:
+    """The story's chain: actual-path story nodes (no conditions) in
+    topological order, with the p_actual the network uses for each.
+
+    compute_narrative_metrics scores this chain and sensitivity.py
+    differentiates it, so both see the same nodes and probabilities.
+    """
+    order = [bn.variable(i).name() for i in bn.topologicalOrder()]
+    nodes = [n for n in order if NODES[n]["actual"] and NODES[n]["type"] != "condition"]
+    return nodes, [network_p_actual(bn, n) for n in nodes]
+
+
+def compute_narrative_metrics(G, bn=None):
     """Compute metrics about the narrative structure."""
     actual_path = [n for n, d in G.nodes(data=True) if d.get("actual") == "True"]
     counterfactual_nodes = [n for n, d in G.nodes(data=True) if d.get("node_type") == "counterfactual"]
     hinge_nodes = [n for n, d in G.nodes(data=True) if d.get("hinge") == "True"]
 
-    # Chain probability of actual path
-    p_chain = 1.0
-    for node in actual_path:
-        data = G.nodes[node]
-        if "p_actual" in data:
-            p_chain *= data["p_actual"]
+    # Chain probability of actual path, scored in log space along the
+    # story's topological order
+    _, factors = chain_factors(bn or build_bayesian_network())
+    chain = score_chain(factors)
 
     return {
         "total_nodes": G.number_of_nodes(),
@@ -484,7 +711,9 @@ def compute_narrative_metrics(G):
         "counterfactual_nodes": len(counterfactual_nodes),
         "hinge_points": len(hinge_nodes),
         "total_edges": G.number_of_edges(),
-        "chain_probability": p_chain,
+        "chain_probability": 10 ** chain["log10_probability"],
+        "chain_probability_log10": chain["log10_probability"],
+        "chain_surprise_bits": chain["surprise_bits"],
         "hinge_point_list": hinge_nodes,
     }
 
@@ -520,11 +749,22 @@ def export_model(output_dir: Path):
     except Exception as e:
         print(f"Warning: Bayesian Network issue: {e}")
 
+    # Index counterfactual branches by the hinge they branch from
+    branch_index = build_branch_index(G)
+    with open(output_dir / "branch_index.json", "w") as f:
+        json.dump(branch_index, f, indent=2)
+
     # Identify hinge points
-    hinges = identify_hinge_points()
+    hinges = identify_hinge_points(branch_index)
     with open(output_dir / "hinge_points.json", "w") as f:
         json.dump(hinges, f, indent=2)
 
+    # Precompute what each hinge blocks
+    counterfactuals = load_hinge_inventory(output_dir)
+    blocked = compute_blocked_hinges(G, counterfactuals)
+    with open(output_dir / "blocked_hinges.json", "w") as f:
+        json.dump(blocked, f, indent=2)
+
     # Compute metrics
     metrics = compute_narrative_metrics(G)
     with open(output_dir / "counterfactual_metrics.json", "w") as f:
@@ -533,6 +773,7 @@ def export_model(output_dir: Path):
     print(f"\nCounterfactual DAG: {metrics['total_nodes']} nodes, {metrics['total_edges']} edges")
     print(f"Hinge points: {metrics['hinge_points']}")
     print(f"Counterfactual branches: {metrics['counterfactual_nodes']}")
+    print(f"Authored blocks disagreeing with the DAG: {len(blocked['mismatches'])} alternatives")
     print(f"\nMost contingent hinges (lowest P):")
     for h in hinges[:3]:
         print(f"  - {h['description']} (P={h['p_actual']})")
@@ -13,6 +13,7 @@ Output formats:
 import json
 import csv
 import networkx as nx
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -82,50 +83,22 @@ NARRATORS = [
     "murthwaite",         # Mr. Murthwaite (epilogue)
 ]
 
-# Coverage matrix: narrator -> event -> coverage_type
+# Integer code of each coverage type; not_covered is 0 so only covered
+# cells need storing
+COVERAGE_CODES = ["not_covered", "direct", "hearsay", "retrospective", "inferred"]
+
+# Edge weight of each coverage type in the bipartite graph
+COVERAGE_WEIGHTS = {
+    "direct": 1.0,
+    "hearsay": 0.7,
+    "retrospective": 0.5,
+    "inferred": 0.3
+}
+
+# Coverage matrix: narrator -> event -> coverage_type (absent means not_covered)
 COVERAGE_MATRIX = {
     "prologue_cousin": {
         "prologue_theft": "direct",
-        "indians_appear": "not_covered",
-        "birthday_dinner": "not_covered",
-        "murthwaite_warning": "not_covered",
-        "diamond_to_rachel": "not_covered",
-        "paint_door_discussion": "not_covered",
-        "franklin_restless_night": "not_covered",
-        "candy_doses_franklin": "not_covered",
-        "franklin_takes_diamond": "not_covered",
-        "rachel_witnesses_theft": "not_covered",
-        "godfrey_takes_from_franklin": "not_covered",
-        "discovery_morning": "not_covered",
-        "seegrave_investigation": "not_covered",
-        "cuff_arrives": "not_covered",
-        "rosanna_suspicious_behavior": "not_covered",
-        "cuff_paint_analysis": "not_covered",
-        "rosanna_shivering_sand_trips": "not_covered",
-        "godfrey_to_london": "not_covered",
-        "rachel_refuses_search": "not_covered",
-        "cuff_theory_rachel": "not_covered",
-        "rosanna_suicide": "not_covered",
-        "cuff_withdraws": "not_covered",
-        "franklin_departs": "not_covered",
-        "indians_attack_godfrey": "not_covered",
-        "indians_attack_luker": "not_covered",
-        "lady_verinder_death": "not_covered",
-        "godfrey_proposes_rachel": "not_covered",
-        "rachel_breaks_engagement": "not_covered",
-        "franklin_returns": "not_covered",
-        "nightgown_discovery": "not_covered",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
-        "jennings_reconstruction": "not_covered",
-        "opium_experiment": "not_covered",
-        "rachel_watches_experiment": "not_covered",
-        "franklin_reenacts": "not_covered",
-        "reconciliation": "not_covered",
-        "godfrey_reclaims_diamond": "not_covered",
-        "godfrey_murdered": "not_covered",
-        "godfrey_exposed": "not_covered",
-        "diamond_returns_india": "not_covered",
     },
     "betteredge": {
         "prologue_theft": "hearsay",
@@ -135,10 +108,6 @@ COVERAGE_MATRIX = {
         "diamond_to_rachel": "direct",
         "paint_door_discussion": "direct",
         "franklin_restless_night": "inferred",
-        "candy_doses_franklin": "not_covered",
-        "franklin_takes_diamond": "not_covered",
-        "rachel_witnesses_theft": "not_covered",
-        "godfrey_takes_from_franklin": "not_covered",
         "discovery_morning": "direct",
         "seegrave_investigation": "direct",
         "cuff_arrives": "direct",
@@ -151,110 +120,23 @@ COVERAGE_MATRIX = {
         "rosanna_suicide": "direct",
         "cuff_withdraws": "direct",
         "franklin_departs": "direct",
-        "indians_attack_godfrey": "not_covered",
-        "indians_attack_luker": "not_covered",
-        "lady_verinder_death": "not_covered",
-        "godfrey_proposes_rachel": "not_covered",
-        "rachel_breaks_engagement": "not_covered",
-        "franklin_returns": "not_covered",
-        "nightgown_discovery": "not_covered",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
-        "jennings_reconstruction": "not_covered",
-        "opium_experiment": "not_covered",
-        "rachel_watches_experiment": "not_covered",
-        "franklin_reenacts": "not_covered",
-        "reconciliation": "not_covered",
-        "godfrey_reclaims_diamond": "not_covered",
-        "godfrey_murdered": "not_covered",
-        "godfrey_exposed": "not_covered",
-        "diamond_returns_india": "not_covered",
     },
     "miss_clack": {
-        "prologue_theft": "not_covered",
-        "indians_appear": "not_covered",
-        "birthday_dinner": "not_covered",
-        "murthwaite_warning": "not_covered",
-        "diamond_to_rachel": "not_covered",
-        "paint_door_discussion": "not_covered",
-        "franklin_restless_night": "not_covered",
-        "candy_doses_franklin": "not_covered",
-        "franklin_takes_diamond": "not_covered",
-        "rachel_witnesses_theft": "not_covered",
-        "godfrey_takes_from_franklin": "not_covered",
-        "discovery_morning": "not_covered",
-        "seegrave_investigation": "not_covered",
-        "cuff_arrives": "not_covered",
-        "rosanna_suspicious_behavior": "not_covered",
-        "cuff_paint_analysis": "not_covered",
-        "rosanna_shivering_sand_trips": "not_covered",
-        "godfrey_to_london": "not_covered",
-        "rachel_refuses_search": "not_covered",
-        "cuff_theory_rachel": "not_covered",
-        "rosanna_suicide": "not_covered",
-        "cuff_withdraws": "not_covered",
-        "franklin_departs": "not_covered",
         "indians_attack_godfrey": "hearsay",
         "indians_attack_luker": "hearsay",
         "lady_verinder_death": "direct",
         "godfrey_proposes_rachel": "direct",
         "rachel_breaks_engagement": "direct",
-        "franklin_returns": "not_covered",
-        "nightgown_discovery": "not_covered",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
-        "jennings_reconstruction": "not_covered",
-        "opium_experiment": "not_covered",
-        "rachel_watches_experiment": "not_covered",
-        "franklin_reenacts": "not_covered",
-        "reconciliation": "not_covered",
-        "godfrey_reclaims_diamond": "not_covered",
-        "godfrey_murdered": "not_covered",
-        "godfrey_exposed": "not_covered",
-        "diamond_returns_india": "not_covered",
     },
     "bruff": {
-        "prologue_theft": "not_covered",
-        "indians_appear": "not_covered",
-        "birthday_dinner": "not_covered",
-        "murthwaite_warning": "not_covered",
-        "diamond_to_rachel": "not_covered",
-        "paint_door_discussion": "not_covered",
-        "franklin_restless_night": "not_covered",
-        "candy_doses_franklin": "not_covered",
-        "franklin_takes_diamond": "not_covered",
-        "rachel_witnesses_theft": "not_covered",
-        "godfrey_takes_from_franklin": "not_covered",
-        "discovery_morning": "not_covered",
-        "seegrave_investigation": "not_covered",
-        "cuff_arrives": "not_covered",
-        "rosanna_suspicious_behavior": "not_covered",
-        "cuff_paint_analysis": "not_covered",
-        "rosanna_shivering_sand_trips": "not_covered",
         "godfrey_to_london": "retrospective",
-        "rachel_refuses_search": "not_covered",
-        "cuff_theory_rachel": "not_covered",
-        "rosanna_suicide": "not_covered",
-        "cuff_withdraws": "not_covered",
-        "franklin_departs": "not_covered",
         "indians_attack_godfrey": "hearsay",
         "indians_attack_luker": "hearsay",
         "lady_verinder_death": "hearsay",
         "godfrey_proposes_rachel": "hearsay",
         "rachel_breaks_engagement": "hearsay",
         "franklin_returns": "direct",
-        "nightgown_discovery": "not_covered",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
-        "jennings_reconstruction": "not_covered",
-        "opium_experiment": "not_covered",
-        "rachel_watches_experiment": "not_covered",
-        "franklin_reenacts": "not_covered",
-        "reconciliation": "not_covered",
-        "godfrey_reclaims_diamond": "not_covered",
-        "godfrey_murdered": "not_covered",
         "godfrey_exposed": "retrospective",
-        "diamond_returns_india": "not_covered",
     },
     "franklin_blake": {
         "prologue_theft": "hearsay",
@@ -274,7 +156,6 @@ COVERAGE_MATRIX = {
         "rosanna_suspicious_behavior": "retrospective",
         "cuff_paint_analysis": "retrospective",
         "rosanna_shivering_sand_trips": "retrospective",
-        "godfrey_to_london": "not_covered",
         "rachel_refuses_search": "retrospective",
         "cuff_theory_rachel": "retrospective",
         "rosanna_suicide": "retrospective",
@@ -297,50 +178,19 @@ COVERAGE_MATRIX = {
         "godfrey_reclaims_diamond": "hearsay",
         "godfrey_murdered": "hearsay",
         "godfrey_exposed": "hearsay",
-        "diamond_returns_india": "not_covered",
     },
     "ezra_jennings": {
-        "prologue_theft": "not_covered",
-        "indians_appear": "not_covered",
         "birthday_dinner": "hearsay",
-        "murthwaite_warning": "not_covered",
-        "diamond_to_rachel": "not_covered",
-        "paint_door_discussion": "not_covered",
         "franklin_restless_night": "inferred",
         "candy_doses_franklin": "inferred",  # He reconstructs this
         "franklin_takes_diamond": "inferred",
-        "rachel_witnesses_theft": "not_covered",
-        "godfrey_takes_from_franklin": "not_covered",
-        "discovery_morning": "not_covered",
-        "seegrave_investigation": "not_covered",
-        "cuff_arrives": "not_covered",
-        "rosanna_suspicious_behavior": "not_covered",
-        "cuff_paint_analysis": "not_covered",
-        "rosanna_shivering_sand_trips": "not_covered",
-        "godfrey_to_london": "not_covered",
-        "rachel_refuses_search": "not_covered",
-        "cuff_theory_rachel": "not_covered",
-        "rosanna_suicide": "not_covered",
-        "cuff_withdraws": "not_covered",
-        "franklin_departs": "not_covered",
-        "indians_attack_godfrey": "not_covered",
-        "indians_attack_luker": "not_covered",
-        "lady_verinder_death": "not_covered",
-        "godfrey_proposes_rachel": "not_covered",
-        "rachel_breaks_engagement": "not_covered",
         "franklin_returns": "direct",
         "nightgown_discovery": "hearsay",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
         "jennings_reconstruction": "direct",
         "opium_experiment": "direct",
         "rachel_watches_experiment": "direct",
         "franklin_reenacts": "direct",
         "reconciliation": "direct",
-        "godfrey_reclaims_diamond": "not_covered",
-        "godfrey_murdered": "not_covered",
-        "godfrey_exposed": "not_covered",
-        "diamond_returns_india": "not_covered",
     },
     "sergeant_cuff": {
         "prologue_theft": "hearsay",
@@ -349,7 +199,6 @@ COVERAGE_MATRIX = {
         "murthwaite_warning": "hearsay",
         "diamond_to_rachel": "hearsay",
         "paint_door_discussion": "hearsay",
-        "franklin_restless_night": "not_covered",
         "candy_doses_franklin": "retrospective",
         "franklin_takes_diamond": "retrospective",
         "rachel_witnesses_theft": "retrospective",
@@ -373,17 +222,13 @@ COVERAGE_MATRIX = {
         "rachel_breaks_engagement": "hearsay",
         "franklin_returns": "hearsay",
         "nightgown_discovery": "hearsay",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
         "jennings_reconstruction": "hearsay",
         "opium_experiment": "hearsay",
-        "rachel_watches_experiment": "not_covered",
         "franklin_reenacts": "hearsay",
         "reconciliation": "hearsay",
         "godfrey_reclaims_diamond": "direct",
         "godfrey_murdered": "direct",
         "godfrey_exposed": "direct",
-        "diamond_returns_india": "not_covered",
     },
     "murthwaite": {
         "prologue_theft": "hearsay",
@@ -391,39 +236,6 @@ COVERAGE_MATRIX = {
         "birthday_dinner": "direct",
         "murthwaite_warning": "direct",
         "diamond_to_rachel": "direct",
-        "paint_door_discussion": "not_covered",
-        "franklin_restless_night": "not_covered",
-        "candy_doses_franklin": "not_covered",
-        "franklin_takes_diamond": "not_covered",
-        "rachel_witnesses_theft": "not_covered",
-        "godfrey_takes_from_franklin": "not_covered",
-        "discovery_morning": "not_covered",
-        "seegrave_investigation": "not_covered",
-        "cuff_arrives": "not_covered",
-        "rosanna_suspicious_behavior": "not_covered",
-        "cuff_paint_analysis": "not_covered",
-        "rosanna_shivering_sand_trips": "not_covered",
-        "godfrey_to_london": "not_covered",
-        "rachel_refuses_search": "not_covered",
-        "cuff_theory_rachel": "not_covered",
-        "rosanna_suicide": "not_covered",
-        "cuff_withdraws": "not_covered",
-        "franklin_departs": "not_covered",
-        "indians_attack_godfrey": "not_covered",
-        "indians_attack_luker": "not_covered",
-        "lady_verinder_death": "not_covered",
-        "godfrey_proposes_rachel": "not_covered",
-        "rachel_breaks_engagement": "not_covered",
-        "franklin_returns": "not_covered",
-        "nightgown_discovery": "not_covered",
-        "limping_lucy_letter": "not_covered",
-        "franklin_reads_letter": "not_covered",
-        "jennings_reconstruction": "not_covered",
-        "opium_experiment": "not_covered",
-        "rachel_watches_experiment": "not_covered",
-        "franklin_reenacts": "not_covered",
-        "reconciliation": "not_covered",
-        "godfrey_reclaims_diamond": "not_covered",
         "godfrey_murdered": "hearsay",
         "godfrey_exposed": "hearsay",
         "diamond_returns_india": "direct",
@@ -431,19 +243,90 @@ COVERAGE_MATRIX = {
 }
 
 
-def build_coverage_dataframe():
+def build_coverage_index(matrix=COVERAGE_MATRIX):
+    """Integer-coded coverage matrix with row and column aggregates.
+
+    `cells` holds the covered cells as parallel (narrator, event, code)
+    arrays, with int32 positions and uint8 codes into COVERAGE_CODES.
+    `by_event` and `by_narrator` count each coverage type per event and per
+    narrator, not_covered included.
+    """
+    narrator_index = {n: i for i, n in enumerate(NARRATORS)}
+    event_index = {e: j for j, e in enumerate(EVENTS)}
+    code = {c: k for k, c in enumerate(COVERAGE_CODES)}
+    triples = [(narrator_index[n], event_index[e], code[c])
+               for n, row in matrix.items() for e, c in row.items() if c != "not_covered"]
+    rows, cols, codes = zip(*triples)
+    rows, cols = np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32)
+    codes = np.array(codes, dtype=np.uint8)
+
+    # Count (position, code) pairs straight from the cells; whatever isn't
+    # covered is not_covered
+    k = len(COVERAGE_CODES)
+    by_event = np.bincount(cols * k + codes, minlength=len(EVENTS) * k).reshape(len(EVENTS), k)
+    by_narrator = np.bincount(rows * k + codes, minlength=len(NARRATORS) * k).reshape(len(NARRATORS), k)
+    by_event[:, 0] = len(NARRATORS) - by_event[:, 1:].sum(axis=1)
+    by_narrator[:, 0] = len(EVENTS) - by_narrator[:, 1:].sum(axis=1)
+    return {
+        "narrators": NARRATORS,
+        "events": EVENTS,
+        "codes": COVERAGE_CODES,
+        "cells": {"narrator": rows, "event": cols, "coverage": codes},
+        "by_event": by_event,
+        "by_narrator": by_narrator,
+    }
+
+
+def dense_coverage(index):
+    """The coverage matrix dense, narrators x events, as uint8 codes."""
+    cells = index["cells"]
+    coverage = np.zeros((len(index["narrators"]), len(index["events"])), dtype=np.uint8)
+    coverage[cells["narrator"], cells["event"]] = cells["coverage"]
+    return coverage
+
+
+def covered_counts(index, axis="event"):
+    """Number of narrators covering each event (or events each narrator covers)."""
+    counts = index["by_event"] if axis == "event" else index["by_narrator"]
+    return counts[:, 1:].sum(axis=1)
+
+
+def events_covered_only_by(index, coverage="hearsay"):
+    """Events that are covered, but only ever as `coverage`."""
+    counts = index["by_event"][:, COVERAGE_CODES.index(coverage)]
+    mask = (counts > 0) & (counts == covered_counts(index))
+    return [index["events"][j] for j in np.flatnonzero(mask)]
+
+
+def narrators_covering(index, event, coverage="direct"):
+    """Narrators whose coverage of `event` is `coverage`."""
+    cells = index["cells"]
+    mask = ((cells["event"] == index["events"].index(event))
+            & (cells["coverage"] == COVERAGE_CODES.index(coverage)))
+    return [index["narrators"][i] for i in np.sort(cells["narrator"][mask])]
+
+
+def coverage_histogram(index, axis=None):
+    """Cells of each coverage type: overall, or per "event" or "narrator"."""
+    if axis is None:
+        return dict(zip(COVERAGE_CODES, index["by_event"].sum(axis=0).tolist()))
+    counts, names = ((index["by_event"], index["events"]) if axis == "event"
+                     else (index["by_narrator"], index["narrators"]))
+    return {name: dict(zip(COVERAGE_CODES, row)) for name, row in zip(names, counts.tolist())}
+
+
+def build_coverage_dataframe(index=None):
     """Build pandas DataFrame of the coverage matrix."""
-    data = []
-    for narrator in NARRATORS:
-        row = {"narrator": narrator}
-        for event in EVENTS:
-            row[event] = COVERAGE_MATRIX.get(narrator, {}).get(event, "not_covered")
-        data.append(row)
-    return pd.DataFrame(data)
+    index = index or build_coverage_index()
+    names = np.array(COVERAGE_CODES)[dense_coverage(index)]
+    df = pd.DataFrame(names, columns=EVENTS)
+    df.insert(0, "narrator", NARRATORS)
+    return df
 
 
-def build_bipartite_graph():
+def build_bipartite_graph(index=None):
     """Build bipartite graph: Narrators <-> Events with coverage type as edge attribute."""
+    index = index or build_coverage_index()
     G = nx.Graph()
 
     # Add narrator nodes
@@ -454,70 +337,40 @@ def build_bipartite_graph():
     for event in EVENTS:
         G.add_node(f"event:{event}", node_type="event", label=event)
 
-    # Add edges for non-trivial coverage
-    for narrator in NARRATORS:
-        for event in EVENTS:
-            coverage = COVERAGE_MATRIX.get(narrator, {}).get(event, "not_covered")
-            if coverage != "not_covered":
-                weight = {
-                    "direct": 1.0,
-                    "hearsay": 0.7,
-                    "retrospective": 0.5,
-                    "inferred": 0.3
-                }.get(coverage, 0.0)
-
-                G.add_edge(f"narrator:{narrator}", f"event:{event}",
-                          coverage_type=coverage,
-                          weight=weight)
+    # Add edges for non-trivial coverage, in matrix order
+    dense = dense_coverage(index)
+    rows, cols = np.nonzero(dense)
+    for i, j in zip(rows, cols):
+        coverage = COVERAGE_CODES[dense[i, j]]
+        G.add_edge(f"narrator:{NARRATORS[i]}", f"event:{EVENTS[j]}",
+                   coverage_type=coverage,
+                   weight=COVERAGE_WEIGHTS[coverage])
 
     return G
 
 
-def analyze_coverage(df):
+def analyze_coverage(index):
     """Analyze the coverage matrix for gaps and redundancies."""
-    analysis = {
-        "events_by_coverage_count": {},
-        "narrators_by_coverage_count": {},
-        "uncovered_events": [],
-        "single_source_events": [],
-        "multi_perspective_events": [],
-        "coverage_type_distribution": {},
+    event_counts = covered_counts(index, "event")
+    histogram = coverage_histogram(index)
+    return {
+        "events_by_coverage_count": dict(zip(EVENTS, event_counts.tolist())),
+        "narrators_by_coverage_count": dict(zip(NARRATORS, covered_counts(index, "narrator").tolist())),
+        "uncovered_events": [EVENTS[j] for j in np.flatnonzero(event_counts == 0)],
+        "single_source_events": [EVENTS[j] for j in np.flatnonzero(event_counts == 1)],
+        "multi_perspective_events": [EVENTS[j] for j in np.flatnonzero(event_counts >= 3)],
+        "coverage_type_distribution": {t: histogram[t] for t in COVERAGE_TYPES},
+        "hearsay_only_events": events_covered_only_by(index, "hearsay"),
     }
 
-    # Count coverage per event
-    for event in EVENTS:
-        coverage_count = sum(1 for narrator in NARRATORS
-                            if COVERAGE_MATRIX.get(narrator, {}).get(event, "not_covered") != "not_covered")
-        analysis["events_by_coverage_count"][event] = coverage_count
-
-        if coverage_count == 0:
-            analysis["uncovered_events"].append(event)
-        elif coverage_count == 1:
-            analysis["single_source_events"].append(event)
-        elif coverage_count >= 3:
-            analysis["multi_perspective_events"].append(event)
-
-    # Count coverage per narrator
-    for narrator in NARRATORS:
-        coverage_count = sum(1 for event in EVENTS
-                            if COVERAGE_MATRIX.get(narrator, {}).get(event, "not_covered") != "not_covered")
-        analysis["narrators_by_coverage_count"][narrator] = coverage_count
-
-    # Coverage type distribution
-    for coverage_type in COVERAGE_TYPES.keys():
-        count = sum(1 for narrator in NARRATORS for event in EVENTS
-                   if COVERAGE_MATRIX.get(narrator, {}).get(event) == coverage_type)
-        analysis["coverage_type_distribution"][coverage_type] = count
-
-    return analysis
-
 
 def export_matrix(output_dir: Path):
     """Export the coverage matrix in multiple formats."""
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Build DataFrame
-    df = build_coverage_dataframe()
+    # Build the coded matrix and DataFrame
+    index = build_coverage_index()
+    df = build_coverage_dataframe(index)
 
     # Export CSV
     df.to_csv(output_dir / "event_perspective_matrix.csv", index=False)
@@ -528,22 +381,24 @@ def export_matrix(output_dir: Path):
     df_t.to_csv(output_dir / "event_perspective_matrix_transposed.csv")
 
     # Export JSON
+    cells = index["cells"]
     matrix_json = {
         "narrators": NARRATORS,
         "events": EVENTS,
         "coverage_types": COVERAGE_TYPES,
-        "matrix": COVERAGE_MATRIX
+        "coverage_codes": COVERAGE_CODES,
+        "cells": {name: a.tolist() for name, a in cells.items()},
     }
     with open(output_dir / "event_perspective_matrix.json", "w") as f:
         json.dump(matrix_json, f, indent=2)
 
     # Build and export bipartite graph
-    G = build_bipartite_graph()
+    G = build_bipartite_graph(index)
     nx.write_graphml(G, output_dir / "event_perspective_bipartite.graphml")
     nx.write_gexf(G, output_dir / "event_perspective_bipartite.gexf")
 
     # Analyze and export analysis
-    analysis = analyze_coverage(df)
+    analysis = analyze_coverage(index)
     with open(output_dir / "event_perspective_analysis.json", "w") as f:
         json.dump(analysis, f, indent=2)
 
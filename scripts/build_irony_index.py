@@ -0,0 +1,194 @@
+"""
+Dramatic Irony Index for The Moonstone
+
+For every segment of the novel (the events of the event-perspective matrix,
+in story order) records what the reader has been told so far and what each
+character present knows at that point in the TIMELINE, and the gap between
+them in both directions:
+
+- irony: facts the reader knows that the character doesn't
+- mystery: facts the character knows that the reader hasn't been told
+
+Knowledge is taken from the knowledge graph's per-step bitsets, so each
+segment is a popcount over packed rows rather than a walk of the nested
+knowledge dicts. The result is exported as segment x character matrices
+(-1 where the character isn't in the scene) with the reveal and
+acquisition steps needed to recover which facts make up each gap.
+
+Output:
+- irony_index.json
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from build_event_perspective_matrix import EVENTS
+from build_knowledge_state_graph import FACTS, KNOWLEDGE_STATES, TIMELINE
+from knowledge_index import NEVER, build_knowledge_index, popcount
+
+# Segment at which the reader is first told each fact
+READER_LEARNS = {
+    "diamond_curse": "prologue_theft",
+    "indians_are_brahmins": "murthwaite_warning",
+    "paint_wet": "cuff_paint_analysis",
+    "franklin_entered_room": "nightgown_discovery",
+    "franklin_drugged": "jennings_reconstruction",
+    "franklin_unconscious": "jennings_reconstruction",
+    "nightgown_stained": "nightgown_discovery",
+    "rosanna_hid_nightgown": "nightgown_discovery",
+    "rosanna_loves_franklin": "franklin_reads_letter",
+    "godfrey_took_diamond": "godfrey_exposed",
+    "godfrey_embezzled": "godfrey_exposed",
+    "diamond_at_luker": "godfrey_exposed",
+    "rachel_witnessed": "franklin_reads_letter",  # Rachel's confrontation follows the letter
+}
+
+# Where each segment falls in the knowledge TIMELINE
+SEGMENT_STEPS = {
+    "prologue_theft": "before_birthday",
+    "indians_appear": "before_birthday",
+    "birthday_dinner": "birthday_dinner",
+    "murthwaite_warning": "birthday_dinner",
+    "diamond_to_rachel": "birthday_dinner",
+    "paint_door_discussion": "birthday_dinner",
+    "franklin_restless_night": "june_21_night",
+    "candy_doses_franklin": "june_21_night",
+    "franklin_takes_diamond": "june_21_night",
+    "rachel_witnesses_theft": "june_21_night",
+    "godfrey_takes_from_franklin": "june_21_night",
+    "discovery_morning": "june_22_morning",
+    "seegrave_investigation": "june_22",
+    "cuff_arrives": "june_23",
+    "rosanna_suspicious_behavior": "june_23",
+    "cuff_paint_analysis": "june_23",
+    "rosanna_shivering_sand_trips": "june_23",
+    "godfrey_to_london": "june_23",
+    "rachel_refuses_search": "investigation_start",
+    "cuff_theory_rachel": "investigation",
+    "rosanna_suicide": "investigation",
+    "cuff_withdraws": "resolution_1848",
+    "franklin_departs": "resolution_1848",
+    "indians_attack_godfrey": "resolution_1848",
+    "indians_attack_luker": "resolution_1848",
+    "lady_verinder_death": "resolution_1848",
+    "godfrey_proposes_rachel": "resolution_1848",
+    "rachel_breaks_engagement": "resolution_1848",
+    "franklin_returns": "1849",
+    "nightgown_discovery": "june_1849_shivering_sand",
+    "limping_lucy_letter": "june_1849_letter",
+    "franklin_reads_letter": "june_1849_letter",
+    "jennings_reconstruction": "reconstruction",
+    "opium_experiment": "opium_experiment",
+    "rachel_watches_experiment": "opium_experiment",
+    "franklin_reenacts": "opium_experiment",
+    "reconciliation": "opium_experiment",
+    "godfrey_reclaims_diamond": "opium_experiment",
+    "godfrey_murdered": "opium_experiment",
+    "godfrey_exposed": "final_report",
+    "diamond_returns_india": "resolution",
+}
+
+# Characters (as named in the knowledge graph) present in each segment
+SCENE_CAST = {
+    "prologue_theft": [],
+    "indians_appear": ["Gabriel Betteredge"],
+    "birthday_dinner": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder",
+                        "Godfrey Ablewhite", "Dr. Candy"],
+    "murthwaite_warning": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder"],
+    "diamond_to_rachel": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder", "Godfrey Ablewhite"],
+    "paint_door_discussion": ["Franklin Blake", "Rachel Verinder"],
+    "franklin_restless_night": ["Franklin Blake"],
+    "candy_doses_franklin": ["Dr. Candy", "Franklin Blake"],
+    "franklin_takes_diamond": ["Franklin Blake"],
+    "rachel_witnesses_theft": ["Rachel Verinder", "Franklin Blake"],
+    "godfrey_takes_from_franklin": ["Godfrey Ablewhite", "Franklin Blake"],
+    "discovery_morning": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder",
+                          "Godfrey Ablewhite", "Rosanna Spearman"],
+    "seegrave_investigation": ["Gabriel Betteredge", "Franklin Blake", "Rosanna Spearman"],
+    "cuff_arrives": ["Sergeant Cuff", "Gabriel Betteredge", "Franklin Blake"],
+    "rosanna_suspicious_behavior": ["Rosanna Spearman", "Gabriel Betteredge", "Franklin Blake"],
+    "cuff_paint_analysis": ["Sergeant Cuff", "Gabriel Betteredge"],
+    "rosanna_shivering_sand_trips": ["Rosanna Spearman", "Sergeant Cuff"],
+    "godfrey_to_london": ["Godfrey Ablewhite"],
+    "rachel_refuses_search": ["Rachel Verinder", "Sergeant Cuff", "Gabriel Betteredge"],
+    "cuff_theory_rachel": ["Sergeant Cuff", "Gabriel Betteredge"],
+    "rosanna_suicide": ["Rosanna Spearman", "Sergeant Cuff", "Gabriel Betteredge"],
+    "cuff_withdraws": ["Sergeant Cuff", "Gabriel Betteredge"],
+    "franklin_departs": ["Franklin Blake"],
+    "indians_attack_godfrey": ["Godfrey Ablewhite"],
+    "indians_attack_luker": [],
+    "lady_verinder_death": ["Rachel Verinder"],
+    "godfrey_proposes_rachel": ["Godfrey Ablewhite", "Rachel Verinder"],
+    "rachel_breaks_engagement": ["Rachel Verinder", "Godfrey Ablewhite"],
+    "franklin_returns": ["Franklin Blake", "Gabriel Betteredge"],
+    "nightgown_discovery": ["Franklin Blake", "Gabriel Betteredge"],
+    "limping_lucy_letter": ["Franklin Blake", "Gabriel Betteredge"],
+    "franklin_reads_letter": ["Franklin Blake", "Gabriel Betteredge"],
+    "jennings_reconstruction": ["Ezra Jennings", "Franklin Blake", "Dr. Candy"],
+    "opium_experiment": ["Franklin Blake", "Ezra Jennings", "Gabriel Betteredge"],
+    "rachel_watches_experiment": ["Rachel Verinder", "Franklin Blake", "Ezra Jennings"],
+    "franklin_reenacts": ["Franklin Blake", "Rachel Verinder", "Ezra Jennings", "Gabriel Betteredge"],
+    "reconciliation": ["Rachel Verinder", "Franklin Blake"],
+    "godfrey_reclaims_diamond": ["Godfrey Ablewhite"],
+    "godfrey_murdered": ["Godfrey Ablewhite"],
+    "godfrey_exposed": ["Sergeant Cuff", "Franklin Blake"],
+    "diamond_returns_india": [],
+}
+
+
+def build_irony_index(segments=EVENTS) -> dict:
+    """Reader-vs-character knowledge gaps for every segment and character."""
+    index = build_knowledge_index(KNOWLEDGE_STATES, FACTS, TIMELINE)
+    characters, facts, steps = index["characters"], index["facts"], index["steps"]
+    segment_index = {s: k for k, s in enumerate(segments)}
+    person = {c: i for i, c in enumerate(characters)}
+
+    segment_steps = np.array([steps.index(SEGMENT_STEPS[s]) for s in segments])
+    reveals = np.array([segment_index[READER_LEARNS[f]] if f in READER_LEARNS else NEVER
+                        for f in facts])
+    present = np.zeros((len(segments), len(characters)), dtype=bool)
+    for s, segment in enumerate(segments):
+        present[s, [person[c] for c in SCENE_CAST.get(segment, [])]] = True
+
+    # Packed (segments, bytes) for the reader; (segments, characters, bytes) for the cast
+    reader = np.packbits(reveals[None, :] <= np.arange(len(segments))[:, None], axis=1)
+    knows = index["snapshots"]["knows"][segment_steps]
+
+    irony = popcount(reader[:, None, :] & ~knows)
+    mystery = popcount(knows & ~reader[:, None, :])
+    acquired = index["acquired"]["knows"]
+
+    return {
+        "segments": list(segments),
+        "characters": characters,
+        "facts": facts,
+        "segment_steps": [steps[k] for k in segment_steps],
+        "reveal_segment": [int(r) if r != NEVER else -1 for r in reveals],
+        "acquired_step": np.where(acquired == NEVER, -1, acquired).tolist(),
+        "step_ordinals": segment_steps.tolist(),
+        "reader_known": popcount(reader).tolist(),
+        "irony": np.where(present, irony, -1).tolist(),
+        "mystery": np.where(present, mystery, -1).tolist(),
+    }
+
+
+def export_irony_index(output_dir: Path):
+    """Build and export the irony index."""
+    result = build_irony_index()
+    with open(output_dir / "irony_index.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    irony = np.array(result["irony"])
+    s, c = np.unravel_index(irony.argmax(), irony.shape)
+    print(f"Irony index: {len(result['segments'])} segments x {len(result['characters'])} characters")
+    print(f"Widest gap: {result['characters'][c]} at {result['segments'][s]} "
+          f"({irony[s, c]} facts the reader knows)")
+    return result
+
+
+if __name__ == "__main__":
+    output_dir = Path(__file__).parent.parent / "graphs"
+    export_irony_index(output_dir)
+    print(f"\nIrony index exported to {output_dir}")
@@ -12,8 +12,18 @@ Output formats:
 
 import json
 import networkx as nx
+import numpy as np
 from pathlib import Path
 
+from knowledge_index import (
+    STATUSES,
+    NEVER,
+    asymmetry_deltas,
+    build_knowledge_index,
+    exclusive_counts,
+    exclusive_facts,
+)
+
 # Define the key facts that drive the narrative
 FACTS = {
     "diamond_curse": "The Moonstone carries a curse and is pursued by Brahmin guardians",
@@ -231,47 +241,63 @@ def build_knowledge_asymmetry_graph():
     """Build a graph showing knowledge asymmetries between characters."""
     G = nx.DiGraph()
 
-    characters = list(KNOWLEDGE_STATES.keys())
+    index = build_knowledge_index(KNOWLEDGE_STATES, FACTS)
+    characters = index["characters"]
+    char_ids = [char.replace(" ", "_").lower() for char in characters]
 
     # Add character nodes
-    for char in characters:
-        char_id = char.replace(" ", "_").lower()
+    for char, char_id in zip(characters, char_ids):
         G.add_node(char_id, label=char)
 
-    # For each pair, calculate knowledge asymmetry
-    for i, char1 in enumerate(characters):
-        for char2 in characters[i+1:]:
-            char1_id = char1.replace(" ", "_").lower()
-            char2_id = char2.replace(" ", "_").lower()
-
-            # What does char1 know that char2 doesn't?
-            char1_exclusive = []
-            char2_exclusive = []
-
-            for fact_id in FACTS.keys():
-                k1 = KNOWLEDGE_STATES[char1].get(fact_id, ("unknown", None, None))
-                k2 = KNOWLEDGE_STATES[char2].get(fact_id, ("unknown", None, None))
-
-                if k1[0] == "knows" and k2[0] != "knows":
-                    char1_exclusive.append(fact_id)
-                if k2[0] == "knows" and k1[0] != "knows":
-                    char2_exclusive.append(fact_id)
-
-            if char1_exclusive:
-                G.add_edge(char1_id, char2_id,
-                          relationship="KNOWS_MORE",
-                          exclusive_facts=",".join(char1_exclusive),
-                          count=len(char1_exclusive))
-
-            if char2_exclusive:
-                G.add_edge(char2_id, char1_id,
-                          relationship="KNOWS_MORE",
-                          exclusive_facts=",".join(char2_exclusive),
-                          count=len(char2_exclusive))
+    # counts[a, b]: facts a knows that b doesn't, for every pair at once
+    counts = exclusive_counts(index, "knows")
+    for i in range(len(characters)):
+        for j in range(i + 1, len(characters)):
+            for a, b in ((i, j), (j, i)):
+                if counts[a, b]:
+                    G.add_edge(char_ids[a], char_ids[b],
+                              relationship="KNOWS_MORE",
+                              exclusive_facts=",".join(exclusive_facts(index, a, b)),
+                              count=int(counts[a, b]))
 
     return G
 
 
+def build_knowledge_timeline():
+    """Knowledge edges with the step each was acquired, and asymmetry deltas.
+
+    Steps follow TIMELINE; a fact known "always" is held from step 0. The
+    asymmetry deltas give, per step, each ordered pair whose exclusive facts
+    changed and what they are now (empty once the gap closed), so any step's
+    asymmetry graph is the running result of steps 0..k.
+    """
+    index = build_knowledge_index(KNOWLEDGE_STATES, FACTS, TIMELINE)
+    char_ids = [char.replace(" ", "_").lower() for char in index["characters"]]
+
+    knowledge = []
+    for status in STATUSES:
+        acquired = index["acquired"][status]
+        for i, j in zip(*np.nonzero(acquired != NEVER)):
+            knowledge.append({
+                "source": f"char:{char_ids[i]}",
+                "target": f"fact:{index['facts'][j]}",
+                "relationship": status.upper(),
+                "step": int(acquired[i, j]),
+            })
+    knowledge.sort(key=lambda e: e["step"])
+
+    return {
+        "steps": index["steps"],
+        "characters": dict(zip(char_ids, index["characters"])),
+        "knowledge": knowledge,
+        "asymmetry_deltas": [
+            [{"source": char_ids[a], "target": char_ids[b], "exclusive_facts": facts}
+             for a, b, facts in step]
+            for step in asymmetry_deltas(index, "knows")
+        ],
+    }
+
+
 def export_graphs(output_dir: Path):
     """Export all graphs to multiple formats."""
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -297,6 +323,10 @@ def export_graphs(output_dir: Path):
     with open(output_dir / "knowledge_asymmetry.json", "w") as f:
         json.dump(asymmetry_json, f, indent=2)
 
+    # Export who knew what at each timeline step
+    with open(output_dir / "knowledge_timeline.json", "w") as f:
+        json.dump(build_knowledge_timeline(), f, indent=2)
+
     # Export raw data as JSON for reference
     with open(output_dir / "knowledge_data.json", "w") as f:
         json.dump({
@@ -263,6 +263,56 @@ EVENT_LOCATIONS = {
     "diamond_restored": "somnauth_shrine",
 }
 
+# Cast members (as named in the knowledge graph) present at each event
+EVENT_PARTICIPANTS = {
+    "prologue_theft": [],
+    "birthday_dinner": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder",
+                        "Godfrey Ablewhite", "Dr. Candy"],
+    "indians_appear": ["Gabriel Betteredge", "Franklin Blake"],
+    "diamond_given": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder", "Godfrey Ablewhite"],
+    "diamond_placed": ["Rachel Verinder"],
+    "candy_doses_franklin": ["Dr. Candy", "Franklin Blake"],
+    "franklin_takes_diamond": ["Franklin Blake"],
+    "rachel_witnesses": ["Rachel Verinder"],
+    "godfrey_steals": ["Godfrey Ablewhite", "Franklin Blake"],
+    "discovery_morning": ["Gabriel Betteredge", "Franklin Blake", "Rachel Verinder",
+                          "Godfrey Ablewhite", "Rosanna Spearman"],
+    "cuff_investigates": ["Sergeant Cuff", "Gabriel Betteredge", "Franklin Blake", "Rosanna Spearman"],
+    "rosanna_hides_nightgown": ["Rosanna Spearman"],
+    "rosanna_suicide": ["Rosanna Spearman"],
+    "godfrey_pledges": ["Godfrey Ablewhite"],
+    "lady_verinder_death": ["Rachel Verinder"],
+    "nightgown_discovery": ["Franklin Blake", "Gabriel Betteredge"],
+    "jennings_reconstruction": ["Ezra Jennings", "Franklin Blake", "Dr. Candy"],
+    "opium_experiment": ["Franklin Blake", "Ezra Jennings", "Gabriel Betteredge", "Rachel Verinder"],
+    "godfrey_murdered": ["Godfrey Ablewhite"],
+    "diamond_restored": [],
+}
+
+# When each event happens, as a step of the knowledge graph's TIMELINE
+EVENT_STEPS = {
+    "prologue_theft": "before_birthday",
+    "birthday_dinner": "birthday_dinner",
+    "indians_appear": "birthday_dinner",
+    "diamond_given": "birthday_dinner",
+    "diamond_placed": "june_21_night",
+    "candy_doses_franklin": "june_21_night",
+    "franklin_takes_diamond": "june_21_night",
+    "rachel_witnesses": "june_21_night",
+    "godfrey_steals": "june_21_night",
+    "discovery_morning": "june_22_morning",
+    "cuff_investigates": "investigation",
+    "rosanna_hides_nightgown": "june_22",
+    "rosanna_suicide": "investigation",
+    "godfrey_pledges": "june_23",
+    "lady_verinder_death": "resolution_1848",
+    "nightgown_discovery": "june_1849_shivering_sand",
+    "jennings_reconstruction": "june_1849_jennings",
+    "opium_experiment": "opium_experiment",
+    "godfrey_murdered": "resolution",
+    "diamond_restored": "final_report",
+}
+
 
 def build_location_graph():
     """Build the location graph with spatial relationships."""
@@ -400,7 +450,9 @@ def export_graphs(output_dir: Path):
         json.dump({
             "locations": LOCATIONS,
             "spatial_edges": SPATIAL_EDGES,
-            "event_locations": EVENT_LOCATIONS
+            "event_locations": EVENT_LOCATIONS,
+            "event_participants": EVENT_PARTICIPANTS,
+            "event_steps": EVENT_STEPS,
         }, f, indent=2)
 
     # Build and export perception matrix
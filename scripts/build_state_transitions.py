@@ -14,6 +14,8 @@ import pyagrum as gum
 import networkx as nx
 from pathlib import Path
 
+from chain_scoring import score_chain
+
 # Narrative states and transitions
 # Format: each state has prior conditions and the transition that occurred
 # We assign P(actual outcome | prior state) subjectively
@@ -315,19 +317,16 @@ def build_bayesian_model():
 
             # When parent is "other" (story diverged), very low probability
             # When parent is "actual" (story continues), normal probability
-            cpt[{"other": 0}] = [0.99, 0.01]  # If story diverged, almost nothing continues
-            cpt[{"other": 1}] = [p_other, p_actual]  # If story continues, normal probs
+            prev_id = STATE_TRANSITIONS[i - 1]["id"]
+            cpt[{prev_id: "other"}] = [0.99, 0.01]  # If story diverged, almost nothing continues
+            cpt[{prev_id: "actual"}] = [p_other, p_actual]  # If story continues, normal probs
 
     return bn
 
 
-def compute_chain_probability():
-    """Compute probability of the entire chain of events as written."""
-    p_chain = 1.0
-    for t in STATE_TRANSITIONS:
-        p_chain *= t["p_actual"]
-
-    return p_chain
+def score_chain_as_written():
+    """Log-space score of the chain as written, with per-prefix likelihoods."""
+    return score_chain([t["p_actual"] for t in STATE_TRANSITIONS])
 
 
 def compute_surprise_scores():
@@ -374,12 +373,18 @@ def export_model(output_dir: Path):
         print(f"Warning: Could not build Bayesian Network: {e}")
 
     # Compute and export analysis
-    chain_prob = compute_chain_probability()
+    chain_score = score_chain_as_written()
+    chain_prob = 10 ** chain_score["log10_probability"]
     surprise_scores = compute_surprise_scores()
 
     analysis = {
         "chain_probability": chain_prob,
-        "chain_probability_log10": -1 * (1 - chain_prob) if chain_prob > 0 else None,
+        "chain_probability_log10": chain_score["log10_probability"],
+        "chain_surprise_bits": chain_score["surprise_bits"],
+        "prefix_log10_likelihood": dict(zip((t["id"] for t in STATE_TRANSITIONS),
+                                            chain_score["prefix_log10_likelihood"])),
+        "cumulative_surprise_bits": dict(zip((t["id"] for t in STATE_TRANSITIONS),
+                                             chain_score["cumulative_surprise_bits"])),
         "total_transitions": len(STATE_TRANSITIONS),
         "most_surprising": surprise_scores[:3],
         "most_inevitable": surprise_scores[-3:],
@@ -394,7 +399,8 @@ def export_model(output_dir: Path):
         json.dump(STATE_TRANSITIONS, f, indent=2)
 
     print(f"\nState Transitions: {len(STATE_TRANSITIONS)} transitions modeled")
-    print(f"Chain probability (all events as written): {chain_prob:.6f}")
+    print(f"Chain probability (all events as written): {chain_score['probability']} "
+          f"({chain_score['surprise_bits']:.1f} bits of surprise)")
     print(f"Most surprising transition: {surprise_scores[0]['transition']} (P={surprise_scores[0]['p_actual']:.2f})")
 
     return G
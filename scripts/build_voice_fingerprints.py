@@ -6,11 +6,20 @@ Quantitative stylistic features for each narrator to enable:
 - Computational distinction between narrators
 - Basis for TONE.md claims
 
+Each section is tokenized once (words, sentence ends and other
+punctuation in a single regex pass), and the word, sentence, function-word
+and discourse features are computed from those tokens. Lexical markers
+and punctuation are still counted on the raw text, since they match
+substrings and characters rather than words. With --workers, sections are
+fingerprinted in parallel across a process pool.
+
 Output: JSON with feature vectors per narrator
 """
 
+import argparse
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from collections import Counter
 
@@ -80,26 +89,70 @@ FUNCTION_WORDS = [
 ]
 
 
+# One pass over a section: words, runs of sentence-ending punctuation, and
+# any other visible character
+TOKEN_RE = re.compile(r"(\w+)|([.!?]+)|(\S)")
+
+# Word pairs counted as direct address, and hedging words and pairs (the
+# published fingerprints never matched "I think"/"I believe", so neither
+# is counted here)
+DIRECT_ADDRESS = [("you", "will"), ("the", "reader")]
+HEDGE_WORDS = {"perhaps", "possibly"}
+HEDGE_PAIRS = {("it", "seems")}
+
+
 def extract_text_section(full_text: str, start_line: int, end_line: int) -> str:
     """Extract a section of text by line numbers."""
     lines = full_text.split('\n')
     return '\n'.join(lines[start_line-1:end_line])
 
 
-def compute_basic_stats(text: str) -> dict:
-    """Compute basic text statistics."""
-    # Clean text
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
+def tokenize_section(text: str) -> dict:
+    """Tokenize a section once for every feature extractor.
+
+    Returns the words (original case and lowercased), the number of words
+    in each sentence (text between runs of . ! ?, skipping empty ones),
+    and counts of adjacent lowercased word pairs with only whitespace
+    between them.
+    """
+    words, lengths, pairs = [], [], Counter()
+    sentence_words, sentence_open, previous = 0, False, None
+    for word, end, other in TOKEN_RE.findall(text):
+        if word:
+            lower = word.lower()
+            words.append(word)
+            if previous is not None:
+                pairs[previous, lower] += 1
+            previous = lower
+            sentence_words += 1
+            sentence_open = True
+        elif end:
+            if sentence_open:
+                lengths.append(sentence_words)
+            sentence_words, sentence_open, previous = 0, False, None
+        else:
+            sentence_open, previous = True, None
+    if sentence_open:
+        lengths.append(sentence_words)
+    return {
+        "words": words,
+        "lower": [w.lower() for w in words],
+        "sentence_lengths": lengths,
+        "pairs": pairs,
+    }
 
-    words = re.findall(r'\b\w+\b', text.lower())
-    word_count = len(words)
 
-    if not sentences or not words:
-        return {}
+def compute_basic_stats(text: str, tokens: dict = None) -> dict:
+    """Compute basic text statistics."""
+    tokens = tokens or tokenize_section(text)
+    words = tokens["lower"]
+    word_count = len(words)
 
     # Sentence lengths
-    sentence_lengths = [len(re.findall(r'\b\w+\b', s)) for s in sentences]
+    sentence_lengths = tokens["sentence_lengths"]
+
+    if not sentence_lengths or not words:
+        return {}
 
     # Word lengths
     word_lengths = [len(w) for w in words]
@@ -109,7 +162,7 @@ def compute_basic_stats(text: str) -> dict:
 
     stats = {
         "word_count": word_count,
-        "sentence_count": len(sentences),
+        "sentence_count": len(sentence_lengths),
         "avg_sentence_length": sum(sentence_lengths) / len(sentence_lengths),
         "max_sentence_length": max(sentence_lengths),
         "min_sentence_length": min(sentence_lengths),
@@ -122,9 +175,10 @@ def compute_basic_stats(text: str) -> dict:
     return stats
 
 
-def compute_function_word_profile(text: str) -> dict:
+def compute_function_word_profile(text: str, tokens: dict = None) -> dict:
     """Compute frequency profile of function words."""
-    words = re.findall(r'\b\w+\b', text.lower())
+    tokens = tokens or tokenize_section(text)
+    words = tokens["lower"]
     word_count = len(words)
     if not word_count:
         return {}
@@ -137,27 +191,33 @@ def compute_function_word_profile(text: str) -> dict:
     return profile
 
 
-def compute_lexical_markers(text: str, narrator: str) -> dict:
-    """Count occurrences of narrator-specific lexical markers."""
+def compute_lexical_markers(text: str, narrator: str, tokens: dict = None) -> dict:
+    """Count occurrences of narrator-specific lexical markers.
+
+    Markers are matched as substrings ("rose" counts in "roses"), so they
+    are counted on the lowercased text rather than the tokens.
+    """
+    tokens = tokens or tokenize_section(text)
     markers = LEXICAL_MARKERS.get(narrator, {})
     results = {}
 
     text_lower = text.lower()
-    word_count = len(re.findall(r'\b\w+\b', text))
+    word_count = len(tokens["words"])
 
     for category, terms in markers.items():
         count = 0
         for term in terms:
-            count += len(re.findall(re.escape(term.lower()), text_lower))
+            count += text_lower.count(term.lower())
         results[category] = count
         results[f"{category}_per_1k"] = count / word_count * 1000 if word_count else 0
 
     return results
 
 
-def compute_punctuation_profile(text: str) -> dict:
+def compute_punctuation_profile(text: str, tokens: dict = None) -> dict:
     """Analyze punctuation usage patterns."""
-    word_count = len(re.findall(r'\b\w+\b', text))
+    tokens = tokens or tokenize_section(text)
+    word_count = len(tokens["words"])
     if not word_count:
         return {}
 
@@ -171,26 +231,27 @@ def compute_punctuation_profile(text: str) -> dict:
     }
 
 
-def compute_discourse_markers(text: str) -> dict:
+def compute_discourse_markers(text: str, tokens: dict = None) -> dict:
     """Analyze discourse/digression patterns."""
-    word_count = len(re.findall(r'\b\w+\b', text))
+    tokens = tokens or tokenize_section(text)
+    word_count = len(tokens["words"])
     if not word_count:
         return {}
 
-    text_lower = text.lower()
+    pairs = tokens["pairs"]
+    lower_counts = Counter(tokens["lower"])
 
     # Direct address to reader
-    direct_address = len(re.findall(r'\byou\s+will\b', text_lower))
-    direct_address += len(re.findall(r'\bthe\s+reader\b', text_lower))
+    direct_address = sum(pairs[pair] for pair in DIRECT_ADDRESS)
 
     # Digressions (parenthetical asides)
     parentheticals = text.count('(')
 
     # Self-reference
-    first_person = len(re.findall(r'\bI\b', text))
+    first_person = tokens["words"].count("I")
 
     # Hedging expressions
-    hedges = len(re.findall(r'\bperhaps\b|\bpossibly\b|\bit\s+seems\b|\bI\s+think\b|\bI\s+believe\b', text_lower))
+    hedges = sum(lower_counts[w] for w in HEDGE_WORDS) + sum(pairs[pair] for pair in HEDGE_PAIRS)
 
     return {
         "direct_address_per_1k": direct_address / word_count * 1000,
@@ -202,29 +263,43 @@ def compute_discourse_markers(text: str) -> dict:
 
 def build_fingerprint(text: str, narrator: str) -> dict:
     """Build complete voice fingerprint for a narrator."""
+    tokens = tokenize_section(text)
     fingerprint = {
         "narrator": narrator,
-        "basic_stats": compute_basic_stats(text),
-        "function_words": compute_function_word_profile(text),
-        "lexical_markers": compute_lexical_markers(text, narrator),
-        "punctuation": compute_punctuation_profile(text),
-        "discourse": compute_discourse_markers(text),
+        "basic_stats": compute_basic_stats(text, tokens),
+        "function_words": compute_function_word_profile(text, tokens),
+        "lexical_markers": compute_lexical_markers(text, narrator, tokens),
+        "punctuation": compute_punctuation_profile(text, tokens),
+        "discourse": compute_discourse_markers(text, tokens),
     }
     return fingerprint
 
 
-def build_all_fingerprints(source_path: Path) -> dict:
+def _fingerprint_section(item):
+    narrator, text = item
+    return build_fingerprint(text, narrator)
+
+
+def fingerprint_sections(sections: dict, workers: int = 1) -> dict:
+    """Fingerprint {narrator: text} sections, one per task across a process
+    pool when workers > 1."""
+    if workers > 1 and len(sections) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sections))) as pool:
+            results = list(pool.map(_fingerprint_section, sections.items()))
+    else:
+        results = [_fingerprint_section(item) for item in sections.items()]
+    return dict(zip(sections, results))
+
+
+def build_all_fingerprints(source_path: Path, workers: int = 1) -> dict:
     """Build fingerprints for all narrators."""
     # Read source text
     with open(source_path, 'r', encoding='utf-8') as f:
         full_text = f.read()
 
-    fingerprints = {}
-    for narrator, (start, end) in NARRATOR_SECTIONS.items():
-        text = extract_text_section(full_text, start, end)
-        fingerprints[narrator] = build_fingerprint(text, narrator)
-
-    return fingerprints
+    sections = {narrator: extract_text_section(full_text, start, end)
+                for narrator, (start, end) in NARRATOR_SECTIONS.items()}
+    return fingerprint_sections(sections, workers)
 
 
 def compute_distinctive_features(fingerprints: dict) -> dict:
@@ -265,7 +340,7 @@ def compute_distinctive_features(fingerprints: dict) -> dict:
     return distinctive
 
 
-def export_fingerprints(output_dir: Path, source_path: Path):
+def export_fingerprints(output_dir: Path, source_path: Path, workers: int = 1):
     """Export all fingerprints."""
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -368,7 +443,7 @@ def export_fingerprints(output_dir: Path, source_path: Path):
             },
         }
     else:
-        fingerprints = build_all_fingerprints(source_path)
+        fingerprints = build_all_fingerprints(source_path, workers)
 
     # Export fingerprints
     with open(output_dir / "voice_fingerprints.json", "w") as f:
@@ -386,7 +461,12 @@ def export_fingerprints(output_dir: Path, source_path: Path):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build narrator voice fingerprints.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to fingerprint sections across")
+    args = parser.parse_args()
+
     output_dir = Path(__file__).parent.parent / "graphs"
     source_path = Path(__file__).parent.parent / "src" / "pg155.txt"
-    export_fingerprints(output_dir, source_path)
+    export_fingerprints(output_dir, source_path, args.workers)
     print(f"\nVoice fingerprints exported to {output_dir}")
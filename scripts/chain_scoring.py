@@ -0,0 +1,47 @@
+"""
+Log-space scoring for chains of transitions
+
+A chain's probability is the product of its transitions' probabilities,
+which underflows to 0.0 after a few hundred unlikely steps. Everything here
+works with log-probabilities instead, so a chain of thousands of
+transitions still has an exact score:
+
+- log10 likelihood of the whole chain and of every prefix
+- cumulative surprise (bits) after each transition
+
+Probabilities of exactly 0 score as -inf (infinitely surprising).
+"""
+
+import math
+
+import numpy as np
+
+
+def log10_probabilities(probabilities) -> np.ndarray:
+    """log10 of each probability, with log10(0) = -inf."""
+    p = np.asarray(probabilities, dtype=float)
+    with np.errstate(divide="ignore"):
+        return np.log10(p)
+
+
+def score_chain(probabilities) -> dict:
+    """Score one chain from its transitions' probabilities, in order."""
+    logs = log10_probabilities(probabilities)
+    prefix = np.cumsum(logs)
+    total = float(prefix[-1]) if len(prefix) else 0.0
+    return {
+        "log10_probability": total,
+        "probability": format_log10(total),
+        "surprise_bits": -total / math.log10(2),
+        "prefix_log10_likelihood": prefix.tolist(),
+        "cumulative_surprise_bits": (-prefix / math.log10(2)).tolist(),
+    }
+
+
+def format_log10(log10_p: float) -> str:
+    """Render 10**log10_p in scientific notation without underflowing."""
+    if log10_p == -math.inf:
+        return "0"
+    exponent = math.floor(log10_p)
+    mantissa = 10 ** (log10_p - exponent)
+    return f"{mantissa:.3f}e{exponent:+d}"
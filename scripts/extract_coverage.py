@@ -0,0 +1,202 @@
+"""
+Event-perspective coverage extraction from the text
+
+Proposes COVERAGE_MATRIX cells from pg155.txt instead of typing them: each
+event has a keyword signature (EVENT_SIGNATURES), and a passage supports
+the event where at least MIN_TERMS of its signature turn up within WINDOW
+tokens of each other. Every narrator section is scored from the positional
+index (text_index.py): each signature term's positions are looked up
+once, binned into half-windows and OR-ed into per-bin bitmasks, so a
+section's matching passages fall out of a popcount over its bins.
+
+Each proposal carries a confidence (how much of the signature the best
+passage matches, and how many separate passages support it), a suggested
+coverage type (hearsay where the passage reports being told) and pointers
+to the supporting passages by line. Proposals are compared with the
+hand-entered matrix: confirmed, proposed (not yet in the matrix) or
+unsupported (in the matrix but not found in the text).
+
+Output:
+- coverage_proposals.json
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from build_event_perspective_matrix import COVERAGE_MATRIX, EVENTS, NARRATORS
+from knowledge_index import POPCOUNT
+from text_index import SOURCE_PATH, excerpt, load_text_index, occurrences
+
+# Tokens a supporting passage may span, and how many signature terms it needs
+WINDOW = 200
+MIN_TERMS = 2
+
+# Phrases that mark a passage as reported rather than witnessed
+HEARSAY_MARKERS = ["told me", "heard", "informed", "i was told", "reported", "learnt", "learned"]
+
+# Keyword signature of each event (at most 8 phrases, one bit each)
+EVENT_SIGNATURES = {
+    "prologue_theft": ["seringapatam", "herncastle", "dagger", "storming", "moonstone"],
+    "indians_appear": ["indians", "jugglers", "boy", "ink", "terrace"],
+    "birthday_dinner": ["birthday", "dinner", "guests", "table"],
+    "murthwaite_warning": ["murthwaite", "indians", "diamond", "danger"],
+    "diamond_to_rachel": ["diamond", "birthday", "colonel", "will", "miss rachel"],
+    "paint_door_discussion": ["paint", "door", "decoration", "vehicle", "sitting room"],
+    "franklin_restless_night": ["sleep", "restless", "night", "cigar", "smoking"],
+    "candy_doses_franklin": ["candy", "laudanum", "dose", "brandy", "sleep"],
+    "franklin_takes_diamond": ["cabinet", "candle", "diamond", "sitting room", "laudanum"],
+    "rachel_witnesses_theft": ["rachel", "saw", "bedroom", "candle", "cabinet"],
+    "godfrey_takes_from_franklin": ["godfrey", "laudanum", "diamond", "bank", "bedroom"],
+    "discovery_morning": ["diamond", "gone", "missing", "cabinet", "morning"],
+    "seegrave_investigation": ["seegrave", "superintendent", "police", "servants"],
+    "cuff_arrives": ["sergeant cuff", "roses", "london", "arrived", "gardener"],
+    "rosanna_suspicious_behavior": ["rosanna", "nightgown", "sergeant cuff", "room", "strange"],
+    "cuff_paint_analysis": ["smear", "paint", "sergeant cuff", "dress", "dry", "wet"],
+    "rosanna_shivering_sand_trips": ["rosanna", "shivering sand", "cobb's hole", "yolland", "quicksand"],
+    "godfrey_to_london": ["godfrey", "london", "train", "left"],
+    "rachel_refuses_search": ["rachel", "search", "wardrobe", "refused", "sergeant cuff"],
+    "cuff_theory_rachel": ["sergeant cuff", "rachel", "debts", "suspect", "theory"],
+    "rosanna_suicide": ["rosanna", "quicksand", "shivering sand", "drowned", "footsteps"],
+    "cuff_withdraws": ["sergeant cuff", "cheque", "leave", "roses", "fee"],
+    "franklin_departs": ["franklin", "abroad", "continent", "left", "leaving"],
+    "indians_attack_godfrey": ["northumberland street", "godfrey", "indians", "robbed", "gagged"],
+    "indians_attack_luker": ["luker", "indians", "robbed", "lambeth", "receipt"],
+    "lady_verinder_death": ["lady verinder", "died", "death", "heart"],
+    "godfrey_proposes_rachel": ["godfrey", "rachel", "marry", "proposal", "engagement"],
+    "rachel_breaks_engagement": ["engagement", "rachel", "godfrey", "broken", "settlement"],
+    "franklin_returns": ["franklin", "england", "returned", "father", "death"],
+    "nightgown_discovery": ["nightgown", "shivering sand", "chain", "tin case", "paint"],
+    "limping_lucy_letter": ["limping lucy", "letter", "rosanna", "cobb's hole"],
+    "franklin_reads_letter": ["letter", "rosanna", "nightgown", "read"],
+    "jennings_reconstruction": ["jennings", "candy", "wandering", "notes", "words", "fever"],
+    "opium_experiment": ["experiment", "opium", "laudanum", "jennings"],
+    "rachel_watches_experiment": ["rachel", "experiment", "bedroom", "watch"],
+    "franklin_reenacts": ["experiment", "cabinet", "candle", "glass", "took"],
+    "reconciliation": ["rachel", "franklin", "forgive", "arms", "love"],
+    "godfrey_reclaims_diamond": ["luker", "bank", "diamond", "sailor", "released"],
+    "godfrey_murdered": ["wheel of fortune", "smothered", "sailor", "black beard", "dead"],
+    "godfrey_exposed": ["godfrey", "trustee", "sailor", "black beard", "double"],
+    "diamond_returns_india": ["somnauth", "moon god", "brahmins", "moonstone"],
+}
+
+# Supporting passages kept per proposal
+MAX_PASSAGES = 3
+
+
+def bin_masks(index: dict, phrases: list, bin_size: int) -> np.ndarray:
+    """masks[b] has bit k set if phrases[k] occurs in token bin b."""
+    masks = np.zeros(len(index["offsets"]) // bin_size + 2, dtype=np.uint8)
+    for k, phrase in enumerate(phrases):
+        np.bitwise_or.at(masks, occurrences(index, phrase) // bin_size, np.uint8(1 << k))
+    return masks
+
+
+def score_sections(index: dict, signature: list, hearsay: np.ndarray = None) -> dict:
+    """Matching passages of one signature in every narrator section.
+
+    A passage is a window of two adjacent half-window bins lying wholly
+    inside the section, so it never quotes a neighbouring narrator; returns
+    {narrator: [(first bin, terms matched bitmask, reported)]}, strongest
+    non-overlapping passages first. `hearsay` marks the bins containing
+    HEARSAY_MARKERS (none if not given).
+    """
+    half = WINDOW // 2
+    masks = bin_masks(index, signature, half)
+    windows = masks[:-1] | masks[1:]
+    counts = POPCOUNT[windows]
+    needed = min(MIN_TERMS, len(signature))
+    reported = hearsay[:-1] | hearsay[1:] if hearsay is not None else np.zeros(len(windows), dtype=bool)
+
+    result = {}
+    for narrator, (start, end) in index["sections"].items():
+        first = -(-start // half)
+        bins = np.arange(first, max(first, end // half - 1))
+        bins = bins[counts[bins] >= needed]
+        # Strongest first; drop windows overlapping a stronger one
+        chosen, taken = [], set()
+        for b in bins[np.argsort(-counts[bins], kind="stable")]:
+            if b in taken or b - 1 in taken or b + 1 in taken:
+                continue
+            taken.add(b)
+            chosen.append((int(b), int(windows[b]), bool(reported[b])))
+        if chosen:
+            result[narrator] = chosen
+    return result
+
+
+def passage_pointer(index: dict, signature: list, first_bin: int, terms: int) -> dict:
+    """Lines, matched terms and an excerpt for one passage."""
+    half = WINDOW // 2
+    start, end = first_bin * half, min((first_bin + 2) * half, len(index["offsets"])) - 1
+    matched = [phrase for k, phrase in enumerate(signature) if terms >> k & 1]
+    # Excerpt around the first matched term in the window
+    hits = np.concatenate([occurrences(index, phrase) for phrase in matched])
+    hit = int(hits[(hits >= start) & (hits <= end)].min())
+    return {
+        "lines": [int(index["lines"][start]), int(index["lines"][end])],
+        "terms": matched,
+        "excerpt": excerpt(index, hit - 15, hit + 30),
+    }
+
+
+def extract_coverage(index: dict = None, signatures: dict = EVENT_SIGNATURES,
+                     matrix: dict = COVERAGE_MATRIX) -> list:
+    """Proposed (narrator, event) coverage cells, most confident first."""
+    index = index or load_text_index()
+    hearsay = bin_masks(index, HEARSAY_MARKERS, WINDOW // 2) > 0
+    proposals = []
+    for event in EVENTS:
+        signature = signatures[event]
+        found = score_sections(index, signature, hearsay)
+        for narrator in NARRATORS:
+            current = matrix.get(narrator, {}).get(event, "not_covered")
+            passages = found.get(narrator, [])
+            if not passages and current == "not_covered":
+                continue
+            best = max((bin(terms).count("1") for _, terms, _ in passages), default=0)
+            confidence = best / len(signature) * (1 - 0.5 ** len(passages))
+            proposals.append({
+                "narrator": narrator,
+                "event": event,
+                "confidence": round(confidence, 3),
+                "suggested": ("hearsay" if passages[0][2] else "direct") if passages else "not_covered",
+                "current": current,
+                "status": ("unsupported" if not passages else
+                           "proposed" if current == "not_covered" else "confirmed"),
+                "support": len(passages),
+                "passages": [passage_pointer(index, signature, b, terms)
+                             for b, terms, _ in passages[:MAX_PASSAGES]],
+            })
+    proposals.sort(key=lambda p: -p["confidence"])
+    return proposals
+
+
+def export_coverage_proposals(output_dir: Path, source_path: Path = SOURCE_PATH):
+    """Extract coverage proposals and export them."""
+    if not source_path.exists():
+        print(f"Warning: Source file not found at {source_path}; skipping coverage extraction")
+        return None
+    proposals = extract_coverage(load_text_index(source_path))
+    statuses = [p["status"] for p in proposals]
+    result = {
+        "window": WINDOW,
+        "min_terms": MIN_TERMS,
+        "signatures": EVENT_SIGNATURES,
+        "summary": {s: statuses.count(s) for s in ("confirmed", "proposed", "unsupported")},
+        "proposals": proposals,
+    }
+    with open(output_dir / "coverage_proposals.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    summary = result["summary"]
+    print(f"Coverage proposals: {summary['confirmed']} confirmed, {summary['proposed']} new, "
+          f"{summary['unsupported']} hand-entered cells not found in the text")
+    return result
+
+
+if __name__ == "__main__":
+    output_dir = Path(__file__).parent.parent / "graphs"
+    export_coverage_proposals(output_dir)
+    print(f"\nCoverage proposals exported to {output_dir}")
@@ -0,0 +1,153 @@
+"""
+Bitset index of who knows what
+
+Knowledge states are stored as one bit matrix per status: row c, bit f is
+set when character c holds fact f with that status. Rows are packed eight
+facts to a byte, so comparing two characters is a bytewise AND / AND-NOT
+and a popcount, and comparing every pair is one broadcast over the packed
+matrix rather than a Python loop over facts.
+
+A cast of hundreds and thousands of facts is a few hundred KB per status;
+all-pairs comparisons are done in row blocks to keep the broadcast small.
+
+With a timeline, each (character, fact) also gets the ordinal of the
+timeline step at which it was acquired, and the packed matrices are kept
+for every step (a prefix of acquisitions), so the state at any point is a
+lookup rather than a scan of the record.
+"""
+
+import numpy as np
+
+STATUSES = ("knows", "suspects", "believes_false")
+
+# Set bits in every byte value
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+# Rows of the first operand compared at once in all-pairs counts
+BLOCK_ROWS = 64
+
+# Timeline marker for facts held from the start
+ALWAYS = "always"
+
+# Acquisition ordinal of facts never acquired
+NEVER = np.iinfo(np.int16).max
+
+
+def timeline_steps(timeline) -> list:
+    """The timeline's steps in order, without the ALWAYS marker."""
+    return [t for t in timeline if t != ALWAYS]
+
+
+def build_knowledge_index(knowledge_states: dict, facts, timeline=None) -> dict:
+    """Pack `knowledge_states` (character -> fact -> (status, since, belief)).
+
+    Facts are indexed in the order of `facts`; facts a character has no
+    entry for, and facts not in `facts`, count as unknown. With a
+    `timeline`, the index also holds `acquired[status]`, the step ordinal
+    at which each fact was acquired (ALWAYS, or no date, is step 0), and
+    `snapshots[status]`, the packed matrix at every step.
+    """
+    characters = list(knowledge_states)
+    facts = list(facts)
+    column = {fact: j for j, fact in enumerate(facts)}
+    steps = timeline_steps(timeline) if timeline is not None else []
+    ordinal = {step: k for k, step in enumerate(steps)}
+
+    acquired = {status: np.full((len(characters), len(facts)), NEVER, dtype=np.int16)
+                for status in STATUSES}
+    for i, character in enumerate(characters):
+        for fact, (status, since, _belief) in knowledge_states[character].items():
+            if status in acquired and fact in column:
+                acquired[status][i, column[fact]] = ordinal.get(since, 0)
+
+    index = {
+        "characters": characters,
+        "facts": facts,
+        "packed": {status: np.packbits(a != NEVER, axis=1) for status, a in acquired.items()},
+    }
+    if timeline is not None:
+        index["steps"] = steps
+        index["acquired"] = acquired
+        index["snapshots"] = {
+            status: np.stack([np.packbits(a <= k, axis=1) for k in range(len(steps))])
+            for status, a in acquired.items()
+        }
+    return index
+
+
+def at_step(index: dict, step) -> dict:
+    """The index as it stood at `step` (a step name or ordinal)."""
+    k = index["steps"].index(step) if isinstance(step, str) else step
+    return dict(index, packed={status: s[k] for status, s in index["snapshots"].items()})
+
+
+def popcount(packed: np.ndarray) -> np.ndarray:
+    """Set bits along the last axis of a packed uint8 array."""
+    return POPCOUNT[packed].sum(axis=-1, dtype=np.int64)
+
+
+def snapshot(index: dict, character: str, step, status: str = "knows") -> list:
+    """Facts `character` held with `status` at `step`."""
+    i = index["characters"].index(character)
+    return holdings(at_step(index, step), i, status)
+
+
+def holdings(index: dict, i: int, status: str = "knows") -> list:
+    """Facts character `i` holds with `status`."""
+    bits = np.unpackbits(index["packed"][status][i])[:len(index["facts"])]
+    return [index["facts"][j] for j in np.flatnonzero(bits)]
+
+
+def exclusive_counts(index: dict, status: str = "knows") -> np.ndarray:
+    """counts[a, b] = facts character a holds with `status` and b doesn't."""
+    packed = index["packed"][status]
+    n = len(packed)
+    counts = np.zeros((n, n), dtype=np.int64)
+    not_packed = ~packed
+    for start in range(0, n, BLOCK_ROWS):
+        block = packed[start:start + BLOCK_ROWS]
+        counts[start:start + BLOCK_ROWS] = popcount(block[:, None, :] & not_packed[None, :, :])
+    return counts
+
+
+def exclusive_facts(index: dict, a: int, b: int, status: str = "knows") -> list:
+    """Facts character `a` holds with `status` and character `b` doesn't."""
+    packed = index["packed"][status]
+    bits = np.unpackbits(packed[a] & ~packed[b])[:len(index["facts"])]
+    return [index["facts"][j] for j in np.flatnonzero(bits)]
+
+
+def holders(index: dict, fact: str, status: str = "knows") -> list:
+    """Characters holding `fact` with `status`."""
+    j = index["facts"].index(fact)
+    column = index["packed"][status][:, j // 8] & (0x80 >> (j % 8))
+    return [index["characters"][i] for i in np.flatnonzero(column)]
+
+
+def asymmetry_deltas(index: dict, status: str = "knows") -> list:
+    """Per timeline step, the ordered pairs whose exclusive facts changed.
+
+    Step 0 lists every pair with exclusive facts; each later step lists
+    (a, b, facts) for the pairs that differ from the step before, with an
+    empty list when the gap closed.
+    """
+    deltas = []
+    previous = np.zeros_like(index["packed"][status])
+    for k in range(len(index["steps"])):
+        step = at_step(index, k)
+        changed = _exclusive_changed(previous, step["packed"][status])
+        deltas.append([(int(a), int(b), exclusive_facts(step, a, b, status))
+                       for a, b in zip(*np.nonzero(changed))])
+        previous = step["packed"][status]
+    return deltas
+
+
+def _exclusive_changed(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """changed[a, b]: a's facts b lacks differ between two packed matrices."""
+    n = len(before)
+    changed = np.zeros((n, n), dtype=bool)
+    for start in range(0, n, BLOCK_ROWS):
+        old = before[start:start + BLOCK_ROWS, None, :] & ~before[None, :, :]
+        new = after[start:start + BLOCK_ROWS, None, :] & ~after[None, :, :]
+        changed[start:start + BLOCK_ROWS] = (old != new).any(axis=-1)
+    return changed
@@ -0,0 +1,299 @@
+"""
+Knowledge propagation simulator
+
+Models how facts could spread through the cast along the knowledge graph's
+TIMELINE. Characters are in contact at a step when they take part in events
+at that step whose locations are the same, nested (a room and the house
+around it) or within sight or earshot of each other. At each step every fact
+a character is willing to pass on reaches everyone in contact with them, and
+onward through the contacts of the people who just learned it, until
+nothing new spreads (a frontier expansion over the characters x facts
+matrix).
+
+Facts enter the simulation when KNOWLEDGE_STATES says a character acquires
+them, however that happened. By default characters keep KEPT_SECRETS to
+themselves; "what if X told Y" variations add a direct channel from X to Y
+at a step, over which X passes on everything. Variations are simulated
+together as a batch, one matrix product per step and round of spreading.
+
+The result is what each character could know at each step. To check a
+storyline, facts are seeded only with their first holders instead: an
+acquisition in KNOWLEDGE_STATES that no channel could then have carried is
+flagged, as learned off-stage (letters, reports) or inconsistent.
+
+Output:
+- knowledge_propagation.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from build_knowledge_state_graph import FACTS, KNOWLEDGE_STATES, TIMELINE
+from build_location_graph import EVENT_LOCATIONS, EVENT_PARTICIPANTS, EVENT_STEPS, LOCATIONS, SPATIAL_EDGES
+from knowledge_index import NEVER, build_knowledge_index, timeline_steps
+from location_index import containment_labels, contains_matrix
+
+# Facts each character won't volunteer, whoever they are with
+KEPT_SECRETS = {
+    "Rachel Verinder": ["franklin_entered_room", "rachel_witnessed"],
+    "Godfrey Ablewhite": ["franklin_entered_room", "franklin_unconscious", "godfrey_took_diamond",
+                          "godfrey_embezzled", "diamond_at_luker"],
+    "Rosanna Spearman": ["nightgown_stained", "rosanna_hid_nightgown", "rosanna_loves_franklin",
+                         "franklin_entered_room"],
+    "Dr. Candy": ["franklin_drugged"],
+}
+
+
+def location_proximity() -> tuple:
+    """Locations, and which pairs are close enough to share news.
+
+    Returns (locations, near) where near[i, j] is True for the same
+    location, one containing the other, or a VISIBLE_FROM/AUDIBLE_FROM pair.
+    """
+    locations = list(LOCATIONS)
+    position = {loc: i for i, loc in enumerate(locations)}
+    contains = contains_matrix(containment_labels(locations))
+
+    near = contains | contains.T
+    for s, t, rel in SPATIAL_EDGES:
+        if rel in ("VISIBLE_FROM", "AUDIBLE_FROM"):
+            near[position[s], position[t]] = near[position[t], position[s]] = True
+    return locations, near
+
+
+def build_channels(characters: list, steps: list) -> np.ndarray:
+    """channels[t, a, b]: characters a and b are in contact at step t."""
+    locations, near = location_proximity()
+    position = {loc: i for i, loc in enumerate(locations)}
+    person = {c: i for i, c in enumerate(characters)}
+    step_index = {s: k for k, s in enumerate(steps)}
+
+    # present[t, c, l]: character c is at location l during step t
+    present = np.zeros((len(steps), len(characters), len(locations)), dtype=np.float32)
+    for event, location in EVENT_LOCATIONS.items():
+        for character in EVENT_PARTICIPANTS.get(event, []):
+            present[step_index[EVENT_STEPS[event]], person[character], position[location]] = 1
+
+    channels = (present @ near.astype(np.float32) @ present.transpose(0, 2, 1)) > 0
+    channels[:, np.arange(len(characters)), np.arange(len(characters))] = False
+    return channels
+
+
+def compile_model(knowledge_states=KNOWLEDGE_STATES, kept_secrets=KEPT_SECRETS) -> dict:
+    """Arrays for simulating over a knowledge table.
+
+    `held[c, f]` is the step at which c first knows or suspects f (NEVER if
+    not at all); `acquisitions[t]` marks every holder acquiring a fact at
+    step t and `origins[t]` only each fact's first holders; `share[c, f]`
+    is whether c passes f on.
+    """
+    index = build_knowledge_index(knowledge_states, FACTS, TIMELINE)
+    characters, facts, steps = index["characters"], index["facts"], index["steps"]
+    held = np.minimum(index["acquired"]["knows"], index["acquired"]["suspects"])
+
+    acquisitions = np.zeros((len(steps), len(characters), len(facts)), dtype=bool)
+    c, f = np.nonzero(held != NEVER)
+    acquisitions[held[c, f], c, f] = True
+    origins = acquisitions & (held == held.min(axis=0))
+
+    column = {fact: j for j, fact in enumerate(facts)}
+    share = np.ones((len(characters), len(facts)), dtype=bool)
+    for i, character in enumerate(characters):
+        for fact in kept_secrets.get(character, []):
+            share[i, column[fact]] = False
+
+    return {
+        "characters": characters,
+        "facts": facts,
+        "steps": steps,
+        "channels": build_channels(characters, steps),
+        "held": held,
+        "acquisitions": acquisitions,
+        "origins": origins,
+        "share": share,
+    }
+
+
+def tells_tensor(model: dict, variations: list) -> np.ndarray:
+    """Direct channels per variation: tells[v, t, listener, teller].
+
+    Each variation is a list of (teller, listener, step) tuples.
+    """
+    person = {c: i for i, c in enumerate(model["characters"])}
+    step_index = {s: k for k, s in enumerate(model["steps"])}
+    n = len(model["characters"])
+    tells = np.zeros((len(variations), len(model["steps"]), n, n), dtype=bool)
+    for v, variation in enumerate(variations):
+        for teller, listener, step in variation:
+            tells[v, step_index[step], person[listener], person[teller]] = True
+    return tells
+
+
+def propagate(model: dict, tells: np.ndarray = None, share: np.ndarray = None,
+              seeds: np.ndarray = None) -> np.ndarray:
+    """What each character could know after each step, per variation.
+
+    `seeds[t]` are the facts entering at step t (default: the knowledge
+    table's acquisitions). Returns reach[v, t, c, f]; with no `tells`, a
+    single baseline variation.
+    """
+    share = model["share"] if share is None else share
+    seeds = model["acquisitions"] if seeds is None else seeds
+    n_steps, n_chars, n_facts = seeds.shape
+    if tells is None:
+        tells = np.zeros((1, n_steps, n_chars, n_chars), dtype=bool)
+    n_variations = len(tells)
+
+    known = np.zeros((n_variations, n_chars, n_facts), dtype=bool)
+    reach = np.zeros((n_variations, n_steps, n_chars, n_facts), dtype=bool)
+    for t in range(n_steps):
+        known |= seeds[t]
+        contacts = model["channels"][t].astype(np.float32)
+        direct = tells[:, t].astype(np.float32)
+        frontier = known
+        while frontier.any():
+            # Contacts pass on what they share; tellers pass on everything
+            incoming = (contacts @ (frontier & share).astype(np.float32)) > 0
+            incoming |= (direct @ frontier.astype(np.float32)) > 0
+            frontier = incoming & ~known
+            known |= frontier
+        reach[:, t] = known
+    return reach
+
+
+def first_steps(reach: np.ndarray) -> np.ndarray:
+    """Step at which each fact first reaches each character, or NEVER.
+
+    Reduces the step axis (third from last) of a reach array.
+    """
+    axis = reach.ndim - 3
+    return np.where(reach.any(axis=axis), reach.argmax(axis=axis), NEVER)
+
+
+def check_consistency(model: dict) -> list:
+    """Acquisitions in the knowledge table that no channel could explain.
+
+    Spreads each fact from its first holders only, and returns (character,
+    fact, step) for each fact held at a step where it couldn't yet have
+    reached the character.
+    """
+    reach = propagate(model, seeds=model["origins"])[0]
+    held = model["held"]
+    c, f = np.nonzero(held != NEVER)
+    unexplained = ~reach[held[c, f], c, f]
+    return [(model["characters"][i], model["facts"][j], model["steps"][held[i, j]])
+            for i, j in zip(c[unexplained], f[unexplained])]
+
+
+def sweep_tells(model: dict) -> list:
+    """Every single "X tells Y at step t", ranked by what it spreads.
+
+    A variation's gain is the number of (character, fact) pairs that could
+    be known earlier than in the baseline, or at all.
+    """
+    variations = [[(teller, listener, step)]
+                  for step in model["steps"]
+                  for teller in model["characters"]
+                  for listener in model["characters"] if teller != listener]
+    baseline = first_steps(propagate(model)[0])
+    first = first_steps(propagate(model, tells_tensor(model, variations)))
+    gained = first < baseline
+    counts = gained.reshape(len(variations), -1).sum(axis=1)
+
+    ranked = []
+    for v in np.argsort(-counts, kind="stable"):
+        if not counts[v]:
+            break
+        teller, listener, step = variations[v][0]
+        c, f = np.nonzero(gained[v])
+        ranked.append({
+            "teller": teller,
+            "listener": listener,
+            "step": step,
+            "gained": int(counts[v]),
+            "learned": [{"character": model["characters"][i], "fact": model["facts"][j],
+                         "step": model["steps"][first[v, i, j]]}
+                        for i, j in zip(c, f)],
+        })
+    return ranked
+
+
+def summarize(model: dict, reach: np.ndarray) -> dict:
+    """Baseline propagation summary for export.
+
+    `could_have_learned` lists facts a character could have picked up
+    earlier than the knowledge table has them learn it, or at all.
+    """
+    first = first_steps(reach)
+    could = first < model["held"]
+    return {
+        "steps": model["steps"],
+        "channels": [
+            [[model["characters"][a], model["characters"][b]]
+             for a, b in zip(*np.nonzero(np.triu(model["channels"][t])))]
+            for t in range(len(model["steps"]))
+        ],
+        "could_have_learned": [
+            {"character": model["characters"][i], "fact": model["facts"][j],
+             "step": model["steps"][first[i, j]]}
+            for i, j in zip(*np.nonzero(could))
+        ],
+        "unexplained": [
+            {"character": c, "fact": f, "step": s}
+            for c, f, s in check_consistency(model)
+        ],
+    }
+
+
+def export_propagation(output_dir: Path, top: int = 25):
+    """Simulate the baseline and every single tell, and export the summary."""
+    model = compile_model()
+    reach = propagate(model)[0]
+    result = summarize(model, reach)
+    result["kept_secrets"] = KEPT_SECRETS
+    result["most_consequential_tells"] = sweep_tells(model)[:top]
+    with open(output_dir / "knowledge_propagation.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"Knowledge propagation: {len(result['could_have_learned'])} facts could have spread, "
+          f"{len(result['unexplained'])} acquisitions have no channel")
+    for tell in result["most_consequential_tells"][:3]:
+        print(f"  If {tell['teller']} told {tell['listener']} at {tell['step']}: "
+              f"+{tell['gained']} character-facts")
+    return result
+
+
+def parse_tell(text: str) -> tuple:
+    parts = text.split(":")
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"expected TELLER:LISTENER:STEP, got {text!r}")
+    teller, listener, step = parts
+    for character in (teller, listener):
+        if character not in KNOWLEDGE_STATES:
+            raise argparse.ArgumentTypeError(f"unknown character {character!r}")
+    if step not in timeline_steps(TIMELINE):
+        raise argparse.ArgumentTypeError(f"unknown step {step!r}")
+    return teller, listener, step
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate how knowledge could spread.")
+    parser.add_argument("--tell", action="append", type=parse_tell, metavar="TELLER:LISTENER:STEP",
+                        help="add a direct channel (repeatable) and report what changes")
+    args = parser.parse_args()
+
+    output_dir = Path(__file__).parent.parent / "graphs"
+    if args.tell:
+        model = compile_model()
+        reach = propagate(model, tells_tensor(model, [[], args.tell]))
+        first = first_steps(reach)
+        for i, j in zip(*np.nonzero(first[1] < first[0])):
+            when = model["steps"][first[1, i, j]]
+            before = "never" if first[0, i, j] == NEVER else model["steps"][first[0, i, j]]
+            print(f"{model['characters'][i]} could learn {model['facts'][j]} at {when} (was {before})")
+    else:
+        export_propagation(output_dir)
+        print(f"\nPropagation exported to {output_dir}")
@@ -0,0 +1,263 @@
+"""
+All-pairs reachability index for the location graph
+
+For each perception channel, computes the hop distance between every pair
+of locations and the first hop of a shortest path, so "could someone at A
+have seen or heard something at B?" is an array lookup.
+
+Channels:
+- walk: ADJACENT_TO and CONTAINS, both ways (moving between spaces)
+- sight: VISIBLE_FROM, plus the features inside a location
+- sound: AUDIBLE_FROM, VISIBLE_FROM and ADJACENT_TO (sound carries through
+  open lines of sight and shared doors), plus features inside a location
+
+Containment only counts for walking: a building contains all its rooms, but
+being in the house doesn't let you hear every room in it.
+
+Distances are found by breadth-first search from every location at once
+(one boolean matrix product per level) and stored as int16 arrays.
+
+The containment hierarchy (each location's `parent`) is labelled by an
+Euler tour: nested preorder intervals make "is X inside Y" two integer
+comparisons, and a sparse table of minimum depths over the tour answers
+lowest-common-ancestor queries ("same building? same town?") with two
+lookups.
+
+Output:
+- location_index.npz
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from build_location_graph import LOCATIONS, SPATIAL_EDGES
+
+CHANNELS = ("walk", "sight", "sound")
+
+# Spatial relationships each channel travels over
+CHANNEL_EDGES = {
+    "walk": {"ADJACENT_TO", "CONTAINS"},
+    "sight": {"VISIBLE_FROM"},
+    "sound": {"AUDIBLE_FROM", "VISIBLE_FROM", "ADJACENT_TO"},
+}
+
+# Hops over which each perception channel still works (walking is limited
+# by the query instead)
+PERCEPTION_RANGE = {"sight": 1, "sound": 2}
+
+# Distance and next hop between locations that can't reach each other
+UNREACHABLE = -1
+
+
+def channel_adjacency(channel: str, locations: list) -> np.ndarray:
+    """Symmetric adjacency matrix of `locations` for one channel."""
+    position = {loc: i for i, loc in enumerate(locations)}
+    adjacency = np.zeros((len(locations), len(locations)), dtype=bool)
+    for source, target, rel in SPATIAL_EDGES:
+        inner_feature = rel == "CONTAINS" and LOCATIONS[target]["type"] == "feature"
+        if rel in CHANNEL_EDGES[channel] or (channel != "walk" and inner_feature):
+            adjacency[position[source], position[target]] = True
+    return adjacency | adjacency.T
+
+
+def all_pairs_bfs(adjacency: np.ndarray) -> tuple:
+    """Hop distances and shortest-path first hops between all pairs.
+
+    Returns (dist, next_hop): dist[i, j] is the number of hops from i to j
+    and next_hop[i, j] the neighbour of i a shortest path goes through,
+    both UNREACHABLE when there is no path.
+    """
+    n = len(adjacency)
+    dist = np.full((n, n), UNREACHABLE, dtype=np.int16)
+    next_hop = np.full((n, n), UNREACHABLE, dtype=np.int16)
+    np.fill_diagonal(dist, 0)
+    np.fill_diagonal(next_hop, np.arange(n))
+
+    step = adjacency.astype(np.float32)
+    reached = np.eye(n, dtype=bool)
+    frontier = np.eye(n, dtype=bool)
+    level = 0
+    while frontier.any():
+        level += 1
+        # frontier[i, j]: j first reached from i at this level
+        frontier = ((frontier.astype(np.float32) @ step) > 0) & ~reached
+        reached |= frontier
+        dist[frontier] = level
+        # First hop: a neighbour of i that is one level closer to j
+        sources, targets = np.nonzero(frontier)
+        if level == 1:
+            next_hop[sources, targets] = targets
+        else:
+            closer = adjacency[sources] & (dist[:, targets].T == level - 1)
+            next_hop[sources, targets] = closer.argmax(axis=1)
+    return dist, next_hop
+
+
+def containment_labels(locations: list) -> dict:
+    """Euler-tour labels of the `parent` forest over `locations`.
+
+    A virtual root (index len(locations), depth -1) joins the top-level
+    locations into one tree. enter/exit are preorder intervals: a contains
+    b when enter[a] <= enter[b] <= exit[a]. euler is the tour, first the
+    position of each location's first visit, tour_depth the depth at each
+    tour position, and sparse[j, i] the position of the shallowest location
+    in euler[i:i + 2**j].
+    """
+    n = len(locations)
+    position = {loc: i for i, loc in enumerate(locations)}
+    children = [[] for _ in range(n + 1)]
+    for loc in locations:
+        parent = LOCATIONS[loc]["parent"]
+        children[n if parent is None else position[parent]].append(position[loc])
+
+    enter = np.zeros(n + 1, dtype=np.int16)
+    exit_ = np.zeros(n + 1, dtype=np.int16)
+    depth = np.zeros(n + 1, dtype=np.int16)
+    first = np.zeros(n + 1, dtype=np.int16)
+    euler = []
+    order = 0
+    depth[n] = -1
+    stack = [(n, iter(children[n]))]
+    enter[n], first[n] = order, 0
+    euler.append(n)
+    while stack:
+        node, pending = stack[-1]
+        child = next(pending, None)
+        if child is None:
+            stack.pop()
+            exit_[node] = order
+            if stack:
+                euler.append(stack[-1][0])
+            continue
+        order += 1
+        enter[child], depth[child], first[child] = order, depth[node] + 1, len(euler)
+        euler.append(child)
+        stack.append((child, iter(children[child])))
+
+    euler = np.array(euler, dtype=np.int16)
+    tour_depth = depth[euler]
+    levels = max(1, int(np.log2(len(euler))) + 1)
+    sparse = np.zeros((levels, len(euler)), dtype=np.int16)
+    sparse[0] = np.arange(len(euler))
+    for j in range(1, levels):
+        half = 1 << (j - 1)
+        left, right = sparse[j - 1], np.roll(sparse[j - 1], -half)
+        right[len(euler) - half:] = left[len(euler) - half:]
+        sparse[j] = np.where(tour_depth[right] < tour_depth[left], right, left)
+    return {"enter": enter, "exit": exit_, "depth": depth, "first": first,
+            "euler": euler, "tour_depth": tour_depth, "sparse": sparse}
+
+
+def contains_matrix(labels: dict) -> np.ndarray:
+    """contains[a, b]: location a is b or (transitively) contains it."""
+    enter, exit_ = labels["enter"][:-1], labels["exit"][:-1]
+    return (enter[:, None] <= enter[None, :]) & (enter[None, :] <= exit_[:, None])
+
+
+def build_location_index() -> dict:
+    """Distances and first hops for every channel, stacked by CHANNELS."""
+    locations = list(LOCATIONS)
+    dist, next_hop = zip(*(all_pairs_bfs(channel_adjacency(c, locations)) for c in CHANNELS))
+    return {
+        **containment_labels(locations),
+        "locations": locations,
+        "channels": list(CHANNELS),
+        "perception_range": np.array([PERCEPTION_RANGE.get(c, UNREACHABLE) for c in CHANNELS],
+                                     dtype=np.int16),
+        "dist": np.stack(dist),
+        "next_hop": np.stack(next_hop),
+        "position": {loc: i for i, loc in enumerate(locations)},
+    }
+
+
+# Arrays stored as they are in location_index.npz
+ARRAYS = ("perception_range", "dist", "next_hop", "enter", "exit", "depth", "first", "euler",
+          "tour_depth", "sparse")
+
+
+def save_location_index(index: dict, path: Path):
+    np.savez_compressed(path,
+                        locations=np.array(index["locations"]),
+                        channels=np.array(index["channels"]),
+                        **{name: index[name] for name in ARRAYS})
+
+
+def load_location_index(path: Path) -> dict:
+    with np.load(path) as data:
+        index = {
+            "locations": data["locations"].tolist(),
+            "channels": data["channels"].tolist(),
+            **{name: data[name] for name in ARRAYS},
+        }
+    index["position"] = {loc: i for i, loc in enumerate(index["locations"])}
+    return index
+
+
+def _position(index: dict) -> dict:
+    return index.get("position") or {loc: i for i, loc in enumerate(index["locations"])}
+
+
+def _lookup(index: dict, channel: str, a: str, b: str) -> tuple:
+    position = _position(index)
+    return index["channels"].index(channel), position[a], position[b]
+
+
+def distance(index: dict, channel: str, a: str, b: str) -> int:
+    """Hops from `a` to `b` over `channel`, or UNREACHABLE."""
+    return int(index["dist"][_lookup(index, channel, a, b)])
+
+
+def can_perceive(index: dict, observer: str, target: str, channel: str) -> bool:
+    """Whether someone at `observer` could see or hear (`channel`) `target`."""
+    hops = distance(index, channel, observer, target)
+    return hops != UNREACHABLE and hops <= PERCEPTION_RANGE[channel]
+
+
+def path(index: dict, channel: str, a: str, b: str) -> list:
+    """Locations on a shortest `channel` path from `a` to `b` (empty if none)."""
+    c, i, j = _lookup(index, channel, a, b)
+    if index["dist"][c, i, j] == UNREACHABLE:
+        return []
+    route = [i]
+    while route[-1] != j:
+        route.append(int(index["next_hop"][c, route[-1], j]))
+    return [index["locations"][k] for k in route]
+
+
+def is_within(index: dict, inner: str, outer: str) -> bool:
+    """Whether `inner` is `outer` or somewhere inside it."""
+    position = _position(index)
+    a, b = position[outer], position[inner]
+    return bool(index["enter"][a] <= index["enter"][b] <= index["exit"][a])
+
+
+def common_container(index: dict, a: str, b: str):
+    """The innermost location containing both `a` and `b` (None if they
+    share no building, grounds or town)."""
+    position = _position(index)
+    i, j = sorted((int(index["first"][position[a]]), int(index["first"][position[b]])))
+    level = int(np.log2(j - i + 1))
+    left, right = index["sparse"][level, i], index["sparse"][level, j - (1 << level) + 1]
+    depth = index["tour_depth"]
+    node = index["euler"][right if depth[right] < depth[left] else left]
+    return index["locations"][node] if node < len(index["locations"]) else None
+
+
+def export_location_index(output_dir: Path) -> dict:
+    """Build the index and save it as location_index.npz."""
+    index = build_location_index()
+    save_location_index(index, output_dir / "location_index.npz")
+    for c, channel in enumerate(CHANNELS):
+        reachable = (index["dist"][c] > 0).sum()
+        print(f"  {channel}: {reachable} reachable pairs, "
+              f"longest shortest path {index['dist'][c].max()} hops")
+    print(f"  containment: {len(index['euler'])}-step Euler tour, "
+          f"{int(index['depth'].max()) + 1} levels deep")
+    return index
+
+
+if __name__ == "__main__":
+    output_dir = Path(__file__).parent.parent / "graphs"
+    export_location_index(output_dir)
+    print(f"\nLocation index exported to {output_dir}")
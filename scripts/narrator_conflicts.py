@@ -0,0 +1,292 @@
+"""
+Redundancy and conflict detection across narrator accounts
+
+For every event that two or more narrators cover (COVERAGE_MATRIX), each
+narrator's account is the passages of their section that match the
+event's keyword signature (extract_coverage.py). Accounts are compared two
+ways:
+
+- lexical: MinHash sketches of each account's content words, bucketed by
+  locality-sensitive hashing. Only pairs of accounts that share a bucket
+  have their wording compared, so the cost grows with the number of similar
+  pairs rather than all pairs; the rest share little wording and are only
+  counted.
+- entities: who (CHARACTER_TERMS), where (PLACE_TERMS) and when
+  (TIME_TERMS) each account mentions, looked up in the positional index
+  once per account and compared for every pair. Where both accounts name
+  at least MIN_MENTIONS people, places or times and the names barely
+  overlap, the pair is flagged as diverging on that dimension.
+
+Pairs that share markedly more of their wording than accounts of one event
+usually do are reported as redundant. Narrators whose section has no
+passage matching the event are listed separately and left out of the
+comparison.
+
+Output:
+- narrator_conflicts.json
+"""
+
+import json
+from collections import defaultdict
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from build_event_perspective_matrix import EVENTS, NARRATORS, build_coverage_index, covered_counts
+from build_voice_fingerprints import FUNCTION_WORDS
+from extract_coverage import EVENT_SIGNATURES, MAX_PASSAGES, WINDOW, score_sections
+from text_index import SOURCE_PATH, load_text_index, occurrences
+
+# Who, where and when an account can mention, by the phrases that name them
+CHARACTER_TERMS = {
+    "Franklin Blake": ["franklin", "mr blake"],
+    "Rachel Verinder": ["rachel"],
+    "Godfrey Ablewhite": ["godfrey", "ablewhite"],
+    "Gabriel Betteredge": ["betteredge"],
+    "Rosanna Spearman": ["rosanna"],
+    "Sergeant Cuff": ["cuff"],
+    "Dr. Candy": ["candy"],
+    "Ezra Jennings": ["jennings"],
+    "Lady Verinder": ["lady verinder", "my lady"],
+    "Septimus Luker": ["luker"],
+    "Mr. Bruff": ["bruff"],
+    "Miss Clack": ["clack"],
+    "Superintendent Seegrave": ["seegrave"],
+    "Mr. Murthwaite": ["murthwaite"],
+    "Limping Lucy": ["limping lucy"],
+    "Colonel Herncastle": ["herncastle", "colonel"],
+    "The Indians": ["indians", "brahmins"],
+}
+
+PLACE_TERMS = {
+    "verinder_house": ["the house"],
+    "rachels_sitting_room": ["sitting room"],
+    "rachels_bedroom": ["bedroom"],
+    "painted_door": ["door"],
+    "terrace": ["terrace"],
+    "shrubbery": ["shrubbery"],
+    "shivering_sand": ["shivering sand", "quicksand"],
+    "cobbs_hole": ["cobb's hole"],
+    "frizinghall": ["frizinghall"],
+    "london": ["london"],
+    "lukers_bank": ["bank", "bankers"],
+    "wheel_of_fortune": ["wheel of fortune"],
+    "india": ["india"],
+    "seringapatam": ["seringapatam"],
+    "somnauth_shrine": ["somnauth"],
+}
+
+TIME_TERMS = {
+    "morning": ["morning"],
+    "evening": ["evening"],
+    "night": ["night", "midnight"],
+    "birthday": ["birthday"],
+    "june": ["june"],
+    "1848": ["1848"],
+    "1849": ["1849"],
+}
+
+ENTITY_TERMS = {"who": CHARACTER_TERMS, "where": PLACE_TERMS, "when": TIME_TERMS}
+
+# MinHash sketch size, split into LSH bands of ROWS hashes each; accounts
+# with Jaccard similarity J collide in some band with probability
+# 1 - (1 - J**ROWS)**BANDS, about even odds at J = 0.15
+NUM_HASHES = 128
+ROWS = 2
+BANDS = NUM_HASHES // ROWS
+MERSENNE = (1 << 31) - 1
+
+# Content-word overlap (Jaccard) above which two accounts retell the same
+# material; accounts of one event typically share about an eighth of their
+# content words, and fewer than one pair in twenty shares more than this
+REDUNDANT = 0.18
+
+# Entity overlap below which two accounts diverge on a dimension, when both
+# name at least MIN_MENTIONS; for sets this small it means sharing nothing
+DIVERGENT = 0.1
+MIN_MENTIONS = 2
+
+
+def content_ids(index: dict) -> np.ndarray:
+    """Word ids that carry content: not function words, more than two letters."""
+    stop = set(FUNCTION_WORDS)
+    return np.array([len(w) > 2 and w not in stop for w in index["vocabulary"]])
+
+
+def event_accounts(index: dict, coverage: dict) -> list:
+    """(event, narrator, token ranges) for each narrator of each multi-narrator event."""
+    half = WINDOW // 2
+    counts = covered_counts(coverage, "event")
+    accounts = []
+    for j in np.flatnonzero(counts >= 2):
+        event = EVENTS[j]
+        found = score_sections(index, EVENT_SIGNATURES[event])
+        cells = coverage["cells"]
+        for i in np.sort(cells["narrator"][cells["event"] == j]):
+            narrator = NARRATORS[i]
+            ranges = [(b * half, (b + 2) * half) for b, _, _ in found.get(narrator, [])[:MAX_PASSAGES]]
+            accounts.append((event, narrator, ranges))
+    return accounts
+
+
+def minhash(token_sets: list, seed: int = 0) -> np.ndarray:
+    """(accounts, NUM_HASHES) MinHash signatures of integer sets.
+
+    Each hash is a random affine map modulo a Mersenne prime; an empty set
+    gets MERSENNE in every slot.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE, NUM_HASHES, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE, NUM_HASHES, dtype=np.uint64)
+    signatures = np.full((len(token_sets), NUM_HASHES), MERSENNE, dtype=np.uint64)
+    for k, tokens in enumerate(token_sets):
+        if len(tokens):
+            x = np.asarray(tokens, dtype=np.uint64)[:, None] % np.uint64(MERSENNE)
+            signatures[k] = ((a * x + b) % np.uint64(MERSENNE)).min(axis=0)
+    return signatures
+
+
+def lsh_candidates(signatures: np.ndarray, groups: list) -> set:
+    """Pairs of rows sharing an LSH bucket in any band, within the same group."""
+    candidates = set()
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        rows = signatures[:, band * ROWS:(band + 1) * ROWS]
+        for k, row in enumerate(rows):
+            if row[0] != MERSENNE:
+                buckets[(groups[k], row.tobytes())].append(k)
+        for members in buckets.values():
+            candidates.update(combinations(members, 2))
+    return candidates
+
+
+def mentions(index: dict, ranges: list, terms: dict) -> set:
+    """Which of `terms` are named inside any of the token ranges."""
+    found = set()
+    for name, phrases in terms.items():
+        for phrase in phrases:
+            positions = occurrences(index, phrase)
+            if any(np.searchsorted(positions, start) < np.searchsorted(positions, end)
+                   for start, end in ranges):
+                found.add(name)
+                break
+    return found
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def detect_conflicts(index: dict = None) -> list:
+    """Compare narrator accounts of each multi-narrator event.
+
+    Every pair of accounts with passages is compared on entities; wording is
+    compared (exact Jaccard of content words) only for the LSH candidate
+    pairs, and is None for the rest. Per event, `uncompared` counts the pairs
+    whose wording was not compared, and `no_passage` lists narrators with no
+    matching passage.
+    """
+    index = index or load_text_index()
+    coverage = build_coverage_index()
+    accounts, missing = [], defaultdict(list)
+    for account in event_accounts(index, coverage):
+        if account[2]:
+            accounts.append(account)
+        else:
+            missing[account[0]].append(account[1])
+    content = content_ids(index)
+
+    token_sets = []
+    for _, _, ranges in accounts:
+        ids = np.concatenate([index["ids"][start:end] for start, end in ranges])
+        token_sets.append(np.unique(ids[content[ids]]))
+    signatures = minhash(token_sets)
+    candidates = lsh_candidates(signatures, [event for event, _, _ in accounts])
+    entities = [{dim: mentions(index, ranges, terms) for dim, terms in ENTITY_TERMS.items()}
+                for _, _, ranges in accounts]
+
+    by_event = defaultdict(list)
+    for k, (event, _, _) in enumerate(accounts):
+        by_event[event].append(k)
+
+    results = []
+    for event in EVENTS:
+        members = by_event.get(event, [])
+        if not members and not missing.get(event):
+            continue
+        pairs = []
+        for p, q in combinations(members, 2):
+            a, b = accounts[p], accounts[q]
+            pair = {"narrators": [a[1], b[1]], "lexical": None, "flags": []}
+            if (p, q) in candidates:
+                shared = len(np.intersect1d(token_sets[p], token_sets[q], assume_unique=True))
+                pair["lexical"] = round(shared / len(np.union1d(token_sets[p], token_sets[q])), 3)
+                if pair["lexical"] >= REDUNDANT:
+                    pair["flags"].append("redundant")
+            for dim in ENTITY_TERMS:
+                ea, eb = entities[p][dim], entities[q][dim]
+                overlap = jaccard(ea, eb)
+                pair[dim] = {"shared": sorted(ea & eb), "only_" + a[1]: sorted(ea - eb),
+                             "only_" + b[1]: sorted(eb - ea), "overlap": round(overlap, 3)}
+                if min(len(ea), len(eb)) >= MIN_MENTIONS and overlap < DIVERGENT:
+                    pair["flags"].append(f"{dim} diverges")
+            pairs.append(pair)
+        results.append({
+            "event": event,
+            "narrators": [accounts[k][1] for k in members],
+            "no_passage": missing.get(event, []),
+            "passages": {accounts[k][1]: [[int(index["lines"][s]), int(index["lines"][e - 1])]
+                                          for s, e in accounts[k][2]] for k in members},
+            "pairs": pairs,
+            "uncompared": sum(pair["lexical"] is None for pair in pairs),
+        })
+    return results
+
+
+def export_conflicts(output_dir: Path, source_path: Path = SOURCE_PATH):
+    """Detect conflicts and redundancies and export them."""
+    if not source_path.exists():
+        print(f"Warning: Source file not found at {source_path}; skipping conflict detection")
+        return None
+    events = detect_conflicts(load_text_index(source_path))
+    pairs = [p for e in events for p in e["pairs"]]
+
+    def flagged(word):
+        return sum(any(word in f for f in p["flags"]) for p in pairs)
+
+    def count(key):
+        return sum(len(e[key]) if isinstance(e[key], list) else e[key] for e in events)
+
+    result = {
+        "hashes": NUM_HASHES,
+        "bands": BANDS,
+        "redundant_above": REDUNDANT,
+        "divergent_below": DIVERGENT,
+        "min_mentions": MIN_MENTIONS,
+        "summary": {
+            "events": len(events),
+            "accounts": count("narrators"),
+            "accounts_without_passage": count("no_passage"),
+            "pairs_compared": len(pairs),
+            "redundant": flagged("redundant"),
+            "diverging": flagged("diverges"),
+            "pairs_with_little_shared_wording": count("uncompared"),
+        },
+        "events": events,
+    }
+    with open(output_dir / "narrator_conflicts.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    summary = result["summary"]
+    print(f"Narrator conflicts: {summary['pairs_compared']} account pairs compared over "
+          f"{summary['events']} events, {summary['diverging']} diverging, "
+          f"{summary['redundant']} redundant; {summary['pairs_with_little_shared_wording']} "
+          f"pairs share little wording, {summary['accounts_without_passage']} accounts have no passage")
+    return result
+
+
+if __name__ == "__main__":
+    output_dir = Path(__file__).parent.parent / "graphs"
+    export_conflicts(output_dir)
+    print(f"\nNarrator conflicts exported to {output_dir}")
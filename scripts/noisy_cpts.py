@@ -0,0 +1,70 @@
+"""
+Noisy-AND / noisy-OR conditional probability tables.
+
+Builds a child's CPT from the kind of each incoming edge instead of
+enumerating parent configurations by hand:
+
+- ENABLES parents are preconditions (noisy-AND): each one that didn't
+  happen multiplies the chance of the child by its leak
+- CAUSES parents are independent triggers (noisy-OR): each one that did
+  happen gets its own chance to bring the child about, with a small leak
+  when none did
+
+The strengths are set so that with every parent present the child happens
+with probability `p` (the node's p_actual), so the all-parents-true row
+reproduces the hand-set probability and every other row falls away from it.
+
+All variables are binary with the "happened" label at index 1. Tables are
+computed with numpy over all 2^k parent configurations at once.
+"""
+
+import numpy as np
+
+
+def noisy_table(kinds: list, p: float, leaks) -> np.ndarray:
+    """P(child) for every parent configuration.
+
+    `kinds` gives "causes" or "enables" per parent and `leaks` the matching
+    leak (a scalar or one per parent). Returns an array of shape (2,)*k
+    indexed by parent states (0 = didn't happen, 1 = happened).
+    """
+    k = len(kinds)
+    kinds = np.array([kind.lower() for kind in kinds])
+    leaks = np.broadcast_to(np.asarray(leaks, dtype=float), (k,))
+    if k == 0:
+        return np.asarray(p, dtype=float)
+
+    # on[i] is parent i's state across the whole (2,)*k grid
+    on = np.indices((2,) * k, dtype=bool)
+    shape = (k,) + (1,) * k
+
+    enables = (kinds == "enables").reshape(shape)
+    inhibit = np.where(on | ~enables, 1.0, leaks.reshape(shape))
+    p_enabled = inhibit.prod(axis=0)
+
+    causes = kinds == "causes"
+    n_causes = causes.sum()
+    if not n_causes:
+        return p_enabled * p
+
+    # Per-cause strength c with 1 - (1 - leak*p) * (1 - c)^n = p, so all
+    # causes present gives p and none present gives leak*p
+    leak = leaks[causes].mean() * p
+    strength = 1 - ((1 - p) / (1 - leak)) ** (1 / n_causes)
+    fired = np.where(on & causes.reshape(shape), 1 - strength, 1.0).prod(axis=0)
+    return p_enabled * (1 - (1 - leak) * fired)
+
+
+def fill_noisy_cpt(bn, node: str, edge_kinds: dict, p: float, leak=0.05):
+    """Fill `node`'s CPT in `bn` from the kinds of its incoming edges.
+
+    `edge_kinds` maps each parent name to "causes" or "enables"; `leak` is
+    a scalar or a dict of per-parent leaks.
+    """
+    cpt = bn.cpt(node)
+    # cpt.names is (child, parent_n, ..., parent_1); the array axes run
+    # the other way, with the child last
+    parents = list(reversed(cpt.names[1:]))
+    leaks = [leak[name] for name in parents] if isinstance(leak, dict) else leak
+    p_true = noisy_table([edge_kinds[name] for name in parents], p, leaks)
+    cpt[:] = np.stack([1 - p_true, p_true], axis=-1)
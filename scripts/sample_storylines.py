@@ -0,0 +1,252 @@
+"""
+Monte Carlo storyline sampler for the counterfactual network
+
+Draws complete alternate Moonstones from graphs/counterfactual.bif: every
+node is sampled in topological order for all N samples at once, looking up
+each sample's CPT row from its parents' sampled states. With evidence the
+evidence nodes are clamped and each sample weighted by their likelihood
+(likelihood weighting); interventions clamp nodes without weighting.
+
+A storyline is the set of story nodes (events and states, not background
+conditions) that didn't happen as written; its turning points are the
+deviations whose parents all went as written. The sampler reports how often
+the canonical path recurs, how often each node deviates, which deviations
+fire together, and the most likely alternate storylines.
+
+Output:
+- sampled_storylines.json
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyagrum as gum
+
+from build_counterfactual_dag import NODES
+
+# Samples per worker task when sampling across a process pool
+CHUNK_SIZE = 200_000
+
+
+def compile_network(bn):
+    """Flatten a pyAgrum network into arrays for vectorized sampling.
+
+    Returns the node names in topological order, and for each node its
+    parents' positions in that order and its CPT as an array with the
+    parents' axes first and the node's own states last.
+    """
+    order = [bn.variable(n).name() for n in bn.topologicalOrder()]
+    position = {name: i for i, name in enumerate(order)}
+    parents, tables = [], []
+    for name in order:
+        cpt = bn.cpt(name)
+        # cpt.names is (child, parent_n, ..., parent_1); toarray() reverses it
+        parent_names = list(reversed(cpt.names[1:]))
+        parents.append([position[p] for p in parent_names])
+        tables.append(np.asarray(cpt.toarray(), dtype=float))
+    labels = [list(bn.variable(name).labels()) for name in order]
+    return {"order": order, "parents": parents, "tables": tables, "labels": labels}
+
+
+def sample(model, n, rng, evidence=None, do=None):
+    """Draw `n` joint samples; returns (states, weights).
+
+    `states` is an (n, nodes) uint8 array of label indices in the model's
+    topological order. `evidence` and `do` map node names to labels.
+    """
+    evidence = evidence or {}
+    do = do or {}
+    states = np.empty((n, len(model["order"])), dtype=np.uint8)
+    weights = np.ones(n)
+
+    for i, name in enumerate(model["order"]):
+        if name in do:
+            states[:, i] = model["labels"][i].index(do[name])
+            continue
+        index = tuple(states[:, p] for p in model["parents"][i])
+        probs = model["tables"][i][index] if index else np.broadcast_to(model["tables"][i], (n, len(model["labels"][i])))
+        if name in evidence:
+            value = model["labels"][i].index(evidence[name])
+            states[:, i] = value
+            weights *= probs[:, value]
+            continue
+        # Inverse-CDF draw: count the cumulative probabilities below u
+        u = rng.random(n)
+        states[:, i] = (u[:, None] > np.cumsum(probs, axis=1)[:, :-1]).sum(axis=1)
+
+    return states, weights
+
+
+def story_nodes(model):
+    """Positions of the nodes whose deviations define a storyline."""
+    return [i for i, name in enumerate(model["order"])
+            if NODES.get(name, {}).get("type") != "condition"]
+
+
+def tally(model, states, weights, columns):
+    """Aggregate samples: weighted counts of each deviation pattern.
+
+    A node deviates when it takes any label other than its last ("true",
+    the actual outcome). Patterns are packed into bytes so they can be
+    counted with np.unique; returns {pattern bytes: weight}, the weighted
+    deviation count per node, the weighted co-deviation matrix and the
+    total weight.
+    """
+    actual = np.array([len(model["labels"][i]) - 1 for i in columns], dtype=np.uint8)
+    deviated = states[:, columns] != actual
+    packed = np.packbits(deviated, axis=1)
+    patterns, inverse = np.unique(packed, axis=0, return_inverse=True)
+    pattern_weights = np.bincount(inverse.ravel(), weights=weights, minlength=len(patterns))
+
+    weighted = deviated * weights[:, None]
+    return {
+        "patterns": {p.tobytes(): w for p, w in zip(patterns, pattern_weights)},
+        "deviations": weighted.sum(axis=0),
+        "co_deviations": weighted.T @ deviated,
+        "weight": weights.sum(),
+        "samples": len(weights),
+    }
+
+
+def merge(a, b):
+    """Combine two tallies."""
+    patterns = dict(a["patterns"])
+    for key, w in b["patterns"].items():
+        patterns[key] = patterns.get(key, 0.0) + w
+    return {
+        "patterns": patterns,
+        "deviations": a["deviations"] + b["deviations"],
+        "co_deviations": a["co_deviations"] + b["co_deviations"],
+        "weight": a["weight"] + b["weight"],
+        "samples": a["samples"] + b["samples"],
+    }
+
+
+def _sample_chunk(bif_path, n, seed, evidence, do):
+    model = compile_network(gum.loadBN(bif_path))
+    states, weights = sample(model, n, np.random.default_rng(seed), evidence, do)
+    return tally(model, states, weights, story_nodes(model))
+
+
+def sample_storylines(bif_path: Path, n: int, seed: int = 0, evidence=None, do=None,
+                      workers: int = 1, top: int = 25) -> dict:
+    """Sample `n` storylines and summarise them.
+
+    With workers > 1, samples are drawn in CHUNK_SIZE tasks across a process
+    pool, each with an independent seed spawned from `seed`. Raises
+    ValueError unless n >= 1.
+    """
+    if n < 1:
+        raise ValueError(f"need at least one sample, got n={n}")
+    bn = gum.loadBN(str(bif_path))
+    model = compile_network(bn)
+    columns = story_nodes(model)
+
+    sizes = [CHUNK_SIZE] * (n // CHUNK_SIZE) + ([n % CHUNK_SIZE] if n % CHUNK_SIZE else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tallies = list(pool.map(_sample_chunk, [str(bif_path)] * len(sizes), sizes, seeds,
+                                    [evidence] * len(sizes), [do] * len(sizes)))
+    else:
+        tallies = []
+        for size, chunk_seed in zip(sizes, seeds):
+            states, weights = sample(model, size, np.random.default_rng(chunk_seed), evidence, do)
+            tallies.append(tally(model, states, weights, columns))
+    total = tallies[0]
+    for t in tallies[1:]:
+        total = merge(total, t)
+
+    names = [model["order"][i] for i in columns]
+    weight = total["weight"]
+
+    def unpack(key):
+        bits = np.unpackbits(np.frombuffer(key, dtype=np.uint8))[:len(names)]
+        return [names[i] for i in np.flatnonzero(bits)]
+
+    parents = {model["order"][i]: [model["order"][p] for p in model["parents"][i]]
+               for i in columns}
+
+    def storyline(key, w):
+        # Turning points: deviations none of whose parents deviated
+        deviations = unpack(key)
+        deviated = set(deviations)
+        return {
+            "turning_points": [n for n in deviations if not deviated & set(parents[n])],
+            "deviations": deviations,
+            "probability": w / weight,
+        }
+
+    ranked = sorted(total["patterns"].items(), key=lambda kv: kv[1], reverse=True)
+    canonical = next((w for key, w in ranked if not any(key)), 0.0)
+    deviation_rates = total["deviations"] / weight
+
+    # Co-deviation restricted to hinges, as P(both deviate)
+    hinges = [i for i, name in enumerate(names) if NODES.get(name, {}).get("hinge")]
+    co = total["co_deviations"][np.ix_(hinges, hinges)] / weight
+
+    return {
+        "samples": int(total["samples"]),
+        "seed": seed,
+        "evidence": evidence or {},
+        "do": do or {},
+        "canonical_rate": canonical / weight,
+        "distinct_storylines": len(ranked),
+        "deviation_rates": {name: float(r) for name, r in zip(names, deviation_rates)},
+        "storylines": [storyline(key, w) for key, w in
+                       [kv for kv in ranked if any(kv[0])][:top]],
+        "hinge_co_deviation": {
+            "nodes": [names[i] for i in hinges],
+            "matrix": co.round(6).tolist(),
+        },
+    }
+
+
+def export_storylines(output_dir: Path, n: int = 100_000, seed: int = 0, workers: int = 1):
+    """Sample storylines from counterfactual.bif and export the summary."""
+    result = sample_storylines(output_dir / "counterfactual.bif", n, seed, workers=workers)
+    with open(output_dir / "sampled_storylines.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"Sampled {result['samples']} storylines ({result['distinct_storylines']} distinct)")
+    print(f"Canonical path recurs in {result['canonical_rate']:.2%}")
+    for s in result["storylines"][:3]:
+        print(f"  {s['probability']:.2%}: turns at {', '.join(s['turning_points'])} "
+              f"({len(s['deviations'])} nodes differ)")
+    return result
+
+
+def parse_pairs(pairs) -> dict:
+    return dict(p.split("=", 1) for p in pairs or [])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample alternate storylines.")
+    parser.add_argument("-n", "--samples", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"processes, each drawing {CHUNK_SIZE} samples at a time")
+    parser.add_argument("--evidence", nargs="*", help="name=value pairs to condition on")
+    parser.add_argument("--do", nargs="*", help="name=value pairs to intervene on")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="write the summary here instead of graphs/sampled_storylines.json")
+    args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be at least 1")
+
+    output_dir = Path(__file__).parent.parent / "graphs"
+    if args.evidence or args.do or args.output:
+        result = sample_storylines(output_dir / "counterfactual.bif", args.samples, args.seed,
+                                   parse_pairs(args.evidence), parse_pairs(args.do), args.workers)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+        else:
+            json.dump(result, sys.stdout, indent=2)
+    else:
+        export_storylines(output_dir, args.samples, args.seed, args.workers)
+        print(f"\nStorylines exported to {output_dir}")
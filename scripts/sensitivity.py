@@ -0,0 +1,188 @@
+"""
+Sensitivity of the story to its hand-set probabilities
+
+Every p_actual in the counterfactual NODES and in STATE_TRANSITIONS is a
+judgement call. This measures how much each one matters:
+
+- Chain probability: log10 P(chain) is a sum of log10 p, so its
+  derivative with respect to each p is exactly 1 / (p ln 10), and the shift
+  from any finite perturbation is log10((p + h) / p). Both are computed for
+  every parameter at once.
+- Key posteriors: central finite differences. For the state-transition
+  chain, P(final transition) is propagated for all perturbed parameter
+  vectors at once as a matrix; for the counterfactual network each
+  perturbation gets its own exact inference (a few dozen, milliseconds each).
+
+Hinges are ranked by how far a STEP change in their p_actual moves the key
+posteriors, with the shift in the story's log-probability as a tie-breaker
+(on its own that only depends on p, so it would just sort by p_actual).
+
+Output:
+- hinge_sensitivity.json
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pyagrum as gum
+
+from build_counterfactual_dag import (
+    NODES,
+    build_bayesian_network,
+    chain_factors,
+    set_node_cpt,
+)
+from build_state_transitions import STATE_TRANSITIONS
+
+# Posteriors whose sensitivity is reported for the counterfactual network
+KEY_OUTCOMES = ("reconciliation", "diamond_returns")
+
+# Perturbation used for finite differences and reported shifts
+STEP = 0.05
+
+# P(transition | previous one went otherwise), as in build_bayesian_model
+P_AFTER_DIVERGENCE = 0.01
+
+
+def chain_sensitivity(p: np.ndarray, step: float = STEP) -> dict:
+    """Analytic sensitivity of log10 P(chain) to each factor p_i."""
+    up = np.minimum(p + step, 1.0)
+    down = np.maximum(p - step, 0.0)
+    with np.errstate(divide="ignore"):
+        return {
+            "dlog10_dp": 1 / (p * math.log(10)),
+            "log10_shift_up": np.log10(up / p),
+            "log10_shift_down": np.log10(down / p),
+        }
+
+
+def _steps(p: np.ndarray, step: float) -> np.ndarray:
+    """Central-difference step per parameter, kept inside (0, 1)."""
+    return np.minimum(step, np.minimum(p, 1 - p) / 2)
+
+
+def transition_outcome(p: np.ndarray) -> np.ndarray:
+    """P(final transition happens as written) for rows of parameter vectors.
+
+    `p` is (rows, transitions); the chain is propagated for every row at
+    once: q_k = q_{k-1} p_k + (1 - q_{k-1}) P_AFTER_DIVERGENCE.
+    """
+    q = p[:, 0]
+    for k in range(1, p.shape[1]):
+        q = q * p[:, k] + (1 - q) * P_AFTER_DIVERGENCE
+    return q
+
+
+def transition_sensitivity(step: float = STEP) -> list:
+    """Sensitivity of the state-transition chain to each p_actual."""
+    p = np.array([t["p_actual"] for t in STATE_TRANSITIONS])
+    n = len(p)
+    h = _steps(p, step)
+
+    # Rows 0..n-1 perturb each parameter up, rows n..2n-1 down
+    perturbed = np.tile(p, (2 * n, 1))
+    perturbed[np.arange(n), np.arange(n)] += h
+    perturbed[n + np.arange(n), np.arange(n)] -= h
+    outcome = transition_outcome(perturbed)
+    d_outcome = (outcome[:n] - outcome[n:]) / (2 * h)
+
+    chain = chain_sensitivity(p, step)
+    rows = []
+    for i, t in enumerate(STATE_TRANSITIONS):
+        rows.append({
+            "id": t["id"],
+            "transition": t["transition"],
+            "p_actual": t["p_actual"],
+            "dlog10_chain_dp": float(chain["dlog10_dp"][i]),
+            "log10_chain_shift_up": float(chain["log10_shift_up"][i]),
+            "log10_chain_shift_down": float(chain["log10_shift_down"][i]),
+            "dP_final_dp": float(d_outcome[i]),
+        })
+    return sorted(rows, key=lambda r: (abs(r["dP_final_dp"]), abs(r["log10_chain_shift_down"])),
+                  reverse=True)
+
+
+def _outcome_posteriors(bn) -> np.ndarray:
+    ie = gum.LazyPropagation(bn)
+    ie.makeInference()
+    return np.array([ie.posterior(name)[1] for name in KEY_OUTCOMES])
+
+
+def counterfactual_sensitivity(step: float = STEP) -> list:
+    """Sensitivity of the counterfactual chain and network to each p_actual.
+
+    Covers every node of the chain compute_narrative_metrics scores
+    (chain_factors), including those whose p_actual is the builder's default.
+    """
+    bn = build_bayesian_network()
+    # The chain compute_narrative_metrics scores, at the p the network uses
+    nodes, p_net = chain_factors(bn)
+    p_net = np.array(p_net)
+    h = _steps(p_net, step)
+
+    d_posteriors = []
+    for node, p, dh in zip(nodes, p_net, h):
+        shifted = []
+        for value in (p + dh, p - dh):
+            perturbed = gum.BayesNet(bn)
+            set_node_cpt(perturbed, node, value)
+            shifted.append(_outcome_posteriors(perturbed))
+        d_posteriors.append((shifted[0] - shifted[1]) / (2 * dh))
+
+    chain = chain_sensitivity(p_net, step)
+    rows = []
+    for i, node in enumerate(nodes):
+        rows.append({
+            "node": node,
+            "description": NODES[node]["desc"],
+            "hinge": bool(NODES[node].get("hinge")),
+            "p_actual": float(p_net[i]),
+            "p_actual_is_default": "p_actual" not in NODES[node],
+            "dlog10_chain_dp": float(chain["dlog10_dp"][i]),
+            "log10_chain_shift_up": float(chain["log10_shift_up"][i]),
+            "log10_chain_shift_down": float(chain["log10_shift_down"][i]),
+            "dposterior_dp": {name: float(d) for name, d in zip(KEY_OUTCOMES, d_posteriors[i])},
+            "posterior_shift": float(np.abs(d_posteriors[i]).sum() * step),
+        })
+    return rows
+
+
+def rank_hinges(rows: list) -> list:
+    """Hinges by how far a STEP change in p_actual moves the key posteriors,
+    then by how far a STEP cut moves the story's probability."""
+    hinges = [r for r in rows if r["hinge"]]
+    return sorted(hinges,
+                  key=lambda r: (r["posterior_shift"], abs(r["log10_chain_shift_down"])),
+                  reverse=True)
+
+
+def export_sensitivity(output_dir: Path):
+    """Compute and export sensitivity for both models."""
+    counterfactual = counterfactual_sensitivity()
+    ranking = rank_hinges(counterfactual)
+    result = {
+        "step": STEP,
+        "key_outcomes": list(KEY_OUTCOMES),
+        "hinge_ranking": [
+            {"rank": i, **r} for i, r in enumerate(ranking, 1)
+        ],
+        "counterfactual_nodes": counterfactual,
+        "state_transitions": transition_sensitivity(),
+    }
+    with open(output_dir / "hinge_sensitivity.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"Hinges ranked by sensitivity (p_actual +/-{STEP}):")
+    for i, r in enumerate(ranking[:5], 1):
+        shift = r["log10_chain_shift_down"]
+        print(f"  {i}. {r['description']} (P={r['p_actual']}, outcomes "
+              f"{r['posterior_shift']:+.3f}, story x{10 ** shift:.2f})")
+    return result
+
+
+if __name__ == "__main__":
+    output_dir = Path(__file__).parent.parent / "graphs"
+    export_sensitivity(output_dir)
+    print(f"\nSensitivity exported to {output_dir}")
@@ -0,0 +1,102 @@
+"""
+Positional index over the text of The Moonstone
+
+Tokenizes pg155.txt once and keeps, for every word, the sorted array of
+its token positions (an inverted index), along with each token's line and
+character offset. Narrator sections (NARRATOR_SECTIONS line ranges) become
+token spans, so "where does this narrator mention X?" is a dictionary
+lookup and a binary search rather than a regex scan of the section.
+
+Phrases are found by intersecting the position arrays of their words,
+shifted by their offset in the phrase.
+
+    python text_index.py "painted door" "laudanum"
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from build_voice_fingerprints import NARRATOR_SECTIONS
+
+# Same word pattern the fingerprints count with
+WORD_RE = re.compile(r"\b\w+\b")
+
+SOURCE_PATH = Path(__file__).parent.parent / "src" / "pg155.txt"
+
+
+def build_text_index(text: str, sections=NARRATOR_SECTIONS) -> dict:
+    """Inverted index, token offsets and section spans for `text`.
+
+    `postings[word]` is the int32 array of positions of `word` (lowercased);
+    `lines[p]` and `offsets[p]` are token p's 1-based line and character
+    span; `sections[name]` is the (start, end) token span of a line range.
+    """
+    matches = list(WORD_RE.finditer(text))
+    words = [m.group().lower() for m in matches]
+    offsets = np.array([m.span() for m in matches], dtype=np.int64).reshape(-1, 2)
+    newlines = np.flatnonzero(np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32) == ord("\n"))
+    lines = np.searchsorted(newlines, offsets[:, 0]) + 1
+
+    vocabulary, ids = np.unique(np.array(words, dtype=object), return_inverse=True)
+    order = np.argsort(ids, kind="stable").astype(np.int32)
+    bounds = np.cumsum(np.bincount(ids, minlength=len(vocabulary)))[:-1]
+    postings = dict(zip(vocabulary.tolist(), np.split(order, bounds)))
+
+    spans = {name: (int(np.searchsorted(lines, start)), int(np.searchsorted(lines, end, side="right")))
+             for name, (start, end) in sections.items()}
+    return {
+        "text": text,
+        "postings": postings,
+        "ids": ids.astype(np.int32),
+        "vocabulary": vocabulary.tolist(),
+        "lines": lines,
+        "offsets": offsets,
+        "sections": spans,
+    }
+
+
+def load_text_index(source_path: Path = SOURCE_PATH) -> dict:
+    with open(source_path, "r", encoding="utf-8") as f:
+        return build_text_index(f.read())
+
+
+def tokenize(phrase: str) -> list:
+    return [w.lower() for w in WORD_RE.findall(phrase)]
+
+
+def occurrences(index: dict, phrase: str) -> np.ndarray:
+    """Positions at which `phrase` (one or more words) starts."""
+    words = tokenize(phrase)
+    empty = np.empty(0, dtype=np.int32)
+    if not words:
+        return empty
+    found = index["postings"].get(words[0], empty)
+    for k, word in enumerate(words[1:], 1):
+        found = np.intersect1d(found, index["postings"].get(word, empty) - k, assume_unique=True)
+    return found
+
+
+def within(index: dict, positions: np.ndarray, section: str) -> np.ndarray:
+    """The sorted `positions` that fall in a section."""
+    start, end = index["sections"][section]
+    return positions[np.searchsorted(positions, start):np.searchsorted(positions, end)]
+
+
+def excerpt(index: dict, start: int, end: int) -> str:
+    """Original text of tokens start..end (exclusive), whitespace collapsed."""
+    end = min(end, len(index["offsets"])) - 1
+    start = max(start, 0)
+    chars = index["text"][index["offsets"][start, 0]:index["offsets"][end, 1]]
+    return " ".join(chars.split())
+
+
+if __name__ == "__main__":
+    index = load_text_index()
+    print(f"{len(index['offsets'])} tokens, {len(index['postings'])} distinct words")
+    for phrase in sys.argv[1:]:
+        found = occurrences(index, phrase)
+        counts = {name: len(within(index, found, name)) for name in index["sections"]}
+        print(f"{phrase!r}: {len(found)} ({', '.join(f'{n} {c}' for n, c in counts.items() if c)})")
@@ -0,0 +1,405 @@
+"""
+Travel times and itinerary feasibility across the locations
+
+Builds a weighted travel graph over LOCATIONS: SPATIAL_EDGES that can be
+walked (ADJACENT_TO, CONTAINS) are costed by how the move is made (a few
+steps indoors, a walk across the grounds, a cab across London), and
+TRAVEL_ROUTES join the Verinder estate, Frizinghall, London and India by
+carriage, rail and sea. Shortest travel times come from Dijkstra, with each
+source's tree cached so repeated checks from the same place are lookups.
+
+A character's itinerary is the events they take part in, in TIMELINE
+order. Each TIMELINE step spans an approximate window of story time
+(STEP_HOURS), and a move between consecutive events is possible when the
+travel time fits between the start of the first event's step and the end
+of the second's.
+
+Storylines are validated in bulk: each is the actual story with some
+counterfactual DAG nodes going otherwise, and optionally events moved to
+another location or step. DEVIATION_EFFECTS says which events each
+deviating node removes or reschedules. Every storyline's legs are checked
+together against a precomputed all-pairs travel matrix; the export checks
+each node going otherwise on its own as well as the sampled storylines.
+
+Output:
+- travel_feasibility.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+from build_counterfactual_dag import NODES
+from build_knowledge_state_graph import TIMELINE
+from build_location_graph import EVENT_LOCATIONS, EVENT_PARTICIPANTS, EVENT_STEPS, LOCATIONS, SPATIAL_EDGES
+
+# Hours taken by one move of each kind
+MODE_HOURS = {
+    "indoors": 0.02,
+    "walk": 0.25,
+    "cab": 0.5,
+    "overland": 240.0,
+}
+
+# Long-distance connections between otherwise separate places: (a, b, mode, hours)
+TRAVEL_ROUTES = [
+    ("verinder_house", "frizinghall", "carriage", 1.5),
+    ("frizinghall", "london", "rail", 9.0),
+    ("london", "india", "sea", 2160.0),
+]
+
+# Location types a move stays under a roof between
+INDOOR_TYPES = {"building", "room", "passage", "feature"}
+
+# Approximate story time at which each TIMELINE step begins, in hours from
+# the birthday dinner (21 June 1848); a step lasts until the next begins
+STEP_HOURS = {
+    "before_birthday": -648,
+    "birthday_dinner": 0,
+    "june_21_night": 6,
+    "june_22_morning": 14,
+    "june_22": 18,
+    "june_23": 42,
+    "june_1848": 96,
+    "investigation_start": 120,
+    "investigation": 168,
+    "resolution_1848": 2880,
+    "1849": 7920,
+    "investigation_1849": 8160,
+    "june_1849": 8400,
+    "june_1849_shivering_sand": 8424,
+    "june_1849_letter": 8436,
+    "june_1849_jennings": 8472,
+    "reconstruction": 8520,
+    "confrontation_1849": 8568,
+    "experiment": 8640,
+    "opium_experiment": 8760,
+    "final_report": 8784,
+    "resolution": 8880,
+}
+
+# Length of the last step's window
+FINAL_STEP_HOURS = 720
+
+# What each counterfactual DAG node going otherwise does to the events of
+# EVENT_LOCATIONS: events it removes ("drop") and events it moves
+# ("event_steps", "event_locations"). Every non-condition node is listed;
+# an empty entry means no located event depends on it directly.
+DEVIATION_EFFECTS = {
+    "herncastle_steals": {"drop": ["prologue_theft"]},
+    "brahmins_pursue": {"drop": ["indians_appear"]},
+    "bequeaths_to_rachel": {"drop": ["diamond_given"]},
+    "franklin_brings": {"drop": ["diamond_given", "diamond_placed"]},
+    "birthday_dinner": {"drop": ["birthday_dinner"]},
+    "candy_doses_franklin": {"drop": ["candy_doses_franklin"]},
+    "candy_does_nothing": {"drop": ["candy_doses_franklin"]},
+    "franklin_drugged": {},
+    "franklin_takes_diamond": {"drop": ["franklin_takes_diamond"]},
+    "franklin_sleeps_normally": {"drop": ["franklin_takes_diamond"]},
+    "rachel_witnesses": {"drop": ["rachel_witnesses"]},
+    "rachel_asleep": {"drop": ["rachel_witnesses"]},
+    "godfrey_sees_opportunity": {},
+    "godfrey_steals": {"drop": ["godfrey_steals", "godfrey_pledges"]},
+    "godfrey_doesnt_steal": {"drop": ["godfrey_steals", "godfrey_pledges"]},
+    # If Rachel speaks up at the discovery, whoever holds the diamond has to
+    # get it to Luker before the house is searched, the same morning
+    "rachel_silent": {"event_steps": {"godfrey_pledges": "june_22_morning"}},
+    "rachel_tells": {"event_steps": {"godfrey_pledges": "june_22_morning"}},
+    "rosanna_finds_nightgown": {},
+    "rosanna_hides_evidence": {"drop": ["rosanna_hides_nightgown", "nightgown_discovery"]},
+    # A reported nightgown turns up during Cuff's investigation, not a year on
+    "rosanna_reports": {"drop": ["rosanna_hides_nightgown"],
+                        "event_steps": {"nightgown_discovery": "investigation"}},
+    "rosanna_suicide": {"drop": ["rosanna_suicide"]},
+    "cuff_investigates": {"drop": ["cuff_investigates"]},
+    "investigation_stalls": {},
+    "candy_ill": {},
+    "jennings_records_ravings": {},
+    "jennings_reconstructs": {"drop": ["jennings_reconstruction"]},
+    "truth_never_discovered": {"drop": ["jennings_reconstruction", "opium_experiment"]},
+    "opium_experiment": {"drop": ["opium_experiment"]},
+    "reconciliation": {},
+    "godfrey_reclaims": {},
+    "brahmins_track": {},
+    "godfrey_murdered": {"drop": ["godfrey_murdered"]},
+    "diamond_returns": {"drop": ["diamond_restored"]},
+}
+
+
+def edge_mode(source: str, target: str, rel: str) -> str:
+    """How a move along a spatial edge is made."""
+    outer, inner = LOCATIONS[source]["type"], LOCATIONS[target]["type"]
+    if rel == "CONTAINS" and outer == "country":
+        return "overland"
+    if rel == "CONTAINS" and outer == "city":
+        return "cab"
+    if outer in INDOOR_TYPES and inner in INDOOR_TYPES:
+        return "indoors"
+    return "walk"
+
+
+def build_travel_graph() -> nx.Graph:
+    """Undirected graph of LOCATIONS with `hours` and `mode` on each edge."""
+    G = nx.Graph()
+    G.add_nodes_from(LOCATIONS)
+    for source, target, rel in SPATIAL_EDGES:
+        if rel in ("ADJACENT_TO", "CONTAINS"):
+            mode = edge_mode(source, target, rel)
+            G.add_edge(source, target, mode=mode, hours=MODE_HOURS[mode])
+    for a, b, mode, hours in TRAVEL_ROUTES:
+        G.add_edge(a, b, mode=mode, hours=hours)
+    return G
+
+
+class TravelPlanner:
+    """Shortest travel times over a travel graph, caching each source's tree."""
+
+    def __init__(self, graph: nx.Graph = None):
+        self.graph = build_travel_graph() if graph is None else graph
+        self.locations = list(self.graph)
+        self.position = {loc: i for i, loc in enumerate(self.locations)}
+        self._trees = {}
+        self._matrix = None
+
+    def tree(self, source: str) -> tuple:
+        """(hours, paths) from `source` to every reachable location."""
+        if source not in self._trees:
+            self._trees[source] = nx.single_source_dijkstra(self.graph, source, weight="hours")
+        return self._trees[source]
+
+    def hours(self, a: str, b: str) -> float:
+        """Shortest travel time from `a` to `b` (inf if unreachable)."""
+        return self.tree(a)[0].get(b, np.inf)
+
+    def route(self, a: str, b: str) -> list:
+        """(location, mode taken to reach it) along the fastest route."""
+        path = self.tree(a)[1].get(b, [])
+        return [(loc, self.graph.edges[prev, loc]["mode"] if prev else None)
+                for prev, loc in zip([None] + path[:-1], path)]
+
+    def matrix(self) -> np.ndarray:
+        """All-pairs travel hours, indexed by `locations`."""
+        if self._matrix is None:
+            self._matrix = np.full((len(self.locations),) * 2, np.inf)
+            for i, source in enumerate(self.locations):
+                for target, hours in self.tree(source)[0].items():
+                    self._matrix[i, self.position[target]] = hours
+        return self._matrix
+
+
+def step_windows(steps=TIMELINE) -> tuple:
+    """Start and end hours of each step that has a place in story time."""
+    timed = [s for s in steps if s in STEP_HOURS]
+    starts = np.array([STEP_HOURS[s] for s in timed], dtype=float)
+    ends = np.append(starts[1:], starts[-1] + FINAL_STEP_HOURS)
+    return timed, starts, ends
+
+
+def storyline_changes(storyline: dict, planner: TravelPlanner, step_index: dict) -> tuple:
+    """(dropped events, event locations, event steps) for one storyline.
+
+    Deviations are applied through DEVIATION_EFFECTS, then the storyline's
+    own "event_locations" and "event_steps". Raises ValueError naming every
+    unknown deviation, event, location or step, or for a storyline that
+    isn't shaped as above.
+    """
+    if not isinstance(storyline, dict):
+        raise ValueError(f"expected a JSON object, got {type(storyline).__name__}")
+    for key, kind in (("deviations", list), ("event_locations", dict), ("event_steps", dict)):
+        if not isinstance(storyline.get(key, kind()), kind):
+            raise ValueError(f"{key} must be a JSON {'array' if kind is list else 'object'}")
+    dropped, places, steps = set(), dict(EVENT_LOCATIONS), dict(EVENT_STEPS)
+    errors = []
+    for node in storyline.get("deviations", []):
+        if node not in DEVIATION_EFFECTS:
+            errors.append(f"unknown deviation {node!r}" if node not in NODES
+                          else f"deviation {node!r} has no DEVIATION_EFFECTS entry")
+            continue
+        effects = DEVIATION_EFFECTS[node]
+        dropped.update(effects.get("drop", []))
+        places.update(effects.get("event_locations", {}))
+        steps.update(effects.get("event_steps", {}))
+    for key, moved, known in (("event_locations", places, planner.position),
+                              ("event_steps", steps, step_index)):
+        for event, value in storyline.get(key, {}).items():
+            if event not in EVENT_LOCATIONS:
+                errors.append(f"{key}: unknown event {event!r}")
+            elif value not in known:
+                errors.append(f"{key}: {event} moved to unknown {key[6:-1]} {value!r}")
+            else:
+                moved[event] = value
+    if errors:
+        raise ValueError("; ".join(errors))
+    return dropped, places, steps
+
+
+def compile_storylines(planner: TravelPlanner, storylines: list) -> dict:
+    """Per-storyline event arrays for bulk validation.
+
+    Each storyline is a dict with optional "deviations" (DAG nodes that go
+    otherwise, see DEVIATION_EFFECTS), "event_locations" and "event_steps"
+    (events moved elsewhere or to another step). Returns kept[s, e],
+    location[s, e], start[s, e] and end[s, e] over the events of
+    EVENT_LOCATIONS, and attends[c, e]. Raises ValueError for a storyline
+    naming anything unknown.
+    """
+    events = list(EVENT_LOCATIONS)
+    timed, starts, ends = step_windows()
+    step_index = {s: k for k, s in enumerate(timed)}
+    characters = sorted({c for e in events for c in EVENT_PARTICIPANTS.get(e, [])})
+
+    n = len(storylines)
+    kept = np.ones((n, len(events)), dtype=bool)
+    location = np.zeros((n, len(events)), dtype=int)
+    step = np.zeros((n, len(events)), dtype=int)
+    for s, storyline in enumerate(storylines):
+        try:
+            dropped, places, steps = storyline_changes(storyline, planner, step_index)
+        except ValueError as e:
+            raise ValueError(f"storyline {s}: {e}") from None
+        for e, event in enumerate(events):
+            kept[s, e] = event not in dropped
+            location[s, e] = planner.position[places[event]]
+            step[s, e] = step_index[steps[event]]
+
+    attends = np.zeros((len(characters), len(events)), dtype=bool)
+    for e, event in enumerate(events):
+        for character in EVENT_PARTICIPANTS.get(event, []):
+            attends[characters.index(character), e] = True
+
+    return {
+        "events": events,
+        "characters": characters,
+        "steps": timed,
+        "kept": kept,
+        "location": location,
+        "step": step,
+        "start": starts[step],
+        "end": ends[step],
+        "attends": attends,
+    }
+
+
+def validate_storylines(planner: TravelPlanner, storylines: list) -> list:
+    """Impossible moves in each storyline.
+
+    For each character, orders their kept events by step (ties keep
+    EVENT_LOCATIONS order) and checks every consecutive pair against the
+    travel matrix at once across all storylines. Returns, per storyline, a
+    list of {character, from, to, hours, available}.
+    """
+    compiled = compile_storylines(planner, storylines)
+    travel = planner.matrix()
+    n = len(storylines)
+    rows = np.arange(n)[:, None]
+    problems = [[] for _ in range(n)]
+
+    # Events in story order for each storyline (stable, so ties keep listing order)
+    order = np.argsort(compiled["step"], axis=1, kind="stable")
+    for c, character in enumerate(compiled["characters"]):
+        present = (compiled["kept"] & compiled["attends"][c])[rows, order]
+        # Previous event this character attends, for each position in order
+        positions = np.where(present, np.arange(present.shape[1]), -1)
+        previous = np.maximum.accumulate(positions, axis=1)
+        previous = np.concatenate([np.full((n, 1), -1), previous[:, :-1]], axis=1)
+        legs = present & (previous >= 0)
+
+        s, k = np.nonzero(legs)
+        a, b = order[s, previous[s, k]], order[s, k]
+        hours = travel[compiled["location"][s, a], compiled["location"][s, b]]
+        available = compiled["end"][s, b] - compiled["start"][s, a]
+        for i in np.nonzero(hours > available)[0]:
+            problems[s[i]].append({
+                "character": character,
+                "from": compiled["events"][a[i]],
+                "to": compiled["events"][b[i]],
+                "hours": float(hours[i]),
+                "available": float(available[i]),
+            })
+    return problems
+
+
+def check_itineraries(planner: TravelPlanner = None) -> list:
+    """Impossible moves in the story as written."""
+    return validate_storylines(planner or TravelPlanner(), [{}])[0]
+
+
+def export_travel(output_dir: Path, top: int = 25):
+    """Check the actual itineraries, each single deviation and any sampled
+    storylines."""
+    planner = TravelPlanner()
+    singles = [{"deviations": [node]} for node in DEVIATION_EFFECTS]
+    sampled = []
+    sampled_path = output_dir / "sampled_storylines.json"
+    if sampled_path.exists():
+        with open(sampled_path) as f:
+            sampled = json.load(f)["storylines"]
+    storylines = [{}] + singles + sampled
+    problems = validate_storylines(planner, storylines)
+    single_problems = problems[1:1 + len(singles)]
+    sampled_problems = problems[1 + len(singles):]
+
+    result = {
+        "modes": {**MODE_HOURS, **{mode: hours for _, _, mode, hours in TRAVEL_ROUTES}},
+        "step_hours": STEP_HOURS,
+        "actual": problems[0],
+        "infeasible_deviations": {
+            storyline["deviations"][0]: p for storyline, p in zip(singles, single_problems) if p
+        },
+        "storylines_checked": len(sampled),
+        "infeasible_storylines": [
+            {"deviations": storyline.get("deviations", []), "problems": p}
+            for storyline, p in zip(sampled, sampled_problems) if p
+        ][:top],
+    }
+    with open(output_dir / "travel_feasibility.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"Travel: {len(result['actual'])} impossible moves as written, "
+          f"{len(result['infeasible_deviations'])} of {len(singles)} single deviations and "
+          f"{len(result['infeasible_storylines'])} of {result['storylines_checked']} "
+          f"sampled storylines infeasible")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check travel times and itineraries.")
+    parser.add_argument("--route", nargs=2, metavar=("FROM", "TO"), help="print the fastest route")
+    parser.add_argument("--storylines", type=Path,
+                        help="JSONL of storylines to validate (deviations, event_locations, event_steps)")
+    args = parser.parse_args()
+
+    output_dir = Path(__file__).parent.parent / "graphs"
+    if args.route:
+        planner = TravelPlanner()
+        unknown = [loc for loc in args.route if loc not in planner.position]
+        if unknown:
+            sys.exit(f"Unknown location: {', '.join(unknown)}")
+        for loc, mode in planner.route(*args.route):
+            print(f"  {mode or 'start':9} {loc}")
+        print(f"{planner.hours(*args.route):.2f} hours")
+    elif args.storylines:
+        storylines = []
+        with open(args.storylines) as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    storylines.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    sys.exit(f"line {number}: invalid JSON ({e.msg})")
+        try:
+            results = validate_storylines(TravelPlanner(), storylines)
+        except ValueError as e:
+            sys.exit(str(e))
+        for i, problems in enumerate(results):
+            for p in problems:
+                print(f"{i}: {p['character']} can't get from {p['from']} to {p['to']} "
+                      f"({p['hours']:.1f}h needed, {p['available']:.1f}h available)")
+    else:
+        export_travel(output_dir)
+        print(f"\nTravel feasibility exported to {output_dir}")
@@ -4,21 +4,17 @@ Moonstone Graph Viewer
 Minimal Flask app for viewing narrative structure graphs.
 """
 
-from flask import Flask, render_template, send_from_directory, request, redirect, url_for
+from flask import Flask, Response, jsonify, render_template, send_from_directory, request, redirect, url_for
 from markupsafe import Markup
 from pathlib import Path
 import json
+import os
 import re
+import threading
 
-from counterfactuals import (
-    load_counterfactuals,
-    save_counterfactuals,
-    get_hinge,
-    add_alternative,
-    update_alternative,
-    delete_alternative,
-    get_all_hinge_ids,
-)
+from counterfactual_store import open_store
+from counterfactuals import check_blocks, parse_alternative_records
+from inference import NETWORKS, InferenceEngine, evaluate_scenarios, label_values, parse_evidence, parse_scenarios
 from graphs import (
     render_counterfactual_dag,
     render_causal_chain,
@@ -26,16 +22,26 @@ from graphs import (
     render_knowledge_asymmetry,
     render_location_graph,
     load_perspective_matrix,
+    load_irony_index,
     load_hinge_points,
+    load_blocked_hinges,
+    load_branch_index,
+    load_hinge_sensitivity,
+    load_sampled_storylines,
     load_knowledge_asymmetry_data,
+    load_knowledge_timeline,
 )
 from stats import get_all_stats
+from witnesses import DEFAULT_MOVES, WitnessEngine
 
 app = Flask(__name__)
 
 GRAPHS_DIR = Path(__file__).parent.parent / "graphs"
 DOCS_DIR = Path(__file__).parent.parent
 
+# "json" edits counterfactuals.json in place; "sqlite" uses counterfactuals.db
+COUNTERFACTUALS_BACKEND = os.environ.get("MOONSTONE_COUNTERFACTUALS", "json")
+
 # Document metadata
 DOCUMENTS = {
     "ACTIONS": {
@@ -226,7 +232,9 @@ def knowledge():
                                   {"color": "#FFC107", "label": "SUSPECTS (uncertain)", "dashed": True},
                               ]
                           },
-                          graph_html=html_content)
+                          graph_html=html_content,
+                          timeline=load_knowledge_timeline(GRAPHS_DIR),
+                          timeline_mode="knowledge")
 
 
 @app.route("/asymmetry")
@@ -245,7 +253,9 @@ def asymmetry():
                                   {"color": "#666666", "label": "\"Knows more than\" (thicker = more secrets)", "dashed": False},
                               ]
                           },
-                          graph_html=html_content)
+                          graph_html=html_content,
+                          timeline=load_knowledge_timeline(GRAPHS_DIR),
+                          timeline_mode="asymmetry")
 
 
 @app.route("/locations")
@@ -284,17 +294,41 @@ def secrets():
                           secrets=data["secrets"])
 
 
+@app.route("/irony")
+def irony():
+    """Dramatic irony heatmap: reader vs character knowledge per segment."""
+    data = load_irony_index(GRAPHS_DIR)
+    if data is None:
+        return "No irony index; run scripts/build_irony_index.py", 404
+    return render_template("irony.html",
+                          title="Dramatic Irony",
+                          question="When does the reader know more than the people on the page?",
+                          description="Each row is a segment of the story, each column a character in the scene. Irony counts facts the reader has been told that the character doesn't know; mystery counts facts the character knows that the reader hasn't been told. Hover a cell for the facts.",
+                          data=data)
+
+
+@app.route("/alternates")
+def alternates():
+    """Most likely alternate Moonstones, from the storyline sampler."""
+    data = load_sampled_storylines(GRAPHS_DIR)
+    if data is None:
+        return "No sampled storylines; run scripts/sample_storylines.py", 404
+    return render_template("alternates.html",
+                          title="Alternate Moonstones",
+                          question="If the story were run again, how would it most likely go?",
+                          description="Complete storylines sampled from the counterfactual network. Each is identified by its turning points — the first events to go differently — with everything downstream following from them.",
+                          data=data)
+
+
 @app.route("/perspectives")
 def perspectives():
     """Event-perspective coverage matrix."""
-    matrix, narrators, events = load_perspective_matrix(GRAPHS_DIR)
+    matrix = load_perspective_matrix(GRAPHS_DIR)
     return render_template("matrix.html",
                           title="Event-Perspective Matrix",
                           question="What does each narrator know firsthand vs. secondhand?",
                           description="Coverage types reveal narrative reliability. Direct witnesses saw it; hearsay is filtered through others; retrospective knowledge came later; inferred knowledge is deduction.",
-                          matrix=matrix,
-                          narrators=narrators,
-                          events=events)
+                          matrix=matrix)
 
 
 @app.route("/stats")
@@ -354,62 +388,124 @@ def docs_view(doc_name):
                           all_docs=DOCUMENTS)
 
 
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide counterfactual store, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_store(GRAPHS_DIR, COUNTERFACTUALS_BACKEND)
+        return _store
+
+
+_inference = {}
+_inference_lock = threading.Lock()
+
+
+def get_inference(network="counterfactual"):
+    """The process-wide inference engine for one of the networks."""
+    with _inference_lock:
+        if network not in _inference:
+            _inference[network] = InferenceEngine(GRAPHS_DIR / f"{network}.bif")
+        return _inference[network]
+
+
+_witnesses = None
+_witnesses_lock = threading.Lock()
+
+
+def get_witnesses():
+    """The process-wide witness feasibility engine."""
+    global _witnesses
+    with _witnesses_lock:
+        if _witnesses is None:
+            _witnesses = WitnessEngine(GRAPHS_DIR)
+        return _witnesses
+
+
+def parse_alternative_form(form) -> dict:
+    """Read alternative fields from the add/edit form."""
+    effects_raw = form.get("immediate_effects", "").strip()
+    return {
+        "outcome": form.get("outcome", "").strip(),
+        "immediate_effects": [e.strip() for e in effects_raw.split("\n") if e.strip()],
+        "plausibility_notes": form.get("plausibility_notes", "").strip(),
+        "blocks": form.getlist("blocks"),
+    }
+
+
 @app.route("/hinges")
 def hinges_index():
-    """List all hinge points with their alternatives."""
-    data = load_counterfactuals(GRAPHS_DIR)
+    """List all hinge points, most sensitive first."""
+    store = get_store()
+    sensitivity = load_hinge_sensitivity(GRAPHS_DIR)
+    branches = load_branch_index(GRAPHS_DIR)
+    hinges = store.hinge_summaries()
+    for hinge in hinges:
+        hinge["sensitivity"] = sensitivity.get(hinge["id"])
+        hinge["branch_count"] = len(branches.get(hinge["id"], []))
+    # Unranked hinges keep their order after the ranked ones
+    hinges.sort(key=lambda h: h["sensitivity"]["rank"] if h["sensitivity"] else len(sensitivity) + 1)
     return render_template("hinges_index.html",
                           title="Hinge Points",
                           question="Where could the story have gone differently?",
-                          description="Pivotal moments where different choices or circumstances would have led to different outcomes. Click to explore alternatives.",
-                          hinges=data["hinges"])
+                          description="Pivotal moments where different choices or circumstances would have led to different outcomes, ordered by how much the story's probability depends on each. Click to explore alternatives.",
+                          hinges=hinges)
 
 
 @app.route("/hinges/<hinge_id>")
 def hinge_detail(hinge_id):
     """View a specific hinge and its alternatives."""
-    data = load_counterfactuals(GRAPHS_DIR)
-    hinge = get_hinge(data, hinge_id)
+    store = get_store()
+    hinge = store.get_hinge(hinge_id)
     if hinge is None:
         return "Hinge not found", 404
 
-    all_hinge_ids = get_all_hinge_ids(data)
+    all_hinge_ids = store.get_all_hinge_ids()
+    outcome_effects = None
+    engine = get_inference()
+    if engine.bif_path.exists():
+        labels = engine.variables()
+        if hinge_id in labels:
+            # As written (forced to happen) against forced to go otherwise
+            otherwise, actual = labels[hinge_id][0], labels[hinge_id][-1]
+            outcome_effects = engine.effects({hinge_id: otherwise}, baseline={hinge_id: actual})
+
+    computed_blocks = load_blocked_hinges(GRAPHS_DIR).get(hinge_id)
+    block_checks = {}
+    if computed_blocks is not None:
+        block_checks = {alt["id"]: check_blocks(alt, computed_blocks)
+                        for alt in hinge["alternatives"]}
     return render_template("hinge_detail.html",
                           title=hinge["description"],
                           question="What else could have happened here?",
                           hinge=hinge,
-                          all_hinge_ids=all_hinge_ids)
+                          all_hinge_ids=all_hinge_ids,
+                          computed_blocks=computed_blocks,
+                          block_checks=block_checks,
+                          branches=load_branch_index(GRAPHS_DIR).get(hinge_id, []),
+                          outcome_effects=outcome_effects)
 
 
 @app.route("/hinges/<hinge_id>/add", methods=["GET", "POST"])
 def hinge_add_alternative(hinge_id):
     """Add a new alternative to a hinge."""
-    data = load_counterfactuals(GRAPHS_DIR)
-    hinge = get_hinge(data, hinge_id)
+    store = get_store()
+    hinge = store.get_hinge(hinge_id)
     if hinge is None:
         return "Hinge not found", 404
 
     if request.method == "POST":
-        # Parse form data
-        outcome = request.form.get("outcome", "").strip()
-        effects_raw = request.form.get("immediate_effects", "").strip()
-        effects = [e.strip() for e in effects_raw.split("\n") if e.strip()]
-        plausibility = request.form.get("plausibility_notes", "").strip()
-        blocks = request.form.getlist("blocks")
-
-        if outcome:
-            alternative = {
-                "outcome": outcome,
-                "immediate_effects": effects,
-                "plausibility_notes": plausibility,
-                "blocks": blocks,
-            }
-            add_alternative(data, hinge_id, alternative)
-            save_counterfactuals(GRAPHS_DIR, data)
+        alternative = parse_alternative_form(request.form)
+        if alternative["outcome"]:
+            store.add_alternative(hinge_id, alternative)
 
         return redirect(url_for("hinge_detail", hinge_id=hinge_id))
 
-    all_hinge_ids = get_all_hinge_ids(data)
+    all_hinge_ids = store.get_all_hinge_ids()
     return render_template("hinge_edit.html",
                           title=f"Add Alternative: {hinge['description']}",
                           hinge=hinge,
@@ -421,39 +517,23 @@ def hinge_add_alternative(hinge_id):
 @app.route("/hinges/<hinge_id>/<alt_id>/edit", methods=["GET", "POST"])
 def hinge_edit_alternative(hinge_id, alt_id):
     """Edit an existing alternative."""
-    data = load_counterfactuals(GRAPHS_DIR)
-    hinge = get_hinge(data, hinge_id)
+    store = get_store()
+    hinge = store.get_hinge(hinge_id)
     if hinge is None:
         return "Hinge not found", 404
 
-    alternative = None
-    for alt in hinge["alternatives"]:
-        if alt["id"] == alt_id:
-            alternative = alt
-            break
+    alternative = store.get_alternative(hinge_id, alt_id)
     if alternative is None:
         return "Alternative not found", 404
 
     if request.method == "POST":
-        outcome = request.form.get("outcome", "").strip()
-        effects_raw = request.form.get("immediate_effects", "").strip()
-        effects = [e.strip() for e in effects_raw.split("\n") if e.strip()]
-        plausibility = request.form.get("plausibility_notes", "").strip()
-        blocks = request.form.getlist("blocks")
-
-        if outcome:
-            updates = {
-                "outcome": outcome,
-                "immediate_effects": effects,
-                "plausibility_notes": plausibility,
-                "blocks": blocks,
-            }
-            update_alternative(data, hinge_id, alt_id, updates)
-            save_counterfactuals(GRAPHS_DIR, data)
+        updates = parse_alternative_form(request.form)
+        if updates["outcome"]:
+            store.update_alternative(hinge_id, alt_id, updates)
 
         return redirect(url_for("hinge_detail", hinge_id=hinge_id))
 
-    all_hinge_ids = get_all_hinge_ids(data)
+    all_hinge_ids = store.get_all_hinge_ids()
     return render_template("hinge_edit.html",
                           title=f"Edit Alternative: {hinge['description']}",
                           hinge=hinge,
@@ -465,12 +545,153 @@ def hinge_edit_alternative(hinge_id, alt_id):
 @app.route("/hinges/<hinge_id>/<alt_id>/delete", methods=["POST"])
 def hinge_delete_alternative(hinge_id, alt_id):
     """Delete an alternative."""
-    data = load_counterfactuals(GRAPHS_DIR)
-    delete_alternative(data, hinge_id, alt_id)
-    save_counterfactuals(GRAPHS_DIR, data)
+    get_store().delete_alternative(hinge_id, alt_id)
     return redirect(url_for("hinge_detail", hinge_id=hinge_id))
 
 
+@app.route("/api/alternatives", methods=["GET", "POST"])
+def api_alternatives():
+    """Bulk alternatives as JSON lines, one alternative (plus hinge_id) per line.
+
+    GET exports every alternative. POST imports a batch: it is validated as
+    a whole and applied in one write, or rejected with a list of errors.
+    """
+    store = get_store()
+    if request.method == "GET":
+        lines = "".join(json.dumps(r) + "\n" for r in store.alternative_records())
+        return Response(lines, mimetype="application/x-ndjson")
+
+    records, errors = parse_alternative_records(request.get_data(as_text=True).splitlines())
+    if not errors:
+        added, errors = store.add_alternatives(records)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    return jsonify({"added": added})
+
+
+def _inference_request():
+    """Engine, evidence and interventions for an inference request, or an
+    error response.
+
+    Evidence and interventions are name=value pairs: repeated ?evidence=
+    and ?do= parameters (or comma-separated lists), or a JSON body
+    {"evidence": {...}, "do": {...}}.
+    """
+    network = request.args.get("network", "counterfactual")
+    if network not in NETWORKS:
+        return None, None, None, (jsonify({"errors": [f"unknown network {network!r}"]}), 404)
+    engine = get_inference(network)
+    if not engine.bif_path.exists():
+        return None, None, None, (jsonify({"errors": [f"{engine.bif_path.name} not built; run the build scripts"]}), 503)
+
+    try:
+        if request.is_json:
+            body = request.get_json()
+            evidence = label_values(body.get("evidence") or {})
+            do = label_values(body.get("do") or {})
+        else:
+            evidence = parse_evidence(request.values.getlist("evidence"))
+            do = parse_evidence(request.values.getlist("do"))
+    except (ValueError, AttributeError) as e:
+        return None, None, None, (jsonify({"errors": [str(e)]}), 400)
+
+    errors = engine.check_evidence(evidence, do)
+    if errors:
+        return None, None, None, (jsonify({"errors": errors}), 400)
+    return engine, evidence, do, None
+
+
+@app.route("/api/infer", methods=["GET", "POST"])
+def api_infer():
+    """Posteriors for every node of a network (?network=, default counterfactual),
+    given observed ?evidence= and optional ?do= interventions."""
+    engine, evidence, do, error = _inference_request()
+    if error:
+        return error
+    try:
+        posteriors = engine.posteriors(evidence, do)
+    except ValueError as e:
+        return jsonify({"errors": [str(e)]}), 400
+    return jsonify({"evidence": evidence, "do": do, "posteriors": posteriors})
+
+
+@app.route("/api/do", methods=["GET", "POST"])
+def api_do():
+    """Effect of do(X=x) on the story outcomes (or ?target= nodes).
+
+    Each target comes back with its distribution with and without the
+    intervention, alongside the posteriors of every node under it.
+    """
+    engine, evidence, do, error = _inference_request()
+    if error:
+        return error
+    if not do:
+        return jsonify({"errors": ["give at least one intervention as do=name=value"]}), 400
+    targets = request.args.getlist("target") or None
+    try:
+        effects = engine.effects(do, evidence, targets)
+        posteriors = engine.posteriors(evidence, do)
+    except ValueError as e:
+        return jsonify({"errors": [str(e)]}), 400
+    return jsonify({"evidence": evidence, "do": do, "effects": effects, "posteriors": posteriors})
+
+
+@app.route("/api/infer/batch", methods=["POST"])
+def api_infer_batch():
+    """Evaluate a JSONL body of evidence scenarios; returns a CSV table.
+
+    One row per scenario, one column per node=label. The whole batch is
+    rejected if any scenario names an unknown variable or value.
+    """
+    network = request.args.get("network", "counterfactual")
+    if network not in NETWORKS:
+        return jsonify({"errors": [f"unknown network {network!r}"]}), 404
+    engine = get_inference(network)
+    if not engine.bif_path.exists():
+        return jsonify({"errors": [f"{engine.bif_path.name} not built; run the build scripts"]}), 503
+
+    scenarios, errors = parse_scenarios(request.get_data(as_text=True).splitlines(), engine)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    table = evaluate_scenarios(engine, scenarios)
+    return Response(table.to_csv(index=False), mimetype="text/csv")
+
+
+def _witness_request():
+    """Engine and ?k= moves for a witness request, or an error response."""
+    engine = get_witnesses()
+    if not engine.exists():
+        return None, None, (jsonify({"errors": ["location index not built; run the build scripts"]}), 503)
+    k = request.args.get("k", str(DEFAULT_MOVES))
+    if not k.isdigit():
+        return None, None, (jsonify({"errors": ["k must be a non-negative integer"]}), 400)
+    return engine, int(k), None
+
+
+@app.route("/api/witnesses/<event>")
+def api_witnesses(event):
+    """Locations and characters from which an event could have been seen,
+    heard or reached within ?k= moves."""
+    engine, k, error = _witness_request()
+    if error:
+        return error
+    try:
+        return jsonify(engine.witnesses(event, k))
+    except KeyError:
+        return jsonify({"errors": [f"unknown event {event!r}"]}), 404
+
+
+@app.route("/api/witnesses")
+def api_witnesses_all():
+    """Every event against every character within ?k= moves; returns a CSV
+    table with one row per feasible pair and a column per channel."""
+    engine, k, error = _witness_request()
+    if error:
+        return error
+    table = engine.feasibility_table(k)
+    return Response(table.to_csv(index=False), mimetype="text/csv")
+
+
 @app.route("/static/<path:filename>")
 def static_files(filename):
     return send_from_directory("static", filename)
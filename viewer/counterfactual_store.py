@@ -0,0 +1,762 @@
+"""
+Counterfactual storage backends.
+
+The viewer reads and edits hinges through a store rather than touching
+counterfactuals.json directly:
+
+- JsonStore: counterfactuals.json as a snapshot, with edits appended to a
+  journal and periodically compacted back into the snapshot
+- SqliteStore: hinges, alternatives, effects and blocks in indexed tables,
+  so each edit only touches the rows it changes
+
+counterfactuals.json stays the interchange format. Use the CLI to move
+data between the two, or to fold the journal into the snapshot:
+
+    python counterfactual_store.py import   # counterfactuals.json -> counterfactuals.db
+    python counterfactual_store.py export   # counterfactuals.db -> counterfactuals.json
+    python counterfactual_store.py compact  # journal -> counterfactuals.json
+
+Alternatives can also be moved in bulk as JSON lines, one alternative
+per line with a "hinge_id" field. A batch is validated as a whole (known
+hinges, `blocks` referencing real hinge IDs) and applied in one write:
+
+    python counterfactual_store.py import-alternatives candidates.jsonl
+    python counterfactual_store.py export-alternatives > alternatives.jsonl
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from counterfactuals import (
+    load_counterfactuals,
+    next_alternative_id,
+    parse_alternative_records,
+    validate_alternative_records,
+    alternative_from_record,
+)
+
+DB_FILENAME = "counterfactuals.db"
+JOURNAL_FILENAME = "counterfactuals.journal.jsonl"
+HISTORY_FILENAME = "counterfactuals.history.jsonl"
+LOCK_FILENAME = "counterfactuals.lock"
+
+# IntegrityError codes meaning an alternative ID is already taken
+DUPLICATE_ERRORS = ("SQLITE_CONSTRAINT_PRIMARYKEY", "SQLITE_CONSTRAINT_UNIQUE")
+
+# Alternative fields stored in their own columns/tables; anything else
+# round-trips through the `extra` JSON column.
+ALTERNATIVE_FIELDS = ("id", "outcome", "immediate_effects", "plausibility_notes", "blocks")
+HINGE_FIELDS = ("id", "description", "actual_outcome", "alternatives")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hinges (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    actual_outcome TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS alternatives (
+    hinge_id TEXT NOT NULL REFERENCES hinges(id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    outcome TEXT NOT NULL DEFAULT '',
+    plausibility_notes TEXT NOT NULL DEFAULT '',
+    extra TEXT,
+    PRIMARY KEY (hinge_id, id)
+);
+CREATE TABLE IF NOT EXISTS effects (
+    hinge_id TEXT NOT NULL,
+    alt_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    effect TEXT NOT NULL,
+    PRIMARY KEY (hinge_id, alt_id, position),
+    FOREIGN KEY (hinge_id, alt_id) REFERENCES alternatives(hinge_id, id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    hinge_id TEXT NOT NULL,
+    alt_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    block_id TEXT NOT NULL,
+    PRIMARY KEY (hinge_id, alt_id, position),
+    FOREIGN KEY (hinge_id, alt_id) REFERENCES alternatives(hinge_id, id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS alternatives_by_position ON alternatives(hinge_id, position);
+"""
+
+
+def _read_jsonl(path: Path) -> list[dict]:
+    """Read every complete entry of a JSON-lines file."""
+    return _read_jsonl_tail(path, 0)[0]
+
+
+def _read_jsonl_tail(path: Path, offset: int) -> tuple[list[dict], int]:
+    """Read complete JSON lines after a byte offset.
+
+    Returns the entries and the offset just past the last complete line, so
+    a line that is still being appended is picked up on the next call.
+    """
+    if not path.exists():
+        return [], 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1
+    entries = []
+    for line in chunk[:end].splitlines():
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # Torn by an interrupted append
+    return entries, offset + end
+
+
+def _file_stamp(path: Path) -> tuple[int, int]:
+    """(mtime, size) of a file, or (0, 0) if it doesn't exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return 0, 0
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _append_jsonl(path: Path, entries: list[dict]):
+    """Append entries as JSON lines and flush them to disk."""
+    if not entries:
+        return
+    with open(path, "a+b") as f:
+        # Start on a fresh line if a previous append was cut short
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write("".join(json.dumps(e) + "\n" for e in entries).encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class _Rollback(Exception):
+    """Raised inside a transaction to roll it back."""
+
+
+def _extra(record: dict, known: tuple) -> str | None:
+    """Serialize fields the schema doesn't model, so round-trips are lossless."""
+    extra = {k: v for k, v in record.items() if k not in known}
+    return json.dumps(extra) if extra else None
+
+
+class JsonStore:
+    """Snapshot + journal store backed by counterfactuals.json.
+
+    counterfactuals.json is the snapshot. Edits are appended as JSON lines
+    to counterfactuals.journal.jsonl instead of rewriting the snapshot;
+    loading replays the journal on top of the snapshot into dicts keyed by
+    hinge ID and (hinge ID, alternative ID). Every COMPACT_EVERY edits the
+    journal is folded into a fresh snapshot and moved to
+    counterfactuals.history.jsonl, which keeps the full edit log.
+
+    One instance is meant to live for the whole viewer process. Reads and
+    writes hold a lock, and each call first checks whether the files were
+    changed by someone else (another process, a hand edit, a git pull):
+    journal growth is replayed incrementally, anything else reloads. Writes
+    also hold an exclusive flock on counterfactuals.lock from that check
+    until their entries are replayed, so writers in other processes append
+    in turn and each sees the others' edits before numbering its own.
+    """
+
+    COMPACT_EVERY = 200
+
+    def __init__(self, graphs_dir: Path):
+        self.graphs_dir = graphs_dir
+        self.snapshot_path = graphs_dir / "counterfactuals.json"
+        self.journal_path = graphs_dir / JOURNAL_FILENAME
+        self.history_path = graphs_dir / HISTORY_FILENAME
+        self.lock_path = graphs_dir / LOCK_FILENAME
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._load()
+
+    @contextmanager
+    def _writing(self):
+        """Hold the instance lock and the inter-process journal lock, with
+        the files refreshed. Re-entrant within a thread."""
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_file = open(self.lock_path, "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                self.refresh()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _load(self):
+        """Rebuild the in-memory index from the snapshot and the whole journal."""
+        self.data = load_counterfactuals(self.graphs_dir)
+        self.seq = self.data.get("journal_seq", 0)
+        self._hinges = {h["id"]: h for h in self.data["hinges"]}
+        self._alternatives = {
+            (h["id"], a["id"]): a for h in self.data["hinges"] for a in h["alternatives"]
+        }
+        self.pending = 0
+        self._snapshot_stamp = _file_stamp(self.snapshot_path)
+        self._journal_offset = 0
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """Apply journal entries written since the last replay."""
+        entries, self._journal_offset = _read_jsonl_tail(self.journal_path, self._journal_offset)
+        for entry in entries:
+            if entry["seq"] <= self.seq:
+                continue  # Already folded into the snapshot
+            self._apply(entry)
+            self.seq = entry["seq"]
+            self.pending += 1
+
+    def refresh(self):
+        """Pick up changes made to the files outside this instance."""
+        with self._lock:
+            journal_size = _file_stamp(self.journal_path)[1]
+            if _file_stamp(self.snapshot_path) != self._snapshot_stamp:
+                self._load()
+            elif journal_size < self._journal_offset:
+                self._load()  # Journal was compacted or rewritten elsewhere
+            elif journal_size > self._journal_offset:
+                self._replay_journal()
+
+    # --- Reads ---
+
+    def hinge_summaries(self) -> list[dict]:
+        with self._lock:
+            self.refresh()
+            return [
+                {
+                    "id": h["id"],
+                    "description": h["description"],
+                    "actual_outcome": h["actual_outcome"],
+                    "alternative_count": len(h["alternatives"]),
+                }
+                for h in self.data["hinges"]
+            ]
+
+    def get_hinge(self, hinge_id: str) -> dict | None:
+        with self._lock:
+            self.refresh()
+            return self._hinges.get(hinge_id)
+
+    def get_alternative(self, hinge_id: str, alt_id: str) -> dict | None:
+        with self._lock:
+            self.refresh()
+            return self._alternatives.get((hinge_id, alt_id))
+
+    def get_all_hinge_ids(self) -> list[str]:
+        with self._lock:
+            self.refresh()
+            return list(self._hinges)
+
+    def history(self, hinge_id: str | None = None, alt_id: str | None = None) -> list[dict]:
+        """Edit log, oldest first, optionally filtered to one hinge or alternative."""
+        entries = _read_jsonl(self.history_path) + _read_jsonl(self.journal_path)
+        return [
+            e for e in entries
+            if (hinge_id is None or e["hinge_id"] == hinge_id)
+            and (alt_id is None or e.get("alt_id") == alt_id)
+        ]
+
+    # --- Writes ---
+
+    def add_alternative(self, hinge_id: str, alternative: dict) -> bool:
+        with self._writing():
+            hinge = self._hinges.get(hinge_id)
+            if hinge is None:
+                return False
+            if "id" not in alternative:
+                alternative["id"] = next_alternative_id(hinge)
+            self._record({"op": "add", "hinge_id": hinge_id,
+                          "alt_id": alternative["id"], "alternative": alternative})
+            return True
+
+    def update_alternative(self, hinge_id: str, alt_id: str, updates: dict) -> bool:
+        with self._writing():
+            if (hinge_id, alt_id) not in self._alternatives:
+                return False
+            self._record({"op": "update", "hinge_id": hinge_id,
+                          "alt_id": alt_id, "updates": updates})
+            return True
+
+    def delete_alternative(self, hinge_id: str, alt_id: str) -> bool:
+        with self._writing():
+            if (hinge_id, alt_id) not in self._alternatives:
+                return False
+            self._record({"op": "delete", "hinge_id": hinge_id, "alt_id": alt_id})
+            return True
+
+    def add_alternatives(self, records: list[dict]) -> tuple[list[str], list[str]]:
+        """Add a batch of bulk-format alternatives all-or-nothing.
+
+        The batch is validated up front and written to the journal in a
+        single append. Returns (added alternative IDs, errors); nothing is
+        written if there are errors.
+        """
+        with self._writing():
+            errors = validate_alternative_records(records, list(self._hinges))
+            if errors:
+                return [], errors
+
+            entries, batch_ids = [], {}
+            for record in records:
+                hinge_id = record["hinge_id"]
+                alternative = alternative_from_record(record)
+                taken = batch_ids.setdefault(hinge_id, [])
+                if "id" not in alternative:
+                    hinge = self._hinges[hinge_id]
+                    alternative["id"] = next_alternative_id({
+                        "id": hinge_id,
+                        "alternatives": hinge["alternatives"] + [{"id": i} for i in taken],
+                    })
+                elif (hinge_id, alternative["id"]) in self._alternatives or alternative["id"] in taken:
+                    errors.append(f"line {record.get('_line', '?')}: alternative "
+                                  f"{alternative['id']!r} already exists on {hinge_id}")
+                taken.append(alternative["id"])
+                entries.append({"op": "add", "hinge_id": hinge_id,
+                                "alt_id": alternative["id"], "alternative": alternative})
+            if errors:
+                return [], errors
+
+            self._record(*entries)
+            return [e["alt_id"] for e in entries], []
+
+    def alternative_records(self) -> list[dict]:
+        """Every alternative in bulk format (with its hinge_id), in hinge order."""
+        with self._lock:
+            self.refresh()
+            return [
+                {"hinge_id": h["id"], **alt}
+                for h in self.data["hinges"] for alt in h["alternatives"]
+            ]
+
+    def _record(self, *entries: dict):
+        """Append edits to the journal (write-through), then replay them.
+
+        Called under _writing(), so the journal holds nothing this instance
+        hasn't read and the entries are numbered after every edit in it.
+        """
+        at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        entries = [
+            {"seq": self.seq + i, "at": at, **entry}
+            for i, entry in enumerate(entries, 1)
+        ]
+        _append_jsonl(self.journal_path, entries)
+        self._replay_journal()
+        if self.pending >= self.COMPACT_EVERY:
+            self.compact()
+
+    def _apply(self, entry: dict):
+        hinge_id, alt_id = entry["hinge_id"], entry["alt_id"]
+        hinge = self._hinges[hinge_id]
+        if entry["op"] == "add":
+            alt = dict(entry["alternative"])
+            hinge["alternatives"].append(alt)
+            self._alternatives[(hinge_id, alt_id)] = alt
+        elif entry["op"] == "update":
+            self._alternatives[(hinge_id, alt_id)].update(entry["updates"])
+        elif entry["op"] == "delete":
+            alt = self._alternatives.pop((hinge_id, alt_id))
+            hinge["alternatives"] = [a for a in hinge["alternatives"] if a is not alt]
+
+    def compact(self):
+        """Fold the journal into a new snapshot and archive it to the history log."""
+        with self._writing():
+            self.data["journal_seq"] = self.seq
+            tmp_path = self.graphs_dir / "counterfactuals.json.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.snapshot_path)
+
+            # The snapshot now carries journal_seq, so a crash before the
+            # journal is cleared just means those entries are skipped on replay.
+            _append_jsonl(self.history_path, _read_jsonl(self.journal_path))
+            self.journal_path.unlink(missing_ok=True)
+            self.pending = 0
+            self._snapshot_stamp = _file_stamp(self.snapshot_path)
+            self._journal_offset = 0
+
+    def replace_data(self, data: dict):
+        """Swap in a whole new document (e.g. exported from SQLite) as the snapshot."""
+        with self._writing():
+            self.data = data
+            self._hinges = {h["id"]: h for h in data["hinges"]}
+            self._alternatives = {
+                (h["id"], a["id"]): a for h in data["hinges"] for a in h["alternatives"]
+            }
+            self.compact()
+
+    def export_data(self) -> dict:
+        with self._lock:
+            self.refresh()
+            return self.data
+
+
+class SqliteStore:
+    """Row-level store backed by counterfactuals.db."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Reads ---
+
+    def hinge_summaries(self) -> list[dict]:
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT h.id, h.description, h.actual_outcome,
+                       (SELECT COUNT(*) FROM alternatives a WHERE a.hinge_id = h.id)
+                           AS alternative_count
+                FROM hinges h ORDER BY h.position
+            """).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_hinge(self, hinge_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM hinges WHERE id = ?", (hinge_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            alt_rows = conn.execute(
+                "SELECT * FROM alternatives WHERE hinge_id = ? ORDER BY position",
+                (hinge_id,),
+            ).fetchall()
+            effects = self._child_values(conn, "effects", "effect", hinge_id)
+            blocks = self._child_values(conn, "blocks", "block_id", hinge_id)
+
+        hinge = {
+            "id": row["id"],
+            "description": row["description"],
+            "actual_outcome": row["actual_outcome"],
+            "alternatives": [
+                self._alternative(alt, effects.get(alt["id"], []), blocks.get(alt["id"], []))
+                for alt in alt_rows
+            ],
+        }
+        if row["extra"]:
+            hinge.update(json.loads(row["extra"]))
+        return hinge
+
+    def get_alternative(self, hinge_id: str, alt_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM alternatives WHERE hinge_id = ? AND id = ?",
+                (hinge_id, alt_id),
+            ).fetchone()
+            if row is None:
+                return None
+            effects = self._child_values(conn, "effects", "effect", hinge_id, alt_id)
+            blocks = self._child_values(conn, "blocks", "block_id", hinge_id, alt_id)
+        return self._alternative(row, effects.get(alt_id, []), blocks.get(alt_id, []))
+
+    def get_all_hinge_ids(self) -> list[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM hinges ORDER BY position").fetchall()
+        return [row["id"] for row in rows]
+
+    def _child_values(self, conn, table: str, column: str, hinge_id: str,
+                      alt_id: str | None = None) -> dict[str, list[str]]:
+        """Ordered effect/block values for one hinge (or one alternative), keyed by alt ID."""
+        query = f"SELECT alt_id, {column} FROM {table} WHERE hinge_id = ?"
+        params = [hinge_id]
+        if alt_id is not None:
+            query += " AND alt_id = ?"
+            params.append(alt_id)
+        values = {}
+        for row in conn.execute(query + " ORDER BY alt_id, position", params):
+            values.setdefault(row["alt_id"], []).append(row[column])
+        return values
+
+    @staticmethod
+    def _alternative(row, effects: list[str], blocks: list[str]) -> dict:
+        alt = {
+            "id": row["id"],
+            "outcome": row["outcome"],
+            "immediate_effects": effects,
+            "plausibility_notes": row["plausibility_notes"],
+            "blocks": blocks,
+        }
+        if row["extra"]:
+            alt.update(json.loads(row["extra"]))
+        return alt
+
+    # --- Writes ---
+
+    def add_alternative(self, hinge_id: str, alternative: dict) -> bool:
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM hinges WHERE id = ?", (hinge_id,)).fetchone() is None:
+                return False
+            self._add(conn, hinge_id, alternative)
+        return True
+
+    def add_alternatives(self, records: list[dict]) -> tuple[list[str], list[str]]:
+        """Add a batch of bulk-format alternatives in a single transaction.
+
+        Returns (added alternative IDs, errors); the transaction is rolled
+        back if there are errors.
+        """
+        errors = validate_alternative_records(records, self.get_all_hinge_ids())
+        if errors:
+            return [], errors
+
+        added = []
+        try:
+            with self._connect() as conn:
+                for record in records:
+                    alternative = alternative_from_record(record)
+                    try:
+                        self._add(conn, record["hinge_id"], alternative)
+                    except sqlite3.IntegrityError as e:
+                        where = f"line {record.get('_line', '?')}"
+                        if e.sqlite_errorname in DUPLICATE_ERRORS:
+                            errors.append(f"{where}: alternative {alternative['id']!r} "
+                                          f"already exists on {record['hinge_id']}")
+                        else:
+                            errors.append(f"{where}: {e}")
+                    added.append(alternative["id"])
+                if errors:
+                    raise _Rollback
+        except _Rollback:
+            return [], errors
+        return added, []
+
+    def alternative_records(self) -> list[dict]:
+        """Every alternative in bulk format (with its hinge_id), in hinge order."""
+        return [
+            {"hinge_id": h["id"], **alt}
+            for h in self.export_data()["hinges"] for alt in h["alternatives"]
+        ]
+
+    def _add(self, conn, hinge_id: str, alternative: dict):
+        # Generate ID if not provided (same scheme as counterfactuals.next_alternative_id)
+        if "id" not in alternative:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM alternatives WHERE hinge_id = ?", (hinge_id,)
+            ).fetchone()[0]
+            counter = count + 1
+            while conn.execute(
+                "SELECT 1 FROM alternatives WHERE hinge_id = ? AND id = ?",
+                (hinge_id, f"{hinge_id}_alt_{counter}"),
+            ).fetchone():
+                counter += 1
+            alternative["id"] = f"{hinge_id}_alt_{counter}"
+
+        position = conn.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM alternatives WHERE hinge_id = ?",
+            (hinge_id,),
+        ).fetchone()[0]
+        self._insert_alternative(conn, hinge_id, alternative, position)
+
+    def update_alternative(self, hinge_id: str, alt_id: str, updates: dict) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM alternatives WHERE hinge_id = ? AND id = ?",
+                (hinge_id, alt_id),
+            ).fetchone()
+            if row is None:
+                return False
+
+            extra = json.loads(row["extra"]) if row["extra"] else {}
+            extra.update({k: v for k, v in updates.items() if k not in ALTERNATIVE_FIELDS})
+            conn.execute(
+                "UPDATE alternatives SET outcome = ?, plausibility_notes = ?, extra = ? "
+                "WHERE hinge_id = ? AND id = ?",
+                (
+                    updates.get("outcome", row["outcome"]),
+                    updates.get("plausibility_notes", row["plausibility_notes"]),
+                    json.dumps(extra) if extra else None,
+                    hinge_id,
+                    alt_id,
+                ),
+            )
+            if "immediate_effects" in updates:
+                self._replace_children(conn, "effects", "effect", hinge_id, alt_id,
+                                       updates["immediate_effects"])
+            if "blocks" in updates:
+                self._replace_children(conn, "blocks", "block_id", hinge_id, alt_id,
+                                       updates["blocks"])
+        return True
+
+    def delete_alternative(self, hinge_id: str, alt_id: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM alternatives WHERE hinge_id = ? AND id = ?",
+                (hinge_id, alt_id),
+            )
+        return cursor.rowcount > 0
+
+    def _insert_alternative(self, conn, hinge_id: str, alt: dict, position: int):
+        conn.execute(
+            "INSERT INTO alternatives (hinge_id, id, position, outcome, plausibility_notes, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                hinge_id,
+                alt["id"],
+                position,
+                alt.get("outcome", ""),
+                alt.get("plausibility_notes", ""),
+                _extra(alt, ALTERNATIVE_FIELDS),
+            ),
+        )
+        self._replace_children(conn, "effects", "effect", hinge_id, alt["id"],
+                               alt.get("immediate_effects", []))
+        self._replace_children(conn, "blocks", "block_id", hinge_id, alt["id"],
+                               alt.get("blocks", []))
+
+    @staticmethod
+    def _replace_children(conn, table: str, column: str, hinge_id: str, alt_id: str,
+                          values: list[str]):
+        conn.execute(f"DELETE FROM {table} WHERE hinge_id = ? AND alt_id = ?", (hinge_id, alt_id))
+        conn.executemany(
+            f"INSERT INTO {table} (hinge_id, alt_id, position, {column}) VALUES (?, ?, ?, ?)",
+            [(hinge_id, alt_id, i, value) for i, value in enumerate(values)],
+        )
+
+    # --- JSON round-trip ---
+
+    def import_data(self, data: dict):
+        """Replace the database contents with a counterfactuals.json document."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM hinges")
+            for position, hinge in enumerate(data["hinges"]):
+                conn.execute(
+                    "INSERT INTO hinges (id, position, description, actual_outcome, extra) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        hinge["id"],
+                        position,
+                        hinge.get("description", ""),
+                        hinge.get("actual_outcome", ""),
+                        _extra(hinge, HINGE_FIELDS),
+                    ),
+                )
+                for alt_position, alt in enumerate(hinge.get("alternatives", [])):
+                    self._insert_alternative(conn, hinge["id"], alt, alt_position)
+
+    def export_data(self) -> dict:
+        """Rebuild the counterfactuals.json document from the database."""
+        return {"hinges": [self.get_hinge(h) for h in self.get_all_hinge_ids()]}
+
+
+def open_store(graphs_dir: Path, backend: str = "json"):
+    """Open the counterfactual store for a graphs directory.
+
+    The SQLite database is seeded from counterfactuals.json the first time
+    it is opened. Seeding goes to a temporary file that is moved into place
+    once complete, so a failed seed leaves no database behind and is
+    retried on the next open.
+    """
+    if backend == "json":
+        return JsonStore(graphs_dir)
+    if backend == "sqlite":
+        db_path = graphs_dir / DB_FILENAME
+        if not db_path.exists():
+            tmp_path = graphs_dir / f"{DB_FILENAME}.{os.getpid()}.tmp"
+            try:
+                SqliteStore(tmp_path).import_data(JsonStore(graphs_dir).export_data())
+                os.replace(tmp_path, db_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return SqliteStore(db_path)
+    raise ValueError(f"Unknown counterfactual backend: {backend}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage counterfactual storage.")
+    parser.add_argument("command",
+                        choices=["import", "export", "compact",
+                                 "import-alternatives", "export-alternatives"],
+                        help="import: JSON -> SQLite; export: SQLite -> JSON; "
+                             "compact: fold the edit journal into counterfactuals.json; "
+                             "import-/export-alternatives: bulk JSONL in or out")
+    parser.add_argument("path", nargs="?", default="-",
+                        help="JSONL file for the *-alternatives commands (default: stdin/stdout)")
+    parser.add_argument("--graphs-dir", type=Path,
+                        default=Path(__file__).parent.parent / "graphs")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json",
+                        help="store used by the *-alternatives commands")
+    args = parser.parse_args()
+
+    if args.command == "import-alternatives":
+        store = open_store(args.graphs_dir, args.backend)
+        if args.path == "-":
+            records, errors = parse_alternative_records(sys.stdin)
+        else:
+            with open(args.path) as f:
+                records, errors = parse_alternative_records(f)
+        if not errors:
+            added, errors = store.add_alternatives(records)
+        if errors:
+            for error in errors:
+                print(error, file=sys.stderr)
+            sys.exit(f"Rejected batch: {len(errors)} error(s), nothing imported")
+        print(f"Imported {len(added)} alternatives", file=sys.stderr)
+        return
+
+    if args.command == "export-alternatives":
+        store = open_store(args.graphs_dir, args.backend)
+        lines = "".join(json.dumps(r) + "\n" for r in store.alternative_records())
+        if args.path == "-":
+            sys.stdout.write(lines)
+        else:
+            with open(args.path, "w") as f:
+                f.write(lines)
+        return
+
+    if args.command == "compact":
+        store = JsonStore(args.graphs_dir)
+        pending = store.pending
+        store.compact()
+        print(f"Compacted {pending} journal entries into "
+              f"{args.graphs_dir / 'counterfactuals.json'}")
+        return
+
+    store = SqliteStore(args.graphs_dir / DB_FILENAME)
+    if args.command == "import":
+        data = JsonStore(args.graphs_dir).export_data()
+        store.import_data(data)
+        n_alts = sum(len(h["alternatives"]) for h in data["hinges"])
+        print(f"Imported {len(data['hinges'])} hinges, {n_alts} alternatives "
+              f"into {store.path}")
+    else:
+        data = store.export_data()
+        JsonStore(args.graphs_dir).replace_data(data)
+        n_alts = sum(len(h["alternatives"]) for h in data["hinges"])
+        print(f"Exported {len(data['hinges'])} hinges, {n_alts} alternatives "
+              f"to {args.graphs_dir / 'counterfactuals.json'}")
+
+
+if __name__ == "__main__":
+    main()
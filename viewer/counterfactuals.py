@@ -38,17 +38,22 @@ def add_alternative(data: dict, hinge_id: str, alternative: dict) -> bool:
 
     # Generate ID if not provided
     if "id" not in alternative:
-        existing_ids = [a["id"] for a in hinge["alternatives"]]
-        base_id = f"{hinge_id}_alt"
-        counter = len(existing_ids) + 1
-        while f"{base_id}_{counter}" in existing_ids:
-            counter += 1
-        alternative["id"] = f"{base_id}_{counter}"
+        alternative["id"] = next_alternative_id(hinge)
 
     hinge["alternatives"].append(alternative)
     return True
 
 
+def next_alternative_id(hinge: dict) -> str:
+    """Generate an unused alternative ID for a hinge."""
+    existing_ids = {a["id"] for a in hinge["alternatives"]}
+    base_id = f"{hinge['id']}_alt"
+    counter = len(existing_ids) + 1
+    while f"{base_id}_{counter}" in existing_ids:
+        counter += 1
+    return f"{base_id}_{counter}"
+
+
 def update_alternative(data: dict, hinge_id: str, alt_id: str, updates: dict) -> bool:
     """Update an existing alternative. Returns True if successful."""
     hinge = get_hinge(data, hinge_id)
@@ -76,3 +81,80 @@ def delete_alternative(data: dict, hinge_id: str, alt_id: str) -> bool:
 def get_all_hinge_ids(data: dict) -> list[str]:
     """Get list of all hinge IDs (for blocks dropdown)."""
     return [h["id"] for h in data["hinges"]]
+
+
+def parse_alternative_records(lines) -> tuple[list[dict], list[str]]:
+    """Parse a JSONL stream of alternatives, one object per line.
+
+    Each object is an alternative plus a "hinge_id" field naming the hinge
+    it belongs to. Returns (records, errors).
+    """
+    records, errors = [], []
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append(f"line {line_no}: invalid JSON ({e.msg})")
+            continue
+        if not isinstance(record, dict):
+            errors.append(f"line {line_no}: expected a JSON object")
+            continue
+        record["_line"] = line_no
+        records.append(record)
+    return records, errors
+
+
+def validate_alternative_records(records: list[dict], hinge_ids: list[str]) -> list[str]:
+    """Check bulk alternatives against the known hinges. Returns a list of errors."""
+    known = set(hinge_ids)
+    errors = []
+    for record in records:
+        where = f"line {record.get('_line', '?')}"
+        hinge_id = record.get("hinge_id")
+        if not isinstance(hinge_id, str) or hinge_id not in known:
+            errors.append(f"{where}: unknown hinge_id {hinge_id!r}")
+        if "id" in record and not (isinstance(record["id"], str) and record["id"].strip()):
+            errors.append(f"{where}: id must be a non-empty string")
+        outcome = record.get("outcome")
+        if not isinstance(outcome, str) or not outcome.strip():
+            errors.append(f"{where}: outcome is required and must be a string")
+        if not isinstance(record.get("plausibility_notes", ""), str):
+            errors.append(f"{where}: plausibility_notes must be a string")
+        effects = record.get("immediate_effects", [])
+        if not isinstance(effects, list) or not all(isinstance(e, str) for e in effects):
+            errors.append(f"{where}: immediate_effects must be a list of strings")
+        blocks = record.get("blocks", [])
+        if not isinstance(blocks, list):
+            errors.append(f"{where}: blocks must be a list of hinge IDs")
+            continue
+        for block_id in blocks:
+            if not isinstance(block_id, str) or block_id not in known:
+                errors.append(f"{where}: blocks references unknown hinge {block_id!r}")
+            elif block_id == hinge_id:
+                errors.append(f"{where}: an alternative can't block its own hinge")
+    return errors
+
+
+def alternative_from_record(record: dict) -> dict:
+    """Strip the bulk-format bookkeeping fields from a record."""
+    alternative = {k: v for k, v in record.items() if k not in ("hinge_id", "_line")}
+    alternative.setdefault("immediate_effects", [])
+    alternative.setdefault("plausibility_notes", "")
+    alternative.setdefault("blocks", [])
+    return alternative
+
+
+def check_blocks(alternative: dict, computed: list) -> dict:
+    """Compare an alternative's authored blocks with those the DAG derives.
+
+    `missing` are hinges the DAG says are blocked but the author didn't list;
+    `unexplained` are authored blocks the DAG can't account for.
+    """
+    authored = alternative.get("blocks", [])
+    return {
+        "missing": [h for h in computed if h not in authored],
+        "unexplained": [h for h in authored if h not in computed],
+    }
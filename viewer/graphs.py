@@ -41,17 +41,113 @@ def load_knowledge_asymmetry_data(graphs_dir: Path) -> dict:
     return {"characters": characters, "secrets": secrets}
 
 
+def load_knowledge_timeline(graphs_dir: Path) -> dict:
+    """Load per-step knowledge acquisitions and asymmetry deltas."""
+    path = graphs_dir / "knowledge_timeline.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    data["step_labels"] = [step.replace("_", " ").title() for step in data["steps"]]
+    return data
+
+
 def load_hinge_points(graphs_dir: Path) -> list:
     """Load hinge points data."""
     with open(graphs_dir / "hinge_points.json") as f:
         return json.load(f)
 
 
+def load_blocked_hinges(graphs_dir: Path) -> dict:
+    """Load the hinges each DAG node blocks (precomputed by the DAG builder)."""
+    path = graphs_dir / "blocked_hinges.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)["blocked_hinges"]
+
+
+def load_branch_index(graphs_dir: Path) -> dict:
+    """Load each hinge's counterfactual branch nodes, with descriptions."""
+    path = graphs_dir / "branch_index.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        index = json.load(f)
+    with open(graphs_dir / "counterfactual_data.json") as f:
+        nodes = json.load(f)["nodes"]
+    return {
+        hinge: [dict(index["branches"][n], id=n, desc=nodes[n]["desc"]) for n in branch]
+        for hinge, branch in index["by_hinge"].items()
+    }
+
+
+def load_hinge_sensitivity(graphs_dir: Path) -> dict:
+    """Load each hinge's sensitivity ranking, keyed by hinge id."""
+    path = graphs_dir / "hinge_sensitivity.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    ranking = {}
+    for entry in data["hinge_ranking"]:
+        ranking[entry["node"]] = dict(entry,
+                                      step=data["step"],
+                                      story_factor=10 ** entry["log10_chain_shift_down"])
+    return ranking
+
+
+def load_sampled_storylines(graphs_dir: Path) -> dict:
+    """Load sampled alternate storylines, with node descriptions attached."""
+    path = graphs_dir / "sampled_storylines.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    with open(graphs_dir / "counterfactual_data.json") as f:
+        nodes = json.load(f)["nodes"]
+
+    def describe(node_id):
+        return {"id": node_id, "desc": nodes.get(node_id, {}).get("desc", node_id)}
+
+    for storyline in data["storylines"]:
+        storyline["turning_points"] = [describe(n) for n in storyline["turning_points"]]
+        storyline["downstream"] = len(storyline["deviations"]) - len(storyline["turning_points"])
+    data["hinge_rates"] = sorted(
+        (dict(describe(n), rate=data["deviation_rates"][n]) for n in data["hinge_co_deviation"]["nodes"]),
+        key=lambda h: h["rate"], reverse=True)
+    return data
+
+
+def load_irony_index(graphs_dir: Path) -> dict:
+    """Load the precomputed reader-vs-character knowledge gaps."""
+    path = graphs_dir / "irony_index.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    data["max_gap"] = max(max(row) for row in data["irony"] + data["mystery"])
+    return data
+
+
 def load_perspective_matrix(graphs_dir: Path):
-    """Load the event-perspective matrix."""
+    """Load the event-perspective matrix in its compact form.
+
+    Returns the narrators, the events, the coverage code names, and an
+    events x narrators grid of codes filled in from the covered cells.
+    """
     with open(graphs_dir / "event_perspective_matrix.json") as f:
         data = json.load(f)
-    return data["matrix"], data["narrators"], data["events"]
+    cells = data["cells"]
+    grid = [[0] * len(data["narrators"]) for _ in data["events"]]
+    for narrator, event, code in zip(cells["narrator"], cells["event"], cells["coverage"]):
+        grid[event][narrator] = code
+    return {
+        "narrators": data["narrators"],
+        "events": data["events"],
+        "codes": data["coverage_codes"],
+        "grid": grid,
+    }
 
 
 def render_counterfactual_dag(graphs_dir: Path) -> str:
@@ -222,7 +318,8 @@ def render_knowledge_state(graphs_dir: Path) -> str:
         color = "#4CAF50" if rel == "KNOWS" else "#FFC107"
         dashes = rel == "SUSPECTS"
         edge_tooltip = "KNOWS — confirmed knowledge" if rel == "KNOWS" else "SUSPECTS — uncertain belief"
-        net.add_edge(source, target, color=color, arrows="to", dashes=dashes, title=edge_tooltip)
+        net.add_edge(source, target, id=f"{source}->{target}", color=color, arrows="to",
+                     dashes=dashes, title=edge_tooltip)
 
     html = net.generate_html()
     start = html.find('<div id="mynetwork"')
@@ -285,6 +382,7 @@ def render_knowledge_asymmetry(graphs_dir: Path) -> str:
 
         net.add_edge(
             source, target,
+            id=f"{source}->{target}",
             width=width,
             title=tooltip,
             arrows="to",
@@ -0,0 +1,454 @@
+"""
+Bayesian inference over the narrative networks in graphs/.
+
+Three networks are built by the scripts: counterfactual.bif (the default),
+causal_chain.bif and state_transitions.bif. Each is loaded once and its
+LazyPropagation engine kept compiled: a query only changes the evidence
+that differs from the previous one, so the junction tree is reused across
+queries. The engine is rebuilt if the .bif file changes on disk.
+
+Queries can observe variables (evidence) or set them by intervention
+(do): do(X=x) cuts X off from its causes, so it answers "what if X had
+gone otherwise" rather than "what if we learned X went otherwise".
+
+Batches of scenarios run on one engine, ordered so scenarios touching
+the same variables are evaluated together, and large batches are sharded
+across a process pool. Scenarios are JSON lines, either
+{"id": ..., "evidence": {name: value}, "do": {name: value}} or a bare
+{name: value} evidence object. Results are one row per scenario and one
+column per node=label:
+
+    python inference.py run scenarios.jsonl -o posteriors.csv --network causal_chain
+    python inference.py sweep --network counterfactual   # nightly hinge sweep
+
+`sweep` evaluates every single and pairwise hinge intervention (each hinge
+set to its first, non-actual label) and writes graphs/<network>_sweep.csv.
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyagrum as gum
+
+NETWORKS = ("counterfactual", "causal_chain", "state_transitions")
+
+# Story outcomes whose response to interventions authors ask about. Only
+# the ones present in a network are reported (truth_never_discovered is a
+# counterfactual branch, so it isn't in counterfactual.bif).
+OUTCOMES = ("reconciliation", "diamond_returns", "truth_never_discovered")
+
+# Below this many scenarios a batch stays in one process: loading the
+# network in each worker costs more than it saves.
+SHARD_SIZE = 500
+
+
+def _scenario_key(scenario):
+    """Sort key grouping scenarios by intervened, then observed, variables."""
+    _, evidence, do = scenario
+    return (sorted(do), sorted(evidence),
+            [do[n] for n in sorted(do)], [evidence[n] for n in sorted(evidence)])
+
+
+class _Compiled:
+    """One network with a LazyPropagation engine and its current evidence."""
+
+    def __init__(self, bn):
+        self.bn = bn
+        self.ie = gum.LazyPropagation(bn)
+        self.ie.makeInference()
+        self.evidence = {}
+
+    def _set_evidence(self, evidence: dict):
+        """Move the engine from its current evidence to `evidence`."""
+        ie = self.ie
+        for name in [n for n in self.evidence if n not in evidence]:
+            ie.eraseEvidence(name)
+            del self.evidence[name]
+        for name, value in evidence.items():
+            if name not in self.evidence:
+                ie.addEvidence(name, value)
+            elif self.evidence[name] != value:
+                ie.chgEvidence(name, value)
+            self.evidence[name] = value
+
+    def infer(self, evidence: dict):
+        try:
+            self._set_evidence(evidence)
+            self.ie.makeInference()
+        except gum.GumException as e:
+            self.ie.eraseAllEvidence()
+            self.evidence = {}
+            raise ValueError(f"evidence is impossible under the network: {e}") from e
+
+    def posterior(self, node) -> list:
+        return self.ie.posterior(node).tolist()
+
+
+class InferenceEngine:
+    """Compiled LazyPropagation engines over one BIF file.
+
+    Observational queries run on the network itself. An intervention
+    do(X=x) runs on a mutilated copy with X's incoming arcs cut, where
+    setting X is then ordinary evidence; the copy is compiled once per set
+    of intervened variables and reused for any values.
+    """
+
+    # Mutilated networks kept compiled, least recently used dropped first
+    MAX_MUTILATED = 64
+
+    def __init__(self, bif_path: Path):
+        self.bif_path = Path(bif_path)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._bn = None
+        self._base = None
+        self._mutilated = OrderedDict()
+
+    def _ensure_loaded(self):
+        stat = self.bif_path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        self._bn = gum.loadBN(str(self.bif_path))
+        self._base = _Compiled(self._bn)
+        self._mutilated.clear()
+        self._stamp = stamp
+
+    def _compiled(self, do_names) -> _Compiled:
+        """The engine for intervening on `do_names` (the base one if none)."""
+        if not do_names:
+            return self._base
+        key = frozenset(do_names)
+        compiled = self._mutilated.get(key)
+        if compiled is None:
+            bn = gum.BayesNet(self._bn)
+            for name in key:
+                for parent in list(bn.parents(name)):
+                    bn.eraseArc(parent, bn.idFromName(name))
+                # Any prior will do: the intervened value is set as evidence
+                bn.cpt(name).fillWith(1).normalize()
+            compiled = self._mutilated[key] = _Compiled(bn)
+            if len(self._mutilated) > self.MAX_MUTILATED:
+                self._mutilated.popitem(last=False)
+        else:
+            self._mutilated.move_to_end(key)
+        return compiled
+
+    def _query(self, evidence: dict, do: dict) -> _Compiled:
+        compiled = self._compiled(do)
+        compiled.infer({**evidence, **do})
+        return compiled
+
+    def variables(self) -> dict:
+        """Map each variable to its labels."""
+        with self._lock:
+            self._ensure_loaded()
+            return {self._bn.variable(n).name(): list(self._bn.variable(n).labels())
+                    for n in self._bn.nodes()}
+
+    def check_evidence(self, evidence: dict, do: dict = None) -> list:
+        """Return error messages for unknown variables or labels."""
+        return evidence_errors(evidence, self.variables(), do)
+
+    def posteriors(self, evidence: dict, do: dict = None) -> dict:
+        """Posterior distribution of every variable given `evidence`.
+
+        `evidence` and `do` map variable names to labels: evidence is
+        observed, do is set by intervention. Raises ValueError if the
+        evidence is impossible under the (mutilated) network.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            compiled = self._query(evidence, do or {})
+            result = {}
+            for node in self._bn.nodes():
+                var = self._bn.variable(node)
+                result[var.name()] = dict(zip(var.labels(), compiled.posterior(node)))
+            return result
+
+    def effects(self, do: dict, evidence: dict = None, targets=None, baseline: dict = None) -> dict:
+        """How intervening with `do` shifts each target's distribution.
+
+        Targets default to the OUTCOMES present in the network. Returns
+        {target: {"baseline": dist, "do": dist}}, both given `evidence`; the
+        baseline is under the `baseline` intervention (none by default).
+        """
+        evidence = evidence or {}
+        with self._lock:
+            self._ensure_loaded()
+            names = set(self._bn.names())
+            targets = [t for t in (targets or OUTCOMES) if t in names]
+            result = {}
+            for key, intervention in (("baseline", baseline or {}), ("do", do)):
+                compiled = self._query(evidence, intervention)
+                for target in targets:
+                    labels = self._bn.variable(target).labels()
+                    result.setdefault(target, {})[key] = dict(zip(labels, compiled.posterior(target)))
+            return result
+
+    def columns(self) -> list:
+        """Result columns for a batch: one per node=label, in network order."""
+        return [f"{name}={label}" for name, labels in self.variables().items()
+                for label in labels]
+
+    def run_batch(self, scenarios: list) -> list:
+        """Posterior rows for a list of (id, evidence, do) scenarios.
+
+        Scenarios are evaluated grouped by which variables they intervene
+        on and observe, so consecutive queries share a compiled engine and
+        only change evidence values. Rows come back in input order as
+        (id, values-or-None, error-or-None).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            nodes = list(self._bn.nodes())
+            order = sorted(range(len(scenarios)), key=lambda i: _scenario_key(scenarios[i]))
+            rows = [None] * len(scenarios)
+            for i in order:
+                scenario_id, evidence, do = scenarios[i]
+                try:
+                    compiled = self._query(evidence, do)
+                except ValueError as e:
+                    rows[i] = (scenario_id, None, str(e))
+                    continue
+                values = []
+                for node in nodes:
+                    values.extend(compiled.posterior(node))
+                rows[i] = (scenario_id, values, None)
+            return rows
+
+
+# Engines for batch shards, one per network per worker process
+_worker_engines = {}
+
+
+def _run_shard(bif_path, scenarios):
+    engine = _worker_engines.get(bif_path)
+    if engine is None:
+        engine = _worker_engines[bif_path] = InferenceEngine(bif_path)
+    return engine.run_batch(scenarios)
+
+
+def _pairs(values: dict) -> str:
+    return ",".join(f"{k}={v}" for k, v in values.items())
+
+
+def evaluate_scenarios(engine: InferenceEngine, scenarios: list, workers: int = None) -> pd.DataFrame:
+    """Evaluate (id, evidence, do) scenarios into a posterior table.
+
+    Batches larger than SHARD_SIZE are split across `workers` processes
+    (default: one per core); smaller ones run on `engine` directly.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(scenarios) > SHARD_SIZE:
+        # Shard after grouping so each worker still sees runs of scenarios
+        # sharing a compiled engine and observed variables
+        ordered = sorted(scenarios, key=_scenario_key)
+        n_shards = min(workers, -(-len(ordered) // SHARD_SIZE))
+        size = -(-len(ordered) // n_shards)
+        shards = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+        with ProcessPoolExecutor(max_workers=n_shards) as pool:
+            results = pool.map(_run_shard, [str(engine.bif_path)] * len(shards), shards)
+            by_id = {row[0]: row for shard in results for row in shard}
+        rows = [by_id[scenario[0]] for scenario in scenarios]
+    else:
+        rows = engine.run_batch(scenarios)
+
+    columns = engine.columns()
+    table = pd.DataFrame([values or [float("nan")] * len(columns) for _, values, _ in rows],
+                         columns=columns)
+    table.insert(0, "error", [error or "" for _, _, error in rows])
+    table.insert(0, "do", [_pairs(do) for _, _, do in scenarios])
+    table.insert(0, "evidence", [_pairs(evidence) for _, evidence, _ in scenarios])
+    table.insert(0, "id", [scenario_id for scenario_id, _, _ in scenarios])
+    return table
+
+
+def evidence_errors(evidence: dict, labels: dict, do: dict = None) -> list:
+    """Error messages for evidence or interventions naming unknown variables
+    or labels, or setting the same variable both ways."""
+    errors = []
+    for name, value in {**evidence, **(do or {})}.items():
+        if name not in labels:
+            errors.append(f"unknown variable {name!r}")
+        elif value not in labels[name]:
+            errors.append(f"{name}: unknown value {value!r} (expected one of {', '.join(labels[name])})")
+    for name in set(evidence) & set(do or {}):
+        errors.append(f"{name} is both observed and intervened on")
+    return errors
+
+
+def label_values(values: dict) -> dict:
+    """Evidence given as JSON, with values as label strings.
+
+    JSON true/false become the networks' "true"/"false" labels (str() would
+    give "True"/"False").
+    """
+    return {name: ("true" if value else "false") if isinstance(value, bool) else str(value)
+            for name, value in values.items()}
+
+
+def parse_evidence(pairs) -> dict:
+    """Parse evidence given as "name=value" strings (or comma-joined lists)."""
+    evidence = {}
+    for pair in pairs:
+        for item in pair.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"evidence {item!r} is not name=value")
+            evidence[name.strip()] = value.strip()
+    return evidence
+
+
+def parse_scenarios(lines, engine: InferenceEngine):
+    """Parse JSONL scenarios into ((id, evidence, do) list, errors).
+
+    Scenario IDs default to the line number and must be unique.
+    """
+    labels = engine.variables()
+    scenarios, errors, seen = [], [], set()
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append(f"line {lineno}: invalid JSON ({e.msg})")
+            continue
+        if not isinstance(record, dict):
+            errors.append(f"line {lineno}: expected a JSON object")
+            continue
+
+        scenario_id = str(record.get("id", lineno))
+        if "evidence" in record or "do" in record:
+            evidence = record.get("evidence", {})
+            do = record.get("do", {})
+        else:
+            evidence = {k: v for k, v in record.items() if k != "id"}
+            do = {}
+        if not isinstance(evidence, dict) or not isinstance(do, dict):
+            errors.append(f"line {lineno}: evidence and do must be objects")
+            continue
+        evidence = label_values(evidence)
+        do = label_values(do)
+
+        problems = evidence_errors(evidence, labels, do)
+        if scenario_id in seen:
+            problems.append(f"duplicate scenario id {scenario_id!r}")
+        seen.add(scenario_id)
+        errors.extend(f"line {lineno}: {p}" for p in problems)
+        scenarios.append((scenario_id, evidence, do))
+    return scenarios, errors
+
+
+def hinge_nodes(engine: InferenceEngine, graphs_dir: Path) -> list:
+    """Hinge variables of a network, from hinge_points.json.
+
+    Networks without hinge annotations (causal_chain, state_transitions)
+    sweep every variable.
+    """
+    names = list(engine.variables())
+    path = Path(graphs_dir) / "hinge_points.json"
+    if path.exists():
+        with open(path) as f:
+            hinges = [h["node"] for h in json.load(f) if h["node"] in names]
+        if hinges:
+            return hinges
+    return names
+
+
+def sweep_scenarios(engine: InferenceEngine, nodes: list) -> list:
+    """The baseline plus every single and pairwise intervention at `nodes`.
+
+    An intervention sets the node to its first label: "false", "no" or
+    "other" in the networks the scripts build, against the actual last label.
+    """
+    labels = engine.variables()
+    deviation = {node: labels[node][0] for node in nodes}
+    scenarios = [("baseline", {}, {})]
+    for node in nodes:
+        scenarios.append((node, {}, {node: deviation[node]}))
+    for a, b in itertools.combinations(nodes, 2):
+        scenarios.append((f"{a}+{b}", {}, {a: deviation[a], b: deviation[b]}))
+    return scenarios
+
+
+PARQUET_MISSING = "Parquet output needs pyarrow (pip install pyarrow); write a .csv instead"
+
+
+def write_table(table: pd.DataFrame, path):
+    """Write a posterior table as CSV, or Parquet for a .parquet path."""
+    if path == "-":
+        table.to_csv(sys.stdout, index=False)
+    elif str(path).endswith(".parquet"):
+        try:
+            table.to_parquet(path, index=False)
+        except ImportError as e:
+            raise RuntimeError(PARQUET_MISSING) from e
+    else:
+        table.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch inference over the narrative networks.")
+    parser.add_argument("command", choices=["run", "sweep"],
+                        help="run: evaluate a JSONL file of scenarios; "
+                             "sweep: all single and pairwise hinge interventions")
+    parser.add_argument("path", nargs="?", default="-",
+                        help="scenario JSONL for `run` (default: stdin)")
+    parser.add_argument("-o", "--output",
+                        help="CSV or .parquet output (default: stdout for run, "
+                             "graphs/<network>_sweep.csv for sweep)")
+    parser.add_argument("--network", choices=NETWORKS, default="counterfactual")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for large batches (default: one per core)")
+    parser.add_argument("--graphs-dir", type=Path,
+                        default=Path(__file__).parent.parent / "graphs")
+    args = parser.parse_args()
+
+    engine = InferenceEngine(args.graphs_dir / f"{args.network}.bif")
+    if not engine.bif_path.exists():
+        sys.exit(f"{engine.bif_path} not found; run the build scripts first")
+    # Fail before a long sweep rather than when writing its result
+    if (str(args.output).endswith(".parquet")
+            and not any(importlib.util.find_spec(m) for m in ("pyarrow", "fastparquet"))):
+        sys.exit(PARQUET_MISSING)
+
+    if args.command == "sweep":
+        scenarios = sweep_scenarios(engine, hinge_nodes(engine, args.graphs_dir))
+        output = args.output or args.graphs_dir / f"{args.network}_sweep.csv"
+    else:
+        if args.path == "-":
+            scenarios, errors = parse_scenarios(sys.stdin, engine)
+        else:
+            with open(args.path) as f:
+                scenarios, errors = parse_scenarios(f, engine)
+        if errors:
+            for error in errors:
+                print(error, file=sys.stderr)
+            sys.exit(f"Rejected batch: {len(errors)} error(s)")
+        output = args.output or "-"
+
+    table = evaluate_scenarios(engine, scenarios, args.workers)
+    write_table(table, output)
+    failed = (table["error"] != "").sum()
+    print(f"Evaluated {len(table)} scenarios on {args.network}"
+          + (f" ({failed} impossible)" if failed else "")
+          + ("" if output == "-" else f" -> {output}"), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Witness feasibility over the location index in graphs/.
+
+Answers "who could have seen, heard or got to this event?": for an event
+in location_data.json, every location from which its location is within
+sight or earshot (PERCEPTION_RANGE hops, stored with the index) or within
+k moves on foot, and every character placed at one of those locations at
+the event's step by the events they take part in.
+
+Both come from graphs/location_index.npz, so a query is a slice of the
+precomputed distance arrays; each location also names the innermost
+building or town it shares with the event, answered by the index's own
+common_container query. The batch form evaluates every event against every
+character in one call and writes one row per (event, character) pair that
+could have witnessed it:
+
+    python witnesses.py godfrey_steals -k 3
+    python witnesses.py --all -k 2 -o witnesses.csv
+
+The engine reloads if either input file changes on disk.
+"""
+
+import argparse
+import json
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# The index's queries live with the script that builds it
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from location_index import common_container, load_location_index
+
+# Moves on foot allowed when a query doesn't say
+DEFAULT_MOVES = 2
+
+
+class WitnessEngine:
+    """Event, location and character arrays over one graphs directory."""
+
+    def __init__(self, graphs_dir: Path):
+        self.index_path = Path(graphs_dir) / "location_index.npz"
+        self.data_path = Path(graphs_dir) / "location_data.json"
+        self._lock = threading.Lock()
+        self._stamp = None
+
+    def exists(self) -> bool:
+        return self.index_path.exists() and self.data_path.exists()
+
+    def _ensure_loaded(self):
+        stamp = tuple((p.stat().st_mtime_ns, p.stat().st_size)
+                      for p in (self.index_path, self.data_path))
+        if stamp == self._stamp:
+            return
+        self.index = load_location_index(self.index_path)
+        self.locations = self.index["locations"]
+        self.channels = self.index["channels"]
+        self.perception_range = self.index["perception_range"]
+        self.dist = self.index["dist"]
+        with open(self.data_path) as f:
+            data = json.load(f)
+
+        position = {loc: i for i, loc in enumerate(self.locations)}
+        self.events = list(data["event_locations"])
+        self.event_position = {e: i for i, e in enumerate(self.events)}
+        self.steps = list(dict.fromkeys(data["event_steps"][e] for e in self.events))
+        self.characters = sorted({c for e in self.events for c in data["event_participants"].get(e, [])})
+        person = {c: i for i, c in enumerate(self.characters)}
+
+        # event_location[e], event_step[e]; present[t, c, l]: c is at l during step t
+        self.event_location = np.array([position[data["event_locations"][e]] for e in self.events])
+        self.event_step = np.array([self.steps.index(data["event_steps"][e]) for e in self.events])
+        self.present = np.zeros((len(self.steps), len(self.characters), len(self.locations)), dtype=bool)
+        for e, event in enumerate(self.events):
+            for character in data["event_participants"].get(event, []):
+                self.present[self.event_step[e], person[character], self.event_location[e]] = True
+        self._stamp = stamp
+
+    def _in_reach(self, k: int, events=None) -> np.ndarray:
+        """reach[e, x, l]: the event's location is within range of l over channel x.
+
+        Sight and sound use their perception range; walking uses `k` moves.
+        """
+        events = self.event_location if events is None else self.event_location[events]
+        limit = np.where(self.perception_range < 0, k, self.perception_range)
+        dist = self.dist[:, events].transpose(1, 0, 2)
+        return (dist >= 0) & (dist <= limit[None, :, None])
+
+    def witnesses(self, event: str, k: int = DEFAULT_MOVES) -> dict:
+        """Locations and characters from which `event` was within reach.
+
+        Raises KeyError for an unknown event.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            e = self.event_position[event]
+            reach = self._in_reach(k, [e])[0]
+            dist = self.dist[:, self.event_location[e]]
+            present = self.present[self.event_step[e]]
+            where = self.locations[self.event_location[e]]
+
+            locations = [
+                {"location": self.locations[l],
+                 "within": common_container(self.index, where, self.locations[l]),
+                 "channels": {self.channels[x]: int(dist[x, l]) for x in np.nonzero(reach[:, l])[0]}}
+                for l in np.nonzero(reach.any(axis=0))[0]
+            ]
+            characters = []
+            for c in np.nonzero((present & reach.any(axis=0)).any(axis=1))[0]:
+                at = np.nonzero(present[c] & reach.any(axis=0))[0]
+                characters.append({
+                    "character": self.characters[c],
+                    "locations": [self.locations[l] for l in at],
+                    "channels": [self.channels[x] for x in np.nonzero(reach[:, at].any(axis=1))[0]],
+                })
+            return {
+                "event": event,
+                "location": self.locations[self.event_location[e]],
+                "step": self.steps[self.event_step[e]],
+                "moves": k,
+                "locations": locations,
+                "characters": characters,
+            }
+
+    def feasibility(self, k: int = DEFAULT_MOVES) -> np.ndarray:
+        """feasible[e, c, x]: character c could have perceived or reached
+        event e over channel x, for every event and character at once."""
+        with self._lock:
+            self._ensure_loaded()
+            reach = self._in_reach(k).astype(np.float32)
+            present = self.present[self.event_step].astype(np.float32)
+            return np.einsum("ecl,exl->ecx", present, reach) > 0
+
+    def feasibility_table(self, k: int = DEFAULT_MOVES) -> pd.DataFrame:
+        """One row per feasible (event, character), one boolean column per channel."""
+        feasible = self.feasibility(k)
+        e, c = np.nonzero(feasible.any(axis=2))
+        table = pd.DataFrame({"event": [self.events[i] for i in e],
+                              "character": [self.characters[j] for j in c]})
+        for x, channel in enumerate(self.channels):
+            table[channel] = feasible[e, c, x]
+        return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("event", nargs="?", help="event to query")
+    parser.add_argument("--all", action="store_true", help="evaluate every event against every character")
+    parser.add_argument("-k", "--moves", type=int, default=DEFAULT_MOVES, help="moves on foot allowed")
+    parser.add_argument("-o", "--output", help="CSV path for --all (default stdout)")
+    parser.add_argument("--graphs", default=Path(__file__).parent.parent / "graphs", type=Path)
+    args = parser.parse_args(argv)
+
+    engine = WitnessEngine(args.graphs)
+    if args.all:
+        table = engine.feasibility_table(args.moves)
+        table.to_csv(args.output or sys.stdout, index=False)
+    elif args.event:
+        try:
+            result = engine.witnesses(args.event, args.moves)
+        except KeyError:
+            parser.error(f"unknown event {args.event!r}")
+        print(json.dumps(result, indent=2))
+    else:
+        parser.error("give an event or --all")
+
+
+if __name__ == "__main__":
+    main()